@@ -8,4 +8,4 @@ cd /d ..
 
 set PYTHONPATH=%cd%/src
 set JIRA_HOST=https://helpdesk.compassluxe.com
-call python -m tool_for_run_project.go %*
+call python -m tool_for_run_project.client %*
@@ -0,0 +1,10 @@
+# Автодополнение go для bash, подключение: source scripts/go_completion.bash
+
+_GO_COMPLETION_SRC="$(cd "$(dirname "${BASH_SOURCE[0]}")/../src" && pwd)"
+
+_go_completion() {
+    local IFS=$'\n'
+    COMPREPLY=($(PYTHONPATH="$_GO_COMPLETION_SRC" python -m tool_for_run_project.completion "${COMP_WORDS[@]:1:COMP_CWORD}" 2>/dev/null))
+}
+
+complete -F _go_completion go
@@ -0,0 +1,28 @@
+-- Автодополнение go.bat для cmd через Clink: файл нужно положить в папку скриптов Clink
+-- (см. "clink info") или добавить папку scripts командой "clink installscripts <путь>\scripts"
+
+local src = path.join(path.getdirectory(debug.getinfo(1, "S").source:sub(2)), "..\\src")
+
+local function go_completion(word, word_index, line_state)
+    local args = {}
+    for i = 2, word_index - 1 do
+        table.insert(args, '"' .. line_state:getword(i) .. '"')
+    end
+    table.insert(args, '"' .. word .. '"')
+
+    local matches = {}
+    local command = 'set "PYTHONPATH=' .. src .. '" && python -m tool_for_run_project.completion '
+        .. table.concat(args, " ") .. " 2>nul"
+
+    local f = io.popen(command)
+    if f then
+        for line in f:lines() do
+            table.insert(matches, line)
+        end
+        f:close()
+    end
+
+    return matches
+end
+
+clink.argmatcher("go", "пщ"):addarg(go_completion):loop()
@@ -0,0 +1,17 @@
+# Автодополнение go.bat для PowerShell, подключение в $PROFILE: . <путь>\scripts\go_completion.ps1
+
+$GoCompletionSrc = Join-Path (Split-Path -Parent $PSScriptRoot) "src"
+
+Register-ArgumentCompleter -Native -CommandName go, go.bat, пщ, пщ.bat -ScriptBlock {
+    param($wordToComplete, $commandAst, $cursorPosition)
+
+    $words = @($commandAst.CommandElements | Select-Object -Skip 1 | ForEach-Object { $_.ToString() })
+    if (-not $wordToComplete) {
+        $words += ""
+    }
+
+    $env:PYTHONPATH = $GoCompletionSrc
+    python -m tool_for_run_project.completion @words 2>$null | ForEach-Object {
+        [System.Management.Automation.CompletionResult]::new($_, $_, "ParameterValue", $_)
+    }
+}
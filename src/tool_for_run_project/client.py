@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Тонкий клиент для server.py. Импортов тут минимум, чтобы запуск был быстрым.
+#       Если сервер не запущен, команда выполняется в текущем процессе через go.py
+
+
+import json
+import os
+import socket
+import sys
+
+
+COMPLETE_FLAG: str = "--complete"
+
+
+def prepare_batch_args(args: list[str]) -> tuple[list[str], str | None]:
+    # NOTE: У сервера своя текущая папка и свой stdin, поэтому путь до файла команд
+    #       передается абсолютным, а команды из stdin читаются клиентом и передаются вместе с аргументами
+    if not args or args[0] != "--batch":
+        return args, None
+
+    new_args: list[str] = args.copy()
+    stdin: str | None = None
+    for i, arg in enumerate(new_args[1:], start=1):
+        if arg.startswith("--"):
+            continue
+
+        if arg == "-":
+            stdin = sys.stdin.read()
+        else:
+            new_args[i] = os.path.abspath(arg)
+
+    return new_args, stdin
+
+
+def prepare_profile_args(args: list[str]) -> tuple[list[str], list[str]]:
+    # Например: go --profile=trace.json tx s, файл trace должен появиться в текущей папке клиента
+    if not args or args[0].split("=")[0] != "--profile":
+        return [], args
+
+    flag, sep, path = args[0].partition("=")
+    if path:
+        path = os.path.abspath(path)
+
+    return [flag + sep + path], args[1:]
+
+
+def run_on_server(args: list[str]) -> int | None:
+    from tool_for_run_project.server import ENCODING, read_server_info, send_message
+
+    info: dict | None = read_server_info()
+    if not info:
+        return None
+
+    try:
+        sock = socket.create_connection((info["host"], info["port"]), timeout=0.5)
+    except OSError:
+        return None
+
+    with sock:
+        # Выполнение команды может быть долгим
+        sock.settimeout(None)
+
+        profile_args, args = prepare_profile_args(args)
+        args, stdin = prepare_batch_args(args)
+        send_message(sock, args=profile_args + args, token=info["token"], stdin=stdin)
+
+        with sock.makefile("rb") as f:
+            for line in f:
+                message: dict = json.loads(line.decode(ENCODING))
+                if "out" in message:
+                    sys.stdout.write(message["out"])
+                    sys.stdout.flush()
+
+                if "exit_code" in message:
+                    return message["exit_code"]
+
+    # Сервер оборвал соединение
+    return 1
+
+
+def main(args: list[str]) -> int:
+    # Автодополнение не обращается к серверу - ему хватает индекса
+    if args and args[0] == COMPLETE_FLAG:
+        from tool_for_run_project import completion
+        return completion.main(args[1:])
+
+    exit_code: int | None = run_on_server(args)
+    if exit_code is not None:
+        return exit_code
+
+    from tool_for_run_project import go
+    return go.main(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Автодополнение для командной строки. Вызывается на каждое нажатие Tab, поэтому
+#       модули пакета не импортируются - варианты берутся из индекса, который записывается
+#       при обработке настроек (см. settings.LazySettings.get_completion_index)
+
+
+import json
+import os
+import sys
+
+from typing import Any
+
+
+# NOTE: Как в core/cache.py, но без импорта core и pathlib
+if path_cache_value := os.getenv("PATH_CACHE"):
+    DIR_CACHE: str = os.path.realpath(path_cache_value)
+else:
+    DIR_CACHE: str = os.path.join(
+        os.getenv("LOCALAPPDATA") or os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "tool_for_run_project",
+    )
+
+PATH_INDEX: str = os.path.join(DIR_CACHE, "completion.json")
+
+# NOTE: При изменении формата индекса нужно увеличить, чтобы старый индекс не использовался
+INDEX_VERSION: int = 1
+
+
+def load_index(path: str = PATH_INDEX) -> dict[str, Any] | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            index: dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+
+    return index
+
+
+def get_tables(layouts: dict[str, str]) -> list[dict[int, int]]:
+    return [
+        str.maketrans(dict(zip(chars, other_chars)))
+        for name, chars in layouts.items()
+        for other_name, other_chars in layouts.items()
+        if name != other_name and len(chars) == len(other_chars)
+    ]
+
+
+class Completer:
+    def __init__(self, index: dict[str, Any]) -> None:
+        self.index: dict[str, Any] = index
+
+        # Для вариантов, набранных в другой раскладке клавиатуры
+        self._tables: list[dict[int, int]] = get_tables(index.get("layouts", dict()))
+
+    def match(self, prefix: str, items: list[str]) -> list[str]:
+        prefixes: list[str] = [prefix.lower()]
+        for table in self._tables:
+            variant: str = prefixes[0].translate(table)
+            if variant not in prefixes:
+                prefixes.append(variant)
+
+        return [x for x in items if x.lower().startswith(tuple(prefixes))]
+
+    def match_part(self, prefix: str, items: list[str], separator: str) -> list[str]:
+        # Для списков, например "3.2.1,3.2." или "s+e"
+        head, sep, tail = prefix.rpartition(separator)
+        return [head + sep + x for x in self.match(tail, items)]
+
+    def resolve(self, alias: str, items: list[str]) -> str | None:
+        # Как AliasIndex.resolve: совпадение целиком или единственное совпадение по началу
+        for x in items:
+            if x.lower() == alias.lower():
+                return x
+
+        found: list[str] = self.match(alias, items)
+        return found[0] if len(found) == 1 else None
+
+    def complete(self, words: list[str]) -> list[str]:
+        # Последнее слово - дополняемое, оно может быть пустым
+        *typed, current = words or [""]
+
+        names: list[str] = self.index["names"]
+        if not typed:
+            return self.match(current, names)
+
+        name: str | None = self.resolve(typed[0], names)
+        project: dict[str, Any] | None = self.index["projects"].get(name)
+        if not project:
+            return []
+
+        versions: list[str] = project["versions"]
+        actions: list[str] = project["actions"]
+
+        # Второй аргумент это или <version>, или <action>
+        rest: list[str] = typed[1:]
+        if not rest:
+            return (
+                self.match_part(current, versions, ",")
+                + self.match_part(current, actions, "+")
+            )
+
+        if self._is_like_a_version(rest[0], versions):
+            rest = rest[1:]
+            if not rest:
+                return self.match_part(current, actions, "+")
+
+        # Первый аргумент действия, например "ora" или "pg" у "server"
+        if len(rest) != 1:
+            return []
+
+        args: list[str] = []
+        for alias in rest[0].split("+"):
+            action: str | None = self.resolve(alias, actions)
+            for arg in project["args"].get(action, []):
+                if arg not in args:
+                    args.append(arg)
+
+        return self.match(current, args)
+
+    def _is_like_a_version(self, value: str, versions: list[str]) -> bool:
+        # NOTE: Упрощенная версия core.is_like_a_version
+        return (
+            any(c.isdigit() for c in value)
+            or "," in value
+            or "-" in value
+            or self.resolve(value, versions) is not None
+        )
+
+
+def main(args: list[str]) -> int:
+    index: dict[str, Any] | None = load_index()
+    if not index:
+        return 1
+
+    for x in Completer(index).complete(args):
+        print(x)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
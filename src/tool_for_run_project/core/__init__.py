@@ -13,7 +13,14 @@ from enum import Enum, auto
 from pathlib import Path
 from typing import Iterable, Type
 
-from tool_for_run_project.third_party.from_ghbdtn import from_ghbdtn
+from tool_for_run_project.core import profiler
+from tool_for_run_project.core.fuzzy import DeletionIndex
+from tool_for_run_project.core.layouts import get_variants, get_variants_many
+
+
+# NOTE: Поиск алиасов с опечатками (например, "desinger" -> "designer") включается
+#       заданием максимального числа исправлений, по умолчанию выключен
+ALIAS_FUZZY_DISTANCE: int = int(os.getenv("ALIAS_FUZZY_DISTANCE") or 0)
 
 
 class AvailabilityEnum(Enum):
@@ -127,6 +134,158 @@ def get_similar_value(alias: str, items: Iterable[str]) -> str | None:
     raise MultipleResultsFoundError(alias=alias, variants=keys)
 
 
+class _AliasTrieNode:
+    __slots__ = ("children", "exact", "values")
+
+    def __init__(self) -> None:
+        self.children: dict[str, "_AliasTrieNode"] = dict()
+
+        # Значение, совпадающее с префиксом целиком
+        self.exact: str | None = None
+
+        # Все значения, начинающиеся с этого префикса (в порядке добавления)
+        self.values: list[str] = []
+
+
+class _AliasTrie:
+    def __init__(self) -> None:
+        self.root = _AliasTrieNode()
+
+        # Под каким ключом было добавлено значение, например "вуышптук" -> "designer"
+        self.value_by_key: dict[str, str] = dict()
+
+    def add(self, key: str, value: str) -> None:
+        if key in self.value_by_key:
+            # Как и у словаря, побеждает последнее значение
+            self.value_by_key[key] = value
+            return
+
+        self.value_by_key[key] = value
+
+        node: _AliasTrieNode = self.root
+        for c in key.lower():
+            node = node.children.setdefault(c, _AliasTrieNode())
+            node.values.append(key)
+
+        if node.exact is None:
+            node.exact = key
+
+    def find(self, alias: str) -> str | None:
+        # Повторяет логику get_similar_value, но за время, зависящее только от длины alias
+        if not alias:
+            return
+
+        node: _AliasTrieNode | None = self.root
+        for c in alias.lower():
+            node = node.children.get(c)
+            if node is None:
+                return
+
+        if node.exact is not None:
+            return self.value_by_key[node.exact]
+
+        if len(node.values) == 1:
+            return self.value_by_key[node.values[0]]
+
+        raise MultipleResultsFoundError(alias=alias, variants=node.values)
+
+
+class AliasIndex:
+    def __init__(self, supported: Iterable[str], is_fuzzy: bool = True) -> None:
+        self.supported: list[str] = list(supported)
+
+        # NOTE: Поиск с опечатками подходит для имен и действий, но не для версий:
+        #       у похожих версий расстояние маленькое, и 3.2.9 нашлась бы как 3.2.8
+        self.is_fuzzy: bool = is_fuzzy
+
+        self._trie = _AliasTrie()
+        # Значения, набранные в другой раскладке клавиатуры
+        self._shadow_trie = _AliasTrie()
+
+        for x, variants in zip(self.supported, get_variants_many(self.supported)):
+            self._trie.add(x, x)
+            for variant in variants:
+                self._shadow_trie.add(variant, x)
+
+        # Для поиска с опечатками по максимальному расстоянию, создаются при первом обращении
+        self._fuzzy_indexes: dict[int, DeletionIndex] = dict()
+        self._values_by_fuzzy_key: dict[str, list[str]] = dict()
+
+    def _find_fuzzy(self, alias: str, max_distance: int, index_distance: int) -> str | None:
+        if index_distance not in self._fuzzy_indexes:
+            self._values_by_fuzzy_key.clear()
+            for x in self.supported:
+                self._values_by_fuzzy_key.setdefault(x.lower(), []).append(x)
+
+            self._fuzzy_indexes[index_distance] = DeletionIndex(
+                self._values_by_fuzzy_key, index_distance
+            )
+
+        index: DeletionIndex = self._fuzzy_indexes[index_distance]
+
+        # NOTE: В индексе только значения как есть, поэтому вместо значений
+        #       в другой раскладке ищется сам алиас в другой раскладке
+        found: list[tuple[int, str]] = sorted(
+            item
+            for x in [alias, *get_variants(alias)]
+            for item in index.search(x.lower(), max_distance)
+        )
+        if not found:
+            return
+
+        # Подходят только самые близкие значения
+        min_distance: int = found[0][0]
+        variants: list[str] = []
+        for distance, key in found:
+            if distance != min_distance:
+                break
+
+            for value in self._values_by_fuzzy_key[key]:
+                if value not in variants:
+                    variants.append(value)
+
+        if len(variants) == 1:
+            return variants[0]
+
+        variants.sort(key=self.supported.index)
+        raise MultipleResultsFoundError(alias=alias, variants=variants)
+
+    def resolve(
+        self,
+        alias: str,
+        unknown_alias_exception_cls: Type[
+            UnknownArgException
+            | UnknownNameException
+            | UnknownActionException
+            | UnknownVersionException
+        ],
+        fuzzy_distance: int | None = None,
+    ) -> str:
+        with profiler.span("resolve alias", "alias", alias=alias):
+            if not alias:
+                raise unknown_alias_exception_cls(alias, self.supported)
+
+            key: str | None = self._trie.find(alias)
+            if key:
+                return key
+
+            # Попробуем найти среди транслитерованных
+            key = self._shadow_trie.find(alias)
+            if key:
+                return key
+
+            # Попробуем найти с опечатками, для коротких алиасов допускается меньше исправлений
+            if fuzzy_distance is None:
+                fuzzy_distance = ALIAS_FUZZY_DISTANCE
+            max_distance: int = min(fuzzy_distance, (len(alias) - 1) // 2)
+            if self.is_fuzzy and max_distance > 0:
+                key = self._find_fuzzy(alias, max_distance, fuzzy_distance)
+                if key:
+                    return key
+
+            raise unknown_alias_exception_cls(alias, self.supported)
+
+
 def resolve_alias(
     alias: str,
     supported: list[str],
@@ -136,19 +295,10 @@ def resolve_alias(
         | UnknownActionException
         | UnknownVersionException
     ],
+    fuzzy_distance: int | None = None,
 ) -> str:
-    shadow_supported: dict[str, str] = {from_ghbdtn(x): x for x in supported}
-
-    key: str | None = get_similar_value(alias, supported)
-    if key:
-        return key
-
-    # Попробуем найти среди транслитерованных
-    key = get_similar_value(alias, shadow_supported)
-    if not key:
-        raise unknown_alias_exception_cls(alias, supported)
-
-    return shadow_supported[key]
+    # NOTE: Для часто используемых наборов значений лучше заранее создать AliasIndex
+    return AliasIndex(supported).resolve(alias, unknown_alias_exception_cls, fuzzy_distance)
 
 
 def is_like_a_short_version(value: str) -> bool:
@@ -156,12 +306,14 @@ def is_like_a_short_version(value: str) -> bool:
     return value.isdigit()
 
 
+TRUNK: str = "trunk"
+TRUNK_ALIASES: list[str] = [TRUNK, *get_variants(TRUNK)]  # "trunk", "екгтл"
+
+
 def is_like_a_version(value: str) -> bool:
-    trunk = "trunk"
-    trunk_invert = from_ghbdtn(trunk)  # "trunk" -> "екгтл"
     return (
-        trunk in value  # Для файлов
-        or bool(get_similar_value(value, [trunk, trunk_invert]))
+        TRUNK in value  # Для файлов
+        or bool(get_similar_value(value, TRUNK_ALIASES))
         or bool(re.search(r"\d+(\.\d+)+", value))
         or is_like_a_short_version(value)
         or "-" in value  # Example: "23-25" or "23-trunk"
@@ -171,10 +323,12 @@ def is_like_a_version(value: str) -> bool:
 
 def _open_path(file_name: str, dir_file_name: str | None = None) -> None:
     if sys.platform == "win32":
-        os.startfile(file_name, cwd=dir_file_name)
+        with profiler.span(f"startfile {file_name}", "subprocess"):
+            os.startfile(file_name, cwd=dir_file_name)
     else:
         opener = "open" if sys.platform == "darwin" else "xdg-open"
-        subprocess.call([opener, file_name], cwd=dir_file_name)
+        with profiler.span(f"{opener} {file_name}", "subprocess"):
+            subprocess.call([opener, file_name], cwd=dir_file_name)
 
 
 def run_file(file_name: Path | str) -> None:
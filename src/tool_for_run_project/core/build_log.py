@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Журналы запусков обновления и сборки версий (см. radix_update_compile_designer.py).
+#       Вывод пишется в gzip-файл блоками, каждый блок - отдельный gzip-член, поэтому его можно
+#       распаковать отдельно. В индексе запуска хранятся смещения блоков и номера строк с ошибками
+#       и предупреждениями, поэтому для вывода ошибок распаковываются только блоки с ними
+
+
+import gzip
+import os
+import re
+import threading
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from tool_for_run_project.core import cache
+
+
+DIR_LOGS: Path = cache.DIR_CACHE / "build_logs"
+
+# Размер несжатого блока, после которого он сжимается и записывается в файл
+CHUNK_SIZE_BYTES: int = 64 * 1024
+
+# Ротация журналов каждой версии: количество запусков и общий размер файлов
+MAX_RUNS: int = 20
+MAX_SIZE_BYTES: int = 50 * 1024 * 1024
+
+# NOTE: При изменении формата индекса нужно увеличить, чтобы старые журналы не читались
+INDEX_VERSION: int = 1
+
+PATTERN_ERROR: re.Pattern = re.compile(
+    r"\berror\b|BUILD FAILED|\bE\d{6}\b|^\s*(\[\w+\]\s*)?\S*(Exception|Error)\b",
+    flags=re.IGNORECASE,
+)
+PATTERN_WARNING: re.Pattern = re.compile(r"\bwarning\b|\bW\d{6}\b", flags=re.IGNORECASE)
+
+
+@dataclass
+class Chunk:
+    # Смещение в файле журнала и номер первой строки
+    offset: int
+    line: int
+
+
+@dataclass
+class Mark:
+    line: int
+    step: str | None
+    text: str
+
+
+@dataclass
+class RunIndex:
+    path: str
+    started: str
+    finished: str | None = None
+    is_success: bool | None = None
+    lines: int = 0
+    # Шаг -> номер первой строки
+    steps: dict[str, int] = field(default_factory=dict)
+    chunks: list[Chunk] = field(default_factory=list)
+    errors: list[Mark] = field(default_factory=list)
+    warnings: list[Mark] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "version": INDEX_VERSION,
+            "path": self.path,
+            "started": self.started,
+            "finished": self.finished,
+            "is_success": self.is_success,
+            "lines": self.lines,
+            "steps": self.steps,
+            "chunks": [[x.offset, x.line] for x in self.chunks],
+            "errors": [[x.line, x.step, x.text] for x in self.errors],
+            "warnings": [[x.line, x.step, x.text] for x in self.warnings],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RunIndex":
+        return cls(
+            path=data["path"],
+            started=data["started"],
+            finished=data["finished"],
+            is_success=data["is_success"],
+            lines=data["lines"],
+            steps=data["steps"],
+            chunks=[Chunk(*x) for x in data["chunks"]],
+            errors=[Mark(*x) for x in data["errors"]],
+            warnings=[Mark(*x) for x in data["warnings"]],
+        )
+
+
+def get_dir(path: Path | str) -> Path:
+    path = Path(path).resolve()
+    return DIR_LOGS / f"{path.name}_{cache.get_hash(str(path).lower())[:8]}"
+
+
+def get_index_path(path_log: Path) -> Path:
+    return path_log.with_name(path_log.name.removesuffix(".log.gz") + ".index.json")
+
+
+def get_logs(path: Path | str) -> list[Path]:
+    # Имена журналов начинаются с даты и времени запуска, поэтому сортировка по имени - по времени
+    return sorted(get_dir(path).glob("*.log.gz"))
+
+
+def rotate(
+    dir_logs: Path,
+    max_runs: int = MAX_RUNS,
+    max_size_bytes: int = MAX_SIZE_BYTES,
+) -> list[Path]:
+    items: list[tuple[Path, int]] = []
+    for path_log in sorted(dir_logs.glob("*.log.gz")):
+        size: int = sum(
+            path.stat().st_size
+            for path in [path_log, get_index_path(path_log)]
+            if path.exists()
+        )
+        items.append((path_log, size))
+
+    total_size: int = sum(size for _, size in items)
+
+    removed: list[Path] = []
+    for path_log, size in items:
+        if len(items) - len(removed) <= max_runs and total_size <= max_size_bytes:
+            break
+
+        path_log.unlink(missing_ok=True)
+        get_index_path(path_log).unlink(missing_ok=True)
+        removed.append(path_log)
+        total_size -= size
+
+    return removed
+
+
+class BuildLog:
+    def __init__(
+        self,
+        path: Path | str,
+        max_runs: int = MAX_RUNS,
+        max_size_bytes: int = MAX_SIZE_BYTES,
+    ) -> None:
+        dir_logs: Path = get_dir(path)
+        dir_logs.mkdir(parents=True, exist_ok=True)
+
+        # Место для нового журнала освобождается заранее
+        rotate(dir_logs, max_runs - 1, max_size_bytes)
+
+        now: datetime = datetime.now()
+        self.path_log: Path = dir_logs / f"{now:%Y-%m-%d_%H%M%S_%f}.log.gz"
+        self.index = RunIndex(path=str(path), started=now.isoformat(timespec="seconds"))
+
+        self._file = open(self.path_log, "wb")
+        self._buffer: list[bytes] = []
+        self._buffer_size: int = 0
+        self._step: str | None = None
+
+        # Строки могут приходить из нескольких потоков (stdout и stderr процессов)
+        self._lock = threading.Lock()
+
+    def start_step(self, name: str) -> None:
+        with self._lock:
+            # Индекс сохраняется и между шагами, чтобы журнал можно было прочитать,
+            # даже если окно сборки закрыли до окончания
+            self._flush()
+            self._save_index()
+
+            self._step = name
+            self.index.steps[name] = self.index.lines
+
+    def write(self, line: str) -> None:
+        line = line.rstrip("\r\n")
+
+        with self._lock:
+            number: int = self.index.lines
+            if not self._buffer:
+                self.index.chunks.append(Chunk(offset=self._file.tell(), line=number))
+
+            if PATTERN_ERROR.search(line):
+                self.index.errors.append(Mark(number, self._step, line[:500]))
+            elif PATTERN_WARNING.search(line):
+                self.index.warnings.append(Mark(number, self._step, line[:500]))
+
+            data: bytes = line.encode("utf-8", errors="replace") + b"\n"
+            self._buffer.append(data)
+            self._buffer_size += len(data)
+            self.index.lines += 1
+
+            if self._buffer_size >= CHUNK_SIZE_BYTES:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+
+        self._file.write(gzip.compress(b"".join(self._buffer), compresslevel=6))
+        self._file.flush()
+        self._buffer.clear()
+        self._buffer_size = 0
+
+    def close(self, is_success: bool | None = None) -> None:
+        with self._lock:
+            if self._file.closed:
+                return
+
+            self._flush()
+            self._file.close()
+
+            self.index.finished = datetime.now().isoformat(timespec="seconds")
+            self.index.is_success = is_success
+            self._save_index()
+
+    def _save_index(self) -> None:
+        cache.save_json(get_index_path(self.path_log), self.index.to_dict())
+
+    def __enter__(self) -> "BuildLog":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close(is_success=exc_type is None)
+
+
+def load_index(path_log: Path) -> RunIndex | None:
+    data: dict[str, Any] | None = cache.load_json(get_index_path(path_log))
+    if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+        return None
+
+    return RunIndex.from_dict(data)
+
+
+def read_chunk(path_log: Path, index: RunIndex, chunk_number: int) -> list[str]:
+    chunk: Chunk = index.chunks[chunk_number]
+    end: int | None = (
+        index.chunks[chunk_number + 1].offset
+        if chunk_number + 1 < len(index.chunks)
+        else None
+    )
+
+    with open(path_log, "rb") as f:
+        f.seek(chunk.offset)
+        data: bytes = f.read(end - chunk.offset if end is not None else -1)
+
+    # NOTE: Только по "\n", как при записи: splitlines делит и по "\r" и другим символам,
+    #       и номера строк сместились бы относительно индекса
+    return gzip.decompress(data).decode("utf-8").split("\n")[:-1]
+
+
+def read_lines(path_log: Path, index: RunIndex, start: int, end: int) -> Iterator[tuple[int, str]]:
+    # Распаковываются только блоки, в которые попадают строки [start, end)
+    for chunk_number, chunk in enumerate(index.chunks):
+        next_line: int = (
+            index.chunks[chunk_number + 1].line
+            if chunk_number + 1 < len(index.chunks)
+            else index.lines
+        )
+        if next_line <= start or chunk.line >= end:
+            continue
+
+        for number, line in enumerate(read_chunk(path_log, index, chunk_number), start=chunk.line):
+            if start <= number < end:
+                yield number, line
+
+
+def format_marks(
+    path_log: Path,
+    index: RunIndex,
+    marks: list[Mark],
+    context_lines: int = 2,
+) -> str:
+    lines: list[str] = []
+    for mark in marks:
+        lines.append(f"--- строка {mark.line + 1}" + (f" ({mark.step})" if mark.step else ""))
+        for number, line in read_lines(
+            path_log, index, mark.line - context_lines, mark.line + context_lines + 1
+        ):
+            lines.append(f"{'>' if number == mark.line else ' '} {number + 1:>6}: {line}")
+
+    return "\n".join(lines)
+
+
+def format_run(path_log: Path, index: RunIndex) -> str:
+    status: str = {True: "успешно", False: "ошибка", None: "не завершен"}[index.is_success]
+    steps: str = ", ".join(f"{name} (строка {line + 1})" for name, line in index.steps.items())
+    return (
+        f"{index.started} {status}: строк {index.lines}, ошибок {len(index.errors)}, "
+        f"предупреждений {len(index.warnings)}, {os.path.getsize(path_log)} байт\n"
+        f"  {path_log}\n"
+        f"  Шаги: {steps or '-'}"
+    )
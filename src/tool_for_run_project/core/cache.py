@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+
+from pathlib import Path
+from typing import Any, Iterable
+
+
+if path_cache_value := os.getenv("PATH_CACHE"):
+    DIR_CACHE: Path = Path(path_cache_value).resolve()
+else:
+    DIR_CACHE: Path = (
+        Path(os.getenv("LOCALAPPDATA") or os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache")
+        / "tool_for_run_project"
+    )
+
+
+def get_hash(data: bytes | str) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def get_mtime(path: Path | str) -> int | None:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_mtimes(paths: Iterable[Path | str]) -> dict[str, int | None]:
+    return {str(path): get_mtime(path) for path in paths}
+
+
+def is_changed_mtimes(mtimes: dict[str, int | None]) -> bool:
+    return any(get_mtime(path) != mtime for path, mtime in mtimes.items())
+
+
+def load(path: Path) -> Any | None:
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # Кэш необязателен - битый или несовместимый файл просто игнорируется
+        print(f"[#] Не удалось загрузить кэш {str(path)!r}: {e}")
+        return None
+
+
+def load_json(path: Path) -> Any | None:
+    try:
+        return json.loads(path.read_bytes())
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"[#] Не удалось загрузить кэш {str(path)!r}: {e}")
+        return None
+
+
+def _write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Запись через временный файл, чтобы параллельный запуск не прочитал файл наполовину.
+    # NOTE: В имени и поток, т.к. на сервере один файл могут сохранять несколько запросов сразу
+    path_tmp: Path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        path_tmp.write_bytes(data)
+        os.replace(path_tmp, path)
+    except Exception as e:
+        print(f"[#] Не удалось сохранить кэш {str(path)!r}: {e}")
+        path_tmp.unlink(missing_ok=True)
+
+
+def save(path: Path, obj: Any) -> None:
+    try:
+        data: bytes = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:
+        print(f"[#] Не удалось сохранить кэш {str(path)!r}: {e}")
+        return
+
+    save_bytes(path, data)
+
+
+def save_bytes(path: Path, data: bytes) -> None:
+    _write(path, data)
+
+
+def save_json(path: Path, obj: Any) -> None:
+    _write(path, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+import ast
+import re
+
+from dataclasses import dataclass, field
+from functools import cache
+from types import CodeType
+from typing import Any
+
+
+PATTERN_CODE_BLOCK = re.compile(r"^\$\{(.+)}$")
+
+# Путь до значения в настройках, например: ("tx", "actions", "update", 1)
+KeyPath = tuple[str | int, ...]
+
+
+@dataclass(frozen=True)
+class CodeBlock:
+    value: str
+    source: str
+    code: CodeType = field(repr=False)
+
+    # Пути значений, прочитанных через self, например: self['tx']['vars'] -> ("tx", "vars")
+    dependencies: tuple[KeyPath, ...] = ()
+
+    def eval(self, global_vars: dict[str, Any]) -> Any:
+        try:
+            return eval(self.code, global_vars)
+        except Exception:
+            raise Exception(f"Error on eval {self.source!r}, original {self.value!r}")
+
+
+def get_self_dependencies(tree: ast.AST) -> tuple[KeyPath, ...]:
+    dependencies: list[KeyPath] = []
+
+    def _get_key_path(node: ast.AST) -> KeyPath | None:
+        keys: list[str | int] = []
+        while isinstance(node, ast.Subscript):
+            if not isinstance(node.slice, ast.Constant) or not isinstance(
+                node.slice.value, (str, int)
+            ):
+                # Ключ вычисляется - учитывается только известная часть пути
+                keys.clear()
+            else:
+                keys.append(node.slice.value)
+            node = node.value
+
+        if isinstance(node, ast.Name) and node.id == "self":
+            return tuple(reversed(keys))
+
+        return None
+
+    def _visit(node: ast.AST) -> None:
+        if isinstance(node, ast.Subscript):
+            key_path: KeyPath | None = _get_key_path(node)
+            if key_path is not None:
+                if key_path and key_path not in dependencies:
+                    dependencies.append(key_path)
+                return
+
+        for child in ast.iter_child_nodes(node):
+            _visit(child)
+
+    _visit(tree)
+    return tuple(dependencies)
+
+
+@cache
+def compile_code_block(value: str) -> CodeBlock | None:
+    m = PATTERN_CODE_BLOCK.match(value)
+    if not m:
+        return None
+
+    source: str = m.group(1)
+    try:
+        tree: ast.Expression = ast.parse(source, mode="eval")
+    except SyntaxError:
+        raise Exception(f"Error on compile {source!r}, original {value!r}")
+
+    return CodeBlock(
+        value=value,
+        source=source,
+        code=compile(tree, filename=f"<{value}>", mode="eval"),
+        dependencies=get_self_dependencies(tree),
+    )
+
+
+def find_code_blocks(node: dict, key_path: KeyPath = ()) -> dict[KeyPath, CodeBlock]:
+    items: dict[KeyPath, CodeBlock] = dict()
+
+    for key, value in node.items():
+        match value:
+            case dict():
+                items.update(find_code_blocks(value, key_path + (key,)))
+
+            # Или строка, или список из двух строк
+            case str():
+                if code_block := compile_code_block(value):
+                    items[key_path + (key,)] = code_block
+
+            case [str(), str() as item]:
+                if code_block := compile_code_block(item):
+                    items[key_path + (key, 1)] = code_block
+
+    return items
+
+
+def is_related_key_paths(key_path_1: KeyPath, key_path_2: KeyPath) -> bool:
+    # Пути связаны, если один содержит другой (чтение словаря зависит от значений внутри него)
+    size: int = min(len(key_path_1), len(key_path_2))
+    return key_path_1[:size] == key_path_2[:size]
+
+
+def set_value(node: dict, key_path: KeyPath, value: Any) -> None:
+    # NOTE: Вложенные словари и списки могут быть общими с base и другими проектами,
+    #       поэтому по пути до значения они заменяются на копии
+    for key in key_path[:-1]:
+        node[key] = node[key].copy()
+        node = node[key]
+
+    node[key_path[-1]] = value
@@ -5,7 +5,6 @@ __author__ = "ipetrash"
 
 
 import enum
-import os
 import shutil
 import sys
 
@@ -14,40 +13,26 @@ from datetime import datetime
 from pathlib import Path
 from typing import Callable
 
-import psutil
-
+from tool_for_run_project.core import profiler
 from tool_for_run_project.core import (
+    AliasIndex,
     AvailabilityEnum,
     ParameterAvailabilityException,
     GoException,
     UnknownActionException,
     UnknownVersionException,
-    resolve_alias,
     is_like_a_short_version,
-    radix_update_compile_designer,
     _open_path,
     run_file,
 )
-from tool_for_run_project.core.jenkins import do_check_jenkins_job, JenkinsJobCheckException
-from tool_for_run_project.core.kill import (
-    kill_servers,
-    kill_explorers,
-    kill_designers,
-    get_processes,
-    is_server,
-    is_explorer,
-    is_designer,
-)
-from tool_for_run_project.core.utils import run_command_in_new_terminal
-from tool_for_run_project.core.svn.find_release_version import find_release_version
-from tool_for_run_project.core.svn.get_age import get_age as svn_get_age
-from tool_for_run_project.core.svn.get_last_release_version import (
-    get_last_release_version as get_last_release_version_svn,
+from tool_for_run_project.settings import (
+    get_project,
+    get_action_index,
+    get_version_index,
 )
-from tool_for_run_project.core.svn.search_by_versions import search as search_by_versions
-from tool_for_run_project.settings import get_project, get_path_by_name
 
-from tool_for_run_project.third_party.get_project_versions import process as run_get_project_versions
+# NOTE: Модули, нужные только для реализации действий (psutil, requests, svn и т.п.), импортируются
+#       внутри функций действий, чтобы не замедлять запуск, когда эти действия не вызываются
 
 
 ActionValue = str | list[str, str | Callable] | dict | Callable | None
@@ -60,11 +45,53 @@ class Command:
     action: str | None = None
     args: list[str] = field(default_factory=list)
 
-    def _check_parameter(self, param: str) -> None:
-        settings = get_project(self.name)
+    # Заполняются в resolve: настройки проекта, путь до версии (или проекта) и значение действия
+    project: dict | None = field(default=None, compare=False, repr=False)
+    path: str | None = field(default=None, compare=False, repr=False)
+    value: ActionValue = field(default=None, compare=False, repr=False)
+
+    @property
+    def is_resolved(self) -> bool:
+        return self.project is not None
+
+    def resolve(self, project: dict | None = None) -> "Command":
+        # NOTE: После разбора аргументов (см. go.parse_cmd_args) значения уже полные,
+        #       поэтому поиск по сокращениям нужен только для команд, созданных вручную
+        if project is None:
+            project = get_project(self.name)
+
+        if self.version:
+            versions: dict[str, str] = project.get("versions", dict())
+            if self.version not in versions:
+                self.version = resolve_version(self.name, self.version)
+            path: str = versions[self.version]
+        else:
+            path_value: str | list[str] = project["path"]
+            if isinstance(path_value, str):
+                path: str = path_value
+            else:
+                if not path_value:
+                    raise GoException(
+                        f"Пустое значение 'path' в настройках {self.name!r}"
+                    )
 
+                path: str = path_value[0]
+
+        value: ActionValue = None
+        if self.action:
+            actions: dict[str, ActionValue] = project["actions"]
+            if self.action not in actions:
+                self.action = resolve_actions(self.name, self.action)[0]
+            value = actions[self.action]
+
+        self.project = project
+        self.path = path
+        self.value = value
+        return self
+
+    def _check_parameter(self, param: str) -> None:
         value = getattr(self, param)
-        settings_param = settings["options"][param]
+        settings_param = self.project["options"][param]
         if settings_param == AvailabilityEnum.REQUIRED:
             if not value:
                 raise ParameterAvailabilityException(self, param, settings_param)
@@ -77,26 +104,16 @@ class Command:
         return self.args and "-f" in self.args
 
     def run(self) -> None:
-        settings: dict = get_project(self.name)
-        options: dict = settings["options"]
+        if not self.is_resolved:
+            self.resolve()
+
+        options: dict = self.project["options"]
 
         settings_params = ["version", "action", "args"]
         for param in settings_params:
             self._check_parameter(param)
 
-        if self.version:
-            path: str = get_similar_version_path(self.name, self.version)
-        else:
-            path_value: str | list[str] = get_path_by_name(self.name)
-            if isinstance(path_value, str):
-                path: str = path_value
-            else:
-                if not path_value:
-                    raise GoException(
-                        f"Пустое значение 'path' в настройках {self.name!r}"
-                    )
-
-                path: str = path_value[0]
+        path: str = self.path
 
         # Если по <name> указывается файл, то сразу его и запускаем
         if (Path(path).is_file() and not self.action and not self.args) or all(
@@ -105,7 +122,7 @@ class Command:
             run_file(path)
             return
 
-        value: ActionValue = get_file_by_action(self.name, self.action)
+        value: ActionValue = self.value
 
         # Если в <actions> функция, вызываем её
         if callable(value):
@@ -116,18 +133,13 @@ class Command:
             value(RunContext(self, path=path))
             return
 
-        dir_file_name: str = get_similar_version_path(self.name, self.version)
-
-        # Move to active dir
-        os.chdir(dir_file_name)
-
         # Получение из аргументов
         if isinstance(value, dict):
             arg: str = self.args[0]
             value: str = value[arg]
 
         if isinstance(value, str):
-            file_name = dir_file_name + "/" + value
+            file_name = path + "/" + value
             run_file(file_name)
             return
 
@@ -139,10 +151,92 @@ class Command:
             return
 
         find_string: str = " ".join(self.args) if self.args else ""
-        command: str = command.format(path=dir_file_name, find_string=find_string)
+        command: str = command.format(path=path, find_string=find_string)
+
+        from tool_for_run_project.core.utils import run_shell_command
+
+        print(f"Запуск: {description} в {path}")
+
+        # NOTE: Вместо смены текущей папки процесса, чтобы команды можно было запускать параллельно
+        run_shell_command(command, cwd=path)
+
+
+def get_command_title(command: Command) -> str:
+    return " ".join(
+        str(x) for x in [command.name, command.version, command.action, *command.args] if x
+    )
+
+
+def _get_run_many_func(commands: list[Command]) -> Callable | None:
+    # NOTE: Команды после разбора аргументов (см. go.parse_cmd_args) уже с найденными значениями действий
+    if len(commands) <= 1 or not all(command.is_resolved for command in commands):
+        return None
+
+    value: ActionValue = commands[0].value
+    if not callable(value) or any(command.value is not value for command in commands):
+        return None
+
+    return RUN_MANY_FUNCS.get(value)
+
 
-        print(f"Запуск: {description} в {dir_file_name}")
-        os.system(command)
+def run_commands(commands: list[Command], max_workers: int = 1) -> None:
+    # Действие для нескольких версий может выполняться одним вызовом (см. RUN_MANY_FUNCS)
+    if run_many_func := _get_run_many_func(commands):
+        for command in commands:
+            for param in ["version", "action", "args"]:
+                command._check_parameter(param)
+
+        print(f"Запуск: {commands[0].name} вызов {commands[0].action!r} для {len(commands)} версий")
+        with profiler.span(get_command_title(commands[0]), "command"):
+            run_many_func([RunContext(command, path=command.path) for command in commands])
+        return
+
+    if max_workers <= 1 or len(commands) <= 1:
+        for command in commands:
+            with profiler.span(get_command_title(command), "command"):
+                command.run()
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    from tool_for_run_project.core.output import thread_output
+
+    # Замеры потоков пула попадают в профиль текущего потока
+    profile: profiler.Profiler | None = profiler.get()
+
+    with thread_output() as output:
+
+        def _run(command: Command) -> tuple[str, Exception | None]:
+            with (
+                output.capture() as buffer,
+                profiler.use(profile),
+                profiler.span(get_command_title(command), "command"),
+            ):
+                try:
+                    command.run()
+                    return buffer.getvalue(), None
+                except Exception as e:
+                    return buffer.getvalue(), e
+
+        exceptions: list[Exception] = []
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(commands))) as executor:
+            futures = [executor.submit(_run, command) for command in commands]
+
+            # Вывод каждой команды выводится целиком и в исходном порядке команд
+            for i, (command, future) in enumerate(zip(commands, futures), start=1):
+                text, e = future.result()
+
+                print(f"[{i}/{len(commands)}] {get_command_title(command)}")
+                print(text, end="")
+                if e:
+                    # Первая ошибка будет выброшена после вывода всех команд
+                    if exceptions:
+                        print(f"Ошибка: {e}")
+                    exceptions.append(e)
+                print()
+
+    if exceptions:
+        raise exceptions[0]
 
 
 @dataclass
@@ -190,6 +284,8 @@ def open_path_dir(context: RunContext) -> None:
 
 
 def kill(context: RunContext) -> None:
+    from tool_for_run_project.core.kill import kill_servers, kill_explorers, kill_designers
+
     path: str = context.path
     args: list[str] = context.command.args
 
@@ -228,6 +324,10 @@ def kill(context: RunContext) -> None:
 
 
 def processes(context: RunContext) -> None:
+    import psutil
+
+    from tool_for_run_project.core.kill import get_processes, is_server, is_explorer, is_designer
+
     path: str = context.path
     args: list[str] = context.command.args
 
@@ -271,6 +371,10 @@ def processes(context: RunContext) -> None:
 
 
 def svn_get_last_release_version(context: RunContext) -> None:
+    from tool_for_run_project.core.svn.get_last_release_version import (
+        get_last_release_version as get_last_release_version_svn,
+    )
+
     command = context.command
     args: list[str] = command.args
     version: str | None = command.version
@@ -280,7 +384,7 @@ def svn_get_last_release_version(context: RunContext) -> None:
     if args and args[0].isdigit():
         last_days = int(args[0])
 
-    url_svn_path = get_project(command.name)["svn_dev_url"]
+    url_svn_path = command.project["svn_dev_url"]
 
     try:
         result = get_last_release_version_svn(
@@ -295,6 +399,8 @@ def svn_get_last_release_version(context: RunContext) -> None:
 
 
 def svn_find_release_versions(context: RunContext):
+    from tool_for_run_project.core.svn.find_release_version import find_release_version
+
     if context.command.version == "trunk":
         raise GoException("Команду нужно вызывать в релизных версиях!")
 
@@ -312,7 +418,7 @@ def svn_find_release_versions(context: RunContext):
     command = context.command
     version = command.version
 
-    url_svn_path = get_project(command.name)["svn_dev_url"]
+    url_svn_path = command.project["svn_dev_url"]
 
     try:
         result: str = find_release_version(
@@ -331,6 +437,8 @@ def svn_find_release_versions(context: RunContext):
 
 
 def svn_where(context: RunContext):
+    from tool_for_run_project.core.svn.search_by_versions import search as search_by_versions
+
     command = context.command
 
     args: list[str] = command.args
@@ -344,7 +452,7 @@ def svn_where(context: RunContext):
     if len(args) > 1 and args[1].isdigit():
         last_days = int(args[1])
 
-    url_svn_path = get_project(command.name)["svn_dev_url"]
+    url_svn_path = command.project["svn_dev_url"]
 
     versions: list[str] = search_by_versions(
         text=text,
@@ -359,6 +467,8 @@ def svn_where(context: RunContext):
 
 
 def svn_get_age_of_version(context: RunContext) -> None:
+    from tool_for_run_project.core.svn.get_age import get_age as svn_get_age
+
     command = context.command
     version: str | None = command.version
 
@@ -373,7 +483,7 @@ def svn_get_age_of_version(context: RunContext) -> None:
         )
         return
 
-    url_svn_path = get_project(command.name)["svn_dev_url"]
+    url_svn_path = command.project["svn_dev_url"]
     result: str = svn_get_age(
         version=version,
         url_svn_path=url_svn_path,
@@ -383,6 +493,8 @@ def svn_get_age_of_version(context: RunContext) -> None:
 
 
 def get_versions_of_version(context: RunContext) -> None:
+    from tool_for_run_project.third_party.get_project_versions import process as run_get_project_versions
+
     run_get_project_versions(Path(context.path))
 
 
@@ -430,12 +542,13 @@ def manager_clean(context: RunContext) -> None:
 
 
 def svn_update(context: RunContext) -> None:
+    from tool_for_run_project.core.jenkins import do_check_jenkins_job, JenkinsJobCheckException
+    from tool_for_run_project.core.utils import run_shell_command
+
     path: str = context.path
     command = context.command
 
-    settings = get_project(command.name)
-
-    jenkins_url = settings.get("jenkins_url")
+    jenkins_url = command.project.get("jenkins_url")
     if jenkins_url:
         try:
             do_check_jenkins_job(jenkins_url, command.version)
@@ -452,15 +565,136 @@ def svn_update(context: RunContext) -> None:
     title = f"{context.description} в {path}".strip()
 
     print(f"Запуск: {title}")
-    os.system(command_svn)
+    run_shell_command(command_svn, cwd=path)
+
+
+MAX_IO_FLAG: str = "--max-io"
+
+
+def get_max_io_arg(args: list[str]) -> str | None:
+    # Например: go tx 34-36 !full --max-io 3 или --max-io=3
+    for i, arg in enumerate(args):
+        flag, sep, value = arg.partition("=")
+        if flag != MAX_IO_FLAG:
+            continue
+
+        if not sep:
+            value = args[i + 1] if i + 1 < len(args) else ""
+
+        if not value.isdigit() or int(value) < 1:
+            raise GoException(f"После {MAX_IO_FLAG} нужно указать количество одновременных сборок")
+
+        return value
+
+    return None
+
+
+def get_radix_update_compile_designer_args(contexts: list[RunContext]) -> list[str]:
+    from tool_for_run_project.core import radix_update_compile_designer
+
+    args: list[str] = [
+        sys.executable,
+        radix_update_compile_designer.__file__,
+        *dict.fromkeys(x.path for x in contexts),
+        "--name",
+        contexts[0].command.name,
+    ]
+
+    # Пересборка всех шагов, даже если с прошлой успешной сборки ничего не изменилось
+    if any(context.command.is_forced() for context in contexts):
+        args.append("--full")
+
+    for context in contexts:
+        if max_io := get_max_io_arg(context.command.args or []):
+            args += [MAX_IO_FLAG, max_io]
+            break
+
+    return args
 
 
 def run_radix_update_compile_designer(context: RunContext) -> None:
-    path: str = context.path
-    script_path: str = radix_update_compile_designer.__file__
+    from tool_for_run_project.core.utils import run_command_in_new_terminal
+
+    run_command_in_new_terminal(get_radix_update_compile_designer_args([context]))
+
+
+def run_radix_update_compile_designer_many(contexts: list[RunContext]) -> None:
+    from tool_for_run_project.core.utils import run_command_in_new_terminal
+
+    # Все версии обновляются и собираются параллельно в одном окне
+    run_command_in_new_terminal(get_radix_update_compile_designer_args(contexts))
 
-    args: list[str] = [sys.executable, script_path, path]
-    run_command_in_new_terminal(args)
+
+def show_build_log(context: RunContext) -> None:
+    from tool_for_run_project.core import build_log
+
+    args: list[str] = context.command.args
+
+    logs: list[Path] = build_log.get_logs(context.path)
+    if not logs:
+        print(f"Не найдены журналы сборки для {context.path}")
+        return
+
+    path_log: Path = logs[-1]
+    index: build_log.RunIndex | None = build_log.load_index(path_log)
+    if not index:
+        print(f"Не найден индекс журнала {path_log}")
+        return
+
+    # NOTE: Без короткого -e, т.к. это флаг вывода ошибки со стеком (см. go.run)
+    if "--errors" in args:
+        print(f"Ошибки ({len(index.errors)}):")
+        print(build_log.format_marks(path_log, index, index.errors))
+        return
+
+    if "--warnings" in args or "-w" in args:
+        print(f"Предупреждения ({len(index.warnings)}):")
+        print(build_log.format_marks(path_log, index, index.warnings))
+        return
+
+    print(f"Журналы сборки ({len(logs)}), последний в конце:")
+    for path in logs:
+        if index := build_log.load_index(path):
+            print(build_log.format_run(path, index))
+
+
+def show_step_report(context: RunContext) -> None:
+    from tool_for_run_project.core import step_history
+    from tool_for_run_project.core.radix_update_compile_designer import format_seconds
+
+    # NOTE: Версия по умолчанию подставляется всегда, поэтому только по версии - с аргументом -v
+    version: str | None = Path(context.path).name if "-v" in context.command.args else None
+
+    items: list[step_history.StepStats] = [
+        x
+        for x in step_history.get_stats(context.command.name)
+        if version is None or x.version == version
+    ]
+    if not items:
+        print(f"Не найдена история шагов сборки для {context.command.name}")
+        return
+
+    def _format(x: step_history.StepStats) -> str:
+        return (
+            f"  {x.version:<20} {x.step:<15} медиана {format_seconds(x.median_secs):>8}"
+            f" ({x.runs} зап.), последний {format_seconds(x.last_secs):>8}"
+        )
+
+    print("Самые долгие шаги:")
+    for x in sorted(items, key=lambda x: x.median_secs, reverse=True)[:10]:
+        print(_format(x))
+
+    regressions: list[step_history.StepStats] = [x for x in items if x.is_regression]
+    print(f"\nРегрессии ({len(regressions)}):")
+    for x in regressions:
+        print(f"{_format(x)}, раньше {format_seconds(x.previous_median_secs)}")
+
+
+# NOTE: Функции действий, которые для нескольких команд (например, "go tx 34-36 full")
+#       вызываются один раз со всеми командами, вместо вызова для каждой команды
+RUN_MANY_FUNCS: dict[Callable, Callable[[list[RunContext]], None]] = {
+    run_radix_update_compile_designer: run_radix_update_compile_designer_many,
+}
 
 
 def resolve_actions(name: str, alias: str | None) -> list[str]:
@@ -468,14 +702,10 @@ def resolve_actions(name: str, alias: str | None) -> list[str]:
     if not alias:
         return items
 
-    supported: list[str] = list(get_project(name)["actions"])
+    index: AliasIndex = get_action_index(name)
 
     for alias_action in alias.split("+"):
-        action: str = resolve_alias(
-            alias=alias_action,
-            supported=supported,
-            unknown_alias_exception_cls=UnknownActionException,
-        )
+        action: str = index.resolve(alias_action, UnknownActionException)
         items.append(action)
 
     return items
@@ -494,30 +724,10 @@ def resolve_version(name: str, alias: str) -> str:
             )
             raise GoException(text)
 
-        # Составление полной версии
-
-        # Для списка нужно будет перебрать доступные версии по шаблону
-        if isinstance(base_version, list):
-            for v in base_version:
-                full_alias = v.format(number=alias)
-                try:
-                    return resolve_alias(
-                        alias=full_alias,
-                        supported=settings["versions"],
-                        unknown_alias_exception_cls=UnknownVersionException,
-                    )
-                except UnknownVersionException:
-                    pass
+        # Полная версия ищется по заранее составленному индексу версий по шаблонам
+        return get_version_index(name).resolve_short_version(alias)
 
-            raise UnknownVersionException(alias, supported=settings["versions"])
-
-        alias = base_version.format(number=alias)
-
-    return resolve_alias(
-        alias=alias,
-        supported=settings["versions"],
-        unknown_alias_exception_cls=UnknownVersionException,
-    )
+    return get_version_index(name).aliases.resolve(alias, UnknownVersionException)
 
 
 def get_file_by_action(name: str, alias: str | None) -> ActionValue:
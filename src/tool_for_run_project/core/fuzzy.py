@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+from typing import Iterable
+
+
+def get_distance(a: str, b: str, max_distance: int | None = None) -> int:
+    # Расстояние Дамерау-Левенштейна в варианте OSA: вставка, удаление, замена
+    # и перестановка соседних символов, например "desinger" -> "designer" это 1.
+    # Если расстояние больше max_distance, то вернется max_distance + 1
+    if max_distance is None:
+        max_distance = len(a) + len(b)
+
+    if a == b:
+        return 0
+
+    out_of_range: int = max_distance + 1
+    if abs(len(a) - len(b)) > max_distance:
+        return out_of_range
+
+    if not a or not b:
+        return max(len(a), len(b))
+
+    # Считаются только ячейки рядом с диагональью, остальные заведомо больше max_distance
+    prev_prev_row: list[int] = []
+    prev_row: list[int] = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        c_a: str = a[i - 1]
+
+        row: list[int] = [out_of_range] * (len(b) + 1)
+        row[0] = i
+
+        start: int = max(1, i - max_distance)
+        end: int = min(len(b), i + max_distance)
+
+        row_min: int = i if start == 1 else out_of_range
+        for j in range(start, end + 1):
+            c_b: str = b[j - 1]
+            if c_a == c_b:
+                value: int = prev_row[j - 1]
+            else:
+                value: int = min(prev_row[j - 1], prev_row[j], row[j - 1]) + 1
+
+                # Перестановка соседних символов
+                if i > 1 and j > 1 and c_a == b[j - 2] and a[i - 2] == c_b:
+                    value = min(value, prev_prev_row[j - 2] + 1)
+
+            row[j] = value
+            row_min = min(row_min, value)
+
+        # Дальше расстояние может только расти
+        if row_min > max_distance:
+            return out_of_range
+
+        prev_prev_row, prev_row = prev_row, row
+
+    return min(prev_row[-1], out_of_range)
+
+
+def get_deletions(word: str, max_distance: int) -> set[str]:
+    # Все строки, получаемые удалением до max_distance символов
+    items: set[str] = {word}
+
+    level: set[str] = {word}
+    for _ in range(max_distance):
+        level = {x[:i] + x[i + 1:] for x in level for i in range(len(x))}
+        items |= level
+
+    return items
+
+
+class DeletionIndex:
+    # Индекс для поиска с опечатками: у двух слов на расстоянии до N обязательно найдется
+    # общая строка, полученная удалением не более N символов из каждого.
+    # Поэтому кандидаты ищутся по словарю, а точное расстояние считается только для них
+    def __init__(self, words: Iterable[str], max_distance: int) -> None:
+        self.max_distance: int = max_distance
+        self.words_by_deletion: dict[str, list[str]] = dict()
+
+        for word in dict.fromkeys(words):
+            for deletion in get_deletions(word, max_distance):
+                self.words_by_deletion.setdefault(deletion, []).append(word)
+
+    def search(self, word: str, max_distance: int | None = None) -> list[tuple[int, str]]:
+        if max_distance is None:
+            max_distance = self.max_distance
+
+        if max_distance > self.max_distance:
+            raise ValueError(
+                f"Индекс создан для расстояния до {self.max_distance}, а не {max_distance}"
+            )
+
+        candidates: dict[str, None] = dict()
+        for deletion in get_deletions(word, max_distance):
+            candidates.update(dict.fromkeys(self.words_by_deletion.get(deletion, [])))
+
+        items: list[tuple[int, str]] = []
+        for candidate in candidates:
+            distance: int = get_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                items.append((distance, candidate))
+
+        items.sort()
+        return items
@@ -9,7 +9,7 @@ from typing import Any
 
 import requests
 
-from tool_for_run_project.core import GoException
+from tool_for_run_project.core import GoException, profiler
 
 
 class JenkinsJobCheckException(GoException):
@@ -27,7 +27,8 @@ requests.packages.urllib3.disable_warnings(
 def do_check_jenkins_job(url: str, version: str):
     url: str = url.format(version=version)
 
-    rs = requests.get(url, verify=False)
+    with profiler.span(f"GET {url}", "http"):
+        rs = requests.get(url, verify=False)
     if rs.status_code == 404:
         print(f"[!] Сборки для версии {version} нет.")
         return
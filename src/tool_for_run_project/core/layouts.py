@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+from typing import Iterable
+
+
+# Символы раскладок в порядке клавиш на клавиатуре: у одной клавиши одинаковая позиция в строке
+LAYOUTS: dict[str, str] = dict()
+
+# Таблицы для str.translate по паре раскладок (откуда, куда), составляются один раз при регистрации
+TABLES: dict[tuple[str, str], dict[int, int]] = dict()
+
+# NOTE: Символ, которого нет в раскладках, для перевода списка строк за один вызов translate
+SEPARATOR: str = "\0"
+
+
+def register_layout(name: str, chars: str) -> None:
+    for other_name, other_chars in LAYOUTS.items():
+        if other_name == name:
+            continue
+
+        if len(chars) != len(other_chars):
+            raise ValueError(
+                f"Раскладки {name!r} и {other_name!r} должны быть одной длины: "
+                f"{len(chars)} != {len(other_chars)}"
+            )
+
+    if SEPARATOR in chars:
+        raise ValueError(f"Раскладка {name!r} не должна содержать {SEPARATOR!r}")
+
+    LAYOUTS[name] = chars
+
+    for other_name, other_chars in LAYOUTS.items():
+        if other_name == name:
+            continue
+
+        TABLES[name, other_name] = str.maketrans(dict(zip(chars, other_chars)))
+        TABLES[other_name, name] = str.maketrans(dict(zip(other_chars, chars)))
+
+
+def get_table(from_layout: str, to_layout: str) -> dict[int, int]:
+    try:
+        return TABLES[from_layout, to_layout]
+    except KeyError:
+        raise ValueError(
+            f"Нет таблицы для раскладок {from_layout!r} -> {to_layout!r}, "
+            f"зарегистрированы: {', '.join(LAYOUTS)}"
+        )
+
+
+def convert(text: str, from_layout: str = "en", to_layout: str = "ru") -> str:
+    return text.translate(get_table(from_layout, to_layout))
+
+
+def convert_many(
+    items: Iterable[str],
+    from_layout: str = "en",
+    to_layout: str = "ru",
+) -> list[str]:
+    items: list[str] = list(items)
+    if not items:
+        return []
+
+    # Один вызов translate для всего списка быстрее, чем вызов на каждую строку
+    table: dict[int, int] = get_table(from_layout, to_layout)
+    result: list[str] = SEPARATOR.join(items).translate(table).split(SEPARATOR)
+
+    # Если разделитель был в самих строках
+    if len(result) != len(items):
+        return [x.translate(table) for x in items]
+
+    return result
+
+
+def get_variants_many(items: Iterable[str]) -> list[list[str]]:
+    # Варианты каждой строки, набранной не в той раскладке, во всех направлениях, без повторов
+    items: list[str] = list(items)
+
+    variants: list[list[str]] = [[] for _ in items]
+    for from_layout, to_layout in TABLES:
+        for i, converted in enumerate(convert_many(items, from_layout, to_layout)):
+            if converted != items[i] and converted not in variants[i]:
+                variants[i].append(converted)
+
+    return variants
+
+
+def get_variants(text: str) -> list[str]:
+    return get_variants_many([text])[0]
+
+
+register_layout(
+    "en",
+    """qwertyuiop[]asdfghjkl;'zxcvbnm,./`QWERTYUIOP{}ASDFGHJKL:"ZXCVBNM<>?~""",
+)
+register_layout(
+    "ru",
+    """йцукенгшщзхъфывапролджэячсмитьбю.ёЙЦУКЕНГШЩЗХЪФЫВАПРОЛДЖЭЯЧСМИТЬБЮ,Ё""",
+)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+import io
+import sys
+import threading
+
+from contextlib import contextmanager
+from typing import Iterator, TextIO
+
+
+class ThreadOutput(io.TextIOBase):
+    # Подменяет sys.stdout: вывод потоков с заданным потоком вывода (или буфером) попадает в него,
+    # вывод остальных потоков - в исходный поток вывода
+    def __init__(self, stream: TextIO) -> None:
+        self.stream: TextIO = stream
+        self._local = threading.local()
+
+    def _get_stream(self) -> TextIO:
+        return getattr(self._local, "stream", None) or self.stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        return self._get_stream().write(text)
+
+    def flush(self) -> None:
+        self._get_stream().flush()
+
+    @contextmanager
+    def redirect(self, stream: TextIO) -> Iterator[TextIO]:
+        prev_stream: TextIO | None = getattr(self._local, "stream", None)
+        self._local.stream = stream
+        try:
+            yield stream
+        finally:
+            self._local.stream = prev_stream
+
+    @contextmanager
+    def capture(self) -> Iterator[io.StringIO]:
+        with self.redirect(io.StringIO()) as buffer:
+            yield buffer
+
+
+class ThreadInput(io.TextIOBase):
+    # Подменяет sys.stdin: потоки с заданным потоком ввода читают из него, остальные - из исходного
+    def __init__(self, stream: TextIO) -> None:
+        self.stream: TextIO = stream
+        self._local = threading.local()
+
+    def _get_stream(self) -> TextIO:
+        return getattr(self._local, "stream", None) or self.stream
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int | None = -1) -> str:
+        return self._get_stream().read(size)
+
+    def readline(self, size: int | None = -1) -> str:
+        return self._get_stream().readline(size)
+
+    @contextmanager
+    def redirect(self, stream: TextIO) -> Iterator[TextIO]:
+        prev_stream: TextIO | None = getattr(self._local, "stream", None)
+        self._local.stream = stream
+        try:
+            yield stream
+        finally:
+            self._local.stream = prev_stream
+
+
+@contextmanager
+def thread_output() -> Iterator[ThreadOutput]:
+    stdout: TextIO = sys.stdout
+
+    # NOTE: Если sys.stdout уже подменен (например, на сервере), то подмена общая для всех потоков,
+    #       иначе параллельные вызовы восстанавливали бы sys.stdout не в том порядке
+    if isinstance(stdout, ThreadOutput):
+        yield stdout
+        return
+
+    output = ThreadOutput(stdout)
+    sys.stdout = output
+    try:
+        yield output
+    finally:
+        sys.stdout = stdout
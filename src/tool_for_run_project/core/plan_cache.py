@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Кэш результата разбора аргументов (см. go.parse_cmd_args): для повторной команды сразу берутся
+#       готовые команды с путями и значениями действий. Запись кэша действительна, пока не изменились
+#       файл настроек и папки версий проектов команд. Старые записи удаляются, когда кэш превышает размер
+
+
+import os
+import pickle
+
+from pathlib import Path
+from typing import Any
+
+from tool_for_run_project import settings
+from tool_for_run_project.core import ALIAS_FUZZY_DISTANCE, cache, profiler
+from tool_for_run_project.core.commands import Command
+
+
+# NOTE: При изменении формата записей нужно увеличить, чтобы старый кэш не использовался
+CACHE_VERSION: int = 1
+
+DIR_PLANS: Path = cache.DIR_CACHE / "plans"
+
+# Максимальный размер всех записей, при превышении удаляются давно не использованные
+MAX_SIZE_BYTES: int = 1024 * 1024
+
+
+def get_path(args: list[str]) -> Path:
+    # NOTE: Поиск с опечатками может изменить результат разбора тех же аргументов
+    key: str = "\0".join([str(settings.PATH_SETTINGS), str(ALIAS_FUZZY_DISTANCE), *args])
+    return DIR_PLANS / f"{cache.get_hash(key)[:32]}.pickle"
+
+
+def load(args: list[str]) -> list[Command] | None:
+    path: Path = get_path(args)
+
+    with profiler.span("load plan cache", "disk"):
+        if not path.exists():
+            return None
+
+        data: dict[str, Any] | None = cache.load(path)
+        if (
+            not isinstance(data, dict)
+            or data.get("version") != CACHE_VERSION
+            or data.get("settings_hash") != settings.get_settings_hash()
+            or cache.is_changed_mtimes(data["mtimes"])
+        ):
+            path.unlink(missing_ok=True)
+            return None
+
+    # Для вытеснения давно не использованных записей
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+    return data["commands"]
+
+
+def save(args: list[str], commands: list[Command]) -> None:
+    # Время изменения папок версий на момент обработки проектов команд
+    mtimes: dict[str, int | None] = dict()
+    for name in dict.fromkeys(command.name for command in commands):
+        mtimes.update(settings.SETTINGS.get_mtimes(name))
+
+    with profiler.span("save plan cache", "disk"):
+        try:
+            data: bytes = pickle.dumps(
+                {
+                    "version": CACHE_VERSION,
+                    "settings_hash": settings.get_settings_hash(),
+                    "mtimes": mtimes,
+                    "commands": commands,
+                },
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        except Exception:
+            # NOTE: Значение действия из блока кода может быть несохраняемым (например, функцией),
+            #       такие команды просто разбираются при каждом запуске
+            return
+
+        cache.save_bytes(get_path(args), data)
+        evict()
+
+
+def evict(max_size_bytes: int = MAX_SIZE_BYTES) -> list[Path]:
+    try:
+        with os.scandir(DIR_PLANS) as it:
+            items: list[tuple[float, int, str]] = [
+                (stat.st_mtime, stat.st_size, entry.path)
+                for entry in it
+                if entry.is_file() and (stat := entry.stat())
+            ]
+    except OSError:
+        return []
+
+    total_size: int = sum(size for _, size, _ in items)
+
+    removed: list[Path] = []
+    for _, size, path in sorted(items):
+        if total_size <= max_size_bytes:
+            break
+
+        Path(path).unlink(missing_ok=True)
+        removed.append(Path(path))
+        total_size -= size
+
+    return removed
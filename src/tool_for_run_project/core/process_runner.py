@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Запуск нескольких внешних процессов одновременно с построчной передачей их вывода.
+#       Вывод не накапливается: строки сразу отдаются в функции обратного вызова, а для результата
+#       хранятся только последние строки, поэтому длинная сборка не занимает память
+
+
+import asyncio
+
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from timeit import default_timer
+from typing import Callable
+
+
+# Максимальная длина строки в байтах, более длинные строки отдаются частями
+LINE_LIMIT_BYTES: int = 64 * 1024
+
+# Сколько последних строк вывода хранится в результате
+TAIL_LINES: int = 100
+
+
+@dataclass
+class ProcessTask:
+    command: str | list[str]
+    directory: Path | str | None = None
+    encoding: str = "utf-8"
+    on_out_line_func: Callable[[str], None] = print
+    # Если не задана, строки stderr передаются в on_out_line_func
+    on_err_line_func: Callable[[str], None] | None = None
+    # Если задана, вызывается для строк stdout и stderr в байтах, до декодирования
+    on_raw_line_func: Callable[[bytes], None] | None = None
+    # Кодировка для строк, которые не удалось декодировать в encoding
+    fallback_encoding: str | None = None
+    timeout: float | None = None
+
+
+@dataclass
+class ProcessResult:
+    command: str | list[str]
+    return_code: int | None = None
+    elapsed_secs: float = 0.0
+    is_timeout: bool = False
+    # Последние строки stdout и stderr в порядке получения
+    tail: deque[str] = field(default_factory=lambda: deque(maxlen=TAIL_LINES))
+
+    @property
+    def is_success(self) -> bool:
+        return self.return_code == 0 and not self.is_timeout
+
+
+def decode(data: bytes, encoding: str, fallback_encoding: str | None = None) -> str:
+    if fallback_encoding:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            encoding = fallback_encoding
+
+    return data.decode(encoding, errors="replace")
+
+
+async def _read_lines(
+    stream: asyncio.StreamReader,
+    task: ProcessTask,
+    on_line_func: Callable[[str], None],
+    tail: deque[str],
+) -> None:
+    while True:
+        try:
+            data: bytes = await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:  # Конец вывода
+            data: bytes = e.partial
+            if not data:
+                return
+        except asyncio.LimitOverrunError:
+            # Слишком длинная строка - отдается часть, остальное будет прочитано дальше
+            data: bytes = await stream.read(LINE_LIMIT_BYTES)
+
+        if task.on_raw_line_func:
+            task.on_raw_line_func(data)
+
+        line: str = decode(data, task.encoding, task.fallback_encoding)
+        tail.append(line)
+        on_line_func(line)
+
+
+async def run_process(task: ProcessTask) -> ProcessResult:
+    result = ProcessResult(command=task.command)
+    start_time: float = default_timer()
+
+    kwargs = dict(
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=task.directory,
+        limit=LINE_LIMIT_BYTES,
+    )
+    if isinstance(task.command, str):
+        process = await asyncio.create_subprocess_shell(task.command, **kwargs)
+    else:
+        process = await asyncio.create_subprocess_exec(*task.command, **kwargs)
+
+    readers = asyncio.gather(
+        _read_lines(process.stdout, task, task.on_out_line_func, result.tail),
+        _read_lines(
+            process.stderr,
+            task,
+            task.on_err_line_func or task.on_out_line_func,
+            result.tail,
+        ),
+    )
+    try:
+        await asyncio.wait_for(asyncio.shield(readers), task.timeout)
+    except asyncio.TimeoutError:
+        # Зависший процесс не должен держать остальные.
+        # NOTE: Дочерние процессы оболочки могут держать вывод открытым, поэтому чтение прерывается
+        result.is_timeout = True
+        process.kill()
+        readers.cancel()
+        try:
+            await readers
+        except asyncio.CancelledError:
+            pass
+
+    result.return_code = await process.wait()
+    result.elapsed_secs = default_timer() - start_time
+    return result
+
+
+async def run_processes(
+    tasks: list[ProcessTask],
+    max_workers: int | None = None,
+) -> list[ProcessResult]:
+    semaphore = asyncio.Semaphore(max_workers or len(tasks) or 1)
+
+    async def _run(task: ProcessTask) -> ProcessResult:
+        async with semaphore:
+            return await run_process(task)
+
+    return list(await asyncio.gather(*map(_run, tasks)))
+
+
+def run_processes_sync(
+    tasks: list[ProcessTask],
+    max_workers: int | None = None,
+) -> list[ProcessResult]:
+    return asyncio.run(run_processes(tasks, max_workers))
+
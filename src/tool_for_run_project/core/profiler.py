@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Замер времени этапов запуска go (см. флаг --profile). Пока профилирование не включено,
+#       span возвращает один и тот же пустой контекстный менеджер, поэтому замеры почти ничего не стоят
+
+
+import os
+import threading
+
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from timeit import default_timer
+from typing import Any, ContextManager, Iterator
+
+
+# Время импорта модулей и чтения файла настроек при запуске (см. go.py)
+STARTUP: tuple[float, float] | None = None
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    start: float
+    end: float = 0.0
+    depth: int = 0
+    thread_id: int = 0
+    args: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def elapsed_secs(self) -> float:
+        return self.end - self.start
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.start: float = default_timer()
+        self.spans: list[Span] = []
+
+        # Вложенность замеров в каждом потоке
+        self._local = threading.local()
+
+    def add(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        /,
+        **args: Any,
+    ) -> Span:
+        item = Span(
+            name=name,
+            category=category,
+            start=start,
+            end=end,
+            depth=getattr(self._local, "depth", 0),
+            thread_id=threading.get_ident(),
+            args=args,
+        )
+        self.start = min(self.start, start)
+        self.spans.append(item)
+        return item
+
+    @contextmanager
+    def span(self, name: str, category: str, /, **args: Any) -> Iterator[Span]:
+        item: Span = self.add(name, category, default_timer(), 0.0, **args)
+
+        self._local.depth = item.depth + 1
+        try:
+            yield item
+        finally:
+            item.end = default_timer()
+            self._local.depth = item.depth
+
+    def format(self) -> str:
+        # Замеры с одинаковым именем складываются, порядок - по первому замеру
+        totals: dict[tuple[str, str], list] = dict()
+        for item in sorted(self.spans, key=lambda x: x.start):
+            key: tuple[str, str] = item.category, item.name
+            if key not in totals:
+                totals[key] = [item.depth, 0, 0.0]
+            totals[key][1] += 1
+            totals[key][2] += item.elapsed_secs
+
+        total_secs: float = max((x.end for x in self.spans), default=self.start) - self.start
+
+        lines: list[str] = [f"Профиль (всего {total_secs * 1000:.1f} мс):"]
+        for (category, name), (depth, count, secs) in totals.items():
+            title: str = "  " * depth + name
+            if len(title) > 60:
+                title = title[:57] + "..."
+            lines.append(
+                f"  {category:<10} {title:<60} {count:>4} x {secs * 1000:>10.2f} мс"
+            )
+
+        return "\n".join(lines)
+
+    def get_trace_events(self) -> dict[str, Any]:
+        # Формат Chrome trace event, открывается в chrome://tracing и https://ui.perfetto.dev
+        pid: int = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": item.name,
+                    "cat": item.category,
+                    "ph": "X",
+                    "ts": round((item.start - self.start) * 1_000_000, 3),
+                    "dur": round(item.elapsed_secs * 1_000_000, 3),
+                    "pid": pid,
+                    "tid": item.thread_id,
+                    "args": {k: str(v) for k, v in item.args.items()},
+                }
+                for item in self.spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def save_trace(self, path: Path | str) -> None:
+        import json
+
+        Path(path).write_text(
+            json.dumps(self.get_trace_events(), ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+
+# NOTE: Профилирование включается для потока, а не для процесса: на сервере запросы выполняются
+#       параллельно и в профиль запроса не должны попадать замеры других запросов.
+#       Потоки, выполняющие работу запроса, подключаются к его профилю через use
+_LOCAL = threading.local()
+
+_NULL_CONTEXT: ContextManager = nullcontext()
+
+
+def get() -> Profiler | None:
+    return getattr(_LOCAL, "profiler", None)
+
+
+def span(name: str, category: str = "phase", /, **args: Any) -> ContextManager:
+    profile: Profiler | None = get()
+    if profile is None:
+        return _NULL_CONTEXT
+
+    return profile.span(name, category, **args)
+
+
+@contextmanager
+def use(profile: Profiler | None) -> Iterator[Profiler | None]:
+    prev_profile: Profiler | None = get()
+    _LOCAL.profiler = profile
+    try:
+        yield profile
+    finally:
+        _LOCAL.profiler = prev_profile
+
+
+def mark_startup(start: float) -> None:
+    global STARTUP
+    STARTUP = start, default_timer()
+
+
+def enable() -> Profiler:
+    global STARTUP
+
+    profile = Profiler()
+    _LOCAL.profiler = profile
+
+    # Запуск процесса учитывается только в первом профиле (у сервера его нет)
+    if STARTUP:
+        profile.add("startup (imports, settings file)", "phase", *STARTUP)
+        STARTUP = None
+
+    return profile
+
+
+def disable() -> None:
+    _LOCAL.profiler = None
@@ -6,31 +6,118 @@ __author__ = "ipetrash"
 
 import os
 import subprocess
+import threading
 
-from contextlib import contextmanager
-from dataclasses import dataclass
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from datetime import timedelta
+from graphlib import TopologicalSorter
 from pathlib import Path
-from typing import Callable
+from typing import Any, Callable, ContextManager
 from timeit import default_timer
 
-from tool_for_run_project.core import run_file
+from tool_for_run_project.core import cache, run_file
+from tool_for_run_project.core.build_log import BuildLog
+from tool_for_run_project.core.step_history import StepTimer
+from tool_for_run_project.core.svn.update import FALLBACK_ENCODING, SvnUpParser, SvnUpResult
+from tool_for_run_project.core.process_runner import (
+    ProcessResult,
+    ProcessTask,
+    run_processes_sync,
+)
 
 
+# NOTE: Шаги сборки после "svn up". Шаг выполняется, только если изменились его входные данные:
+#       ревизия последнего изменения путей шага, файлы сборки или входные данные зависимостей
 @dataclass
-class SvnUpResult:
-    is_success: bool = False
-    has_conflicts: bool = False
-    is_about_cleanup: bool = False
+class Step:
+    name: str
+    command: str
+    # Префикс строк вывода шага
+    prefix: str
+    build_files: list[str] = field(default_factory=list)
+    depends_on: list[str] = field(default_factory=list)
+    # Префиксы путей (через "/"), изменения в которых влияют на шаг. Если не заданы - любые изменения
+    paths: list[str] = field(default_factory=list)
+
+    def is_affected(self, path: str) -> bool:
+        if not self.paths:
+            return True
+
+        path = path.replace("\\", "/")
+        return any(path == x or path.startswith(f"{x}/") for x in self.paths)
+
+
+STEPS: list[Step] = [
+    Step(
+        name="BUILD-KERNEL",
+        command="call ant clean -f build-kernel.xml & call ant distributive -f build-kernel.xml",
+        prefix="[2]",
+        build_files=["build-kernel.xml"],
+    ),
+    Step(
+        name="BUILD-ADS",
+        command="call ant -f build-ads.xml",
+        prefix="[3]",
+        build_files=["build-ads.xml"],
+        depends_on=["BUILD-KERNEL"],
+    ),
+]
+
+DIR_STATES: Path = cache.DIR_CACHE / "pipelines"
+
+# Ограничение одновременных сборок нескольких версий из-за нагрузки на диск (см. run_many)
+DEFAULT_MAX_IO: int = 2
+
+
+@dataclass
+class PipelineState:
+    # Ревизия рабочей копии после последнего "svn up"
+    revision: int | None = None
+    # Шаг -> ревизия последнего изменения его путей
+    changed_revisions: dict[str, int] = field(default_factory=dict)
+    # Шаг -> отпечаток входных данных последнего успешного выполнения
+    fingerprints: dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def get_path(path: Path | str) -> Path:
+        return DIR_STATES / f"{cache.get_hash(str(Path(path).resolve()).lower())[:32]}.json"
+
+    @classmethod
+    def load(cls, path: Path | str) -> "PipelineState":
+        data: dict[str, Any] | None = cache.load_json(cls.get_path(path))
+        if not isinstance(data, dict):
+            return cls()
+
+        return cls(
+            revision=data.get("revision"),
+            changed_revisions=data.get("changed_revisions", dict()),
+            fingerprints=data.get("fingerprints", dict()),
+        )
+
+    def save(self, path: Path | str) -> None:
+        cache.save_json(
+            self.get_path(path),
+            {
+                "path": str(path),
+                "revision": self.revision,
+                "changed_revisions": self.changed_revisions,
+                "fingerprints": self.fingerprints,
+            },
+        )
+
+
+def format_seconds(seconds: float | None) -> str:
+    return "?" if seconds is None else str(timedelta(seconds=int(seconds)))
 
 
 @contextmanager
-def console_print_header(title: str):
+def console_print_header(title: str, eta_secs: float | None = None):
     start_time: float = default_timer()
 
     print()
     print("-" * 100)
-    print(f'Start "{title}"')
+    print(f'Start "{title}"' + (f". ETA: {format_seconds(eta_secs)}" if eta_secs is not None else ""))
     try:
         yield
     finally:
@@ -45,98 +132,244 @@ def execute(
     encoding: str = "utf-8",
     on_out_line_func: Callable[[str], None] = print,
     assert_return_code: bool = True,
-):
+    on_raw_line_func: Callable[[bytes], None] | None = None,
+    fallback_encoding: str | None = None,
+) -> ProcessResult:
     print(
         f"[execute] command={command!r}, directory={str(directory)!r}, encoding={encoding!r}"
     )
 
-    popen = subprocess.Popen(
-        command,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        encoding=encoding,
-        cwd=directory,
-        shell=True,
-    )
-    for stdout_line in iter(popen.stdout.readline, ""):
-        on_out_line_func(stdout_line)
-    popen.stdout.close()
-    return_code = popen.wait()
-    if return_code and assert_return_code:
-        raise subprocess.CalledProcessError(return_code, command)
+    result: ProcessResult = run_processes_sync(
+        [
+            ProcessTask(
+                command=command,
+                directory=directory,
+                encoding=encoding,
+                on_out_line_func=on_out_line_func,
+                on_raw_line_func=on_raw_line_func,
+                fallback_encoding=fallback_encoding,
+            )
+        ]
+    )[0]
+    if result.return_code and assert_return_code:
+        raise subprocess.CalledProcessError(result.return_code, command)
+
+    return result
 
 
 def execute_svn_up(
     path: Path | str,
     on_out_line_func: Callable[[str], None] = print,
 ) -> SvnUpResult:
-    result: SvnUpResult = SvnUpResult()
+    parser = SvnUpParser()
 
-    def _fill_result_on_out_line_func(line: str) -> None:
-        on_out_line_func(line)
+    # NOTE: Вывод разбирается в байтах, а для вывода на экран декодируется как utf-8,
+    #       если не получилось - в кодировке консоли (раньше с utf-8 была ошибка декодирования)
+    execute(
+        "svn up . --non-interactive",
+        directory=path,
+        on_out_line_func=on_out_line_func,
+        assert_return_code=False,
+        on_raw_line_func=parser.feed,
+        fallback_encoding=FALLBACK_ENCODING,
+    )
 
-        # TODO:
-        # line_lower: str | bytes = line.lower()
-        # if isinstance(line_lower, bytes):
-        #     try:
-        #         line_lower: str = str(line_lower, encoding="utf-8")
-        #     except UnicodeError: # TODO: Или
-        #         line_lower: str = str(line_lower, encoding="latin-1")
-        #
-        # print(line_lower)
+    return parser.close()
 
-        # TODO: Мб тут в байтах учитывать значения?
-        line_lower: str = line.lower()
 
-        if "at revision" in line_lower or "updated to revision" in line_lower:
-            result.is_success = True
+def get_revision(path: Path | str) -> int | None:
+    try:
+        return int(
+            subprocess.check_output(
+                "svn info --show-item revision .",
+                cwd=path,
+                shell=True,
+                stderr=subprocess.DEVNULL,
+                encoding="utf-8",
+            )
+        )
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def get_ordered_steps(steps: list[Step]) -> list[Step]:
+    name_by_step: dict[str, Step] = {step.name: step for step in steps}
+    sorter = TopologicalSorter({step.name: step.depends_on for step in steps})
+    return [name_by_step[name] for name in sorter.static_order()]
+
+
+def get_changed_revisions(
+    steps: list[Step],
+    state: PipelineState,
+    revision_before: int | None,
+    result_svn_up: SvnUpResult,
+) -> dict[str, int | None]:
+    # Список путей известен, только если обновление было от сохраненной ревизии.
+    # Иначе, например, после обновления через TortoiseSVN, считается, что изменилось все
+    is_known_paths: bool = (
+        state.revision is not None
+        and state.revision == revision_before
+        and result_svn_up.revision is not None
+        and not result_svn_up.is_paths_truncated
+    )
 
-        if "summary of conflicts:" in line_lower:
-            result.has_conflicts = True
+    changed_revisions: dict[str, int | None] = dict()
+    for step in steps:
+        revision: int | None = state.changed_revisions.get(step.name)
+        if (
+            not is_known_paths
+            or revision is None
+            or any(step.is_affected(x) for x in result_svn_up.paths)
+        ):
+            revision = result_svn_up.revision
+
+        changed_revisions[step.name] = revision
+
+    return changed_revisions
+
+
+def get_fingerprints(
+    path: Path,
+    steps: list[Step],
+    changed_revisions: dict[str, int | None],
+) -> dict[str, str | None]:
+    fingerprints: dict[str, str | None] = dict()
+    for step in get_ordered_steps(steps):
+        revision: int | None = changed_revisions.get(step.name)
+        depends_on: list[str | None] = [fingerprints[name] for name in step.depends_on]
+
+        # Без ревизии или отпечатка зависимости нельзя определить, что ничего не изменилось
+        if revision is None or None in depends_on:
+            fingerprints[step.name] = None
+            continue
+
+        parts: list[str] = [step.command, str(revision), *depends_on]
+        for file_name in step.build_files:
+            try:
+                parts.append(cache.get_hash((path / file_name).read_bytes()))
+            except OSError:
+                parts.append("")
+
+        fingerprints[step.name] = cache.get_hash("\0".join(parts))
+
+    return fingerprints
+
+
+def run_steps(
+    path: Path,
+    steps: list[Step],
+    state: PipelineState,
+    fingerprints: dict[str, str | None],
+    is_full: bool = False,
+    prefix: str = "",
+    build_slots: ContextManager | None = None,
+    on_step_func: Callable[[Step], None] | None = None,
+    log: BuildLog | None = None,
+    timer: StepTimer | None = None,
+) -> list[str]:
+    def _is_skipped(step: Step) -> bool:
+        fingerprint: str | None = fingerprints.get(step.name)
+        return (
+            not is_full
+            and fingerprint is not None
+            and fingerprint == state.fingerprints.get(step.name)
+        )
 
-        if "cleanup" in line_lower:
-            result.is_about_cleanup = True
+    ordered_steps: list[Step] = get_ordered_steps(steps)
+
+    # Оценка времени по истории прошлых запусков
+    eta: dict[str, float | None] = dict()
+    if timer:
+        names: list[str] = [step.name for step in ordered_steps if not _is_skipped(step)]
+        eta = timer.get_eta(names)
+        if names:
+            total_eta: float | None = (
+                None if None in eta.values() else sum(eta.values())
+            )
+            print(f"\n{prefix}ETA of {', '.join(names)}: {format_seconds(total_eta)}")
+
+    executed: list[str] = []
+    for step in ordered_steps:
+        fingerprint: str | None = fingerprints.get(step.name)
+        if _is_skipped(step):
+            text: str = f'Skip "{step.name}": nothing changed since the last successful run'
+            print(f"\n{prefix}{text}")
+            if log:
+                log.write(text)
+            continue
+
+        # Ограничение одновременных сборок (см. run_many)
+        with build_slots or nullcontext():
+            if on_step_func:
+                on_step_func(step)
+            if log:
+                log.start_step(step.name)
+
+            with (
+                console_print_header(f"{prefix}{step.name}", eta.get(step.name)),
+                timer.measure(step.name) if timer else nullcontext(),
+            ):
+                execute(
+                    step.command,
+                    directory=path,
+                    on_out_line_func=get_out_line_func(f"{prefix}{step.prefix}", log),
+                )
+        executed.append(step.name)
 
-    execute(
-        "svn up . --non-interactive",
-        directory=path,
-        on_out_line_func=_fill_result_on_out_line_func,
-        encoding="latin-1",  # TODO: Проверить, с utf-8 была ошибка
-        assert_return_code=False,
-    )
+        # Состояние сохраняется после каждого шага, чтобы ошибка следующего не повторяла успешные
+        if fingerprint is not None:
+            state.fingerprints[step.name] = fingerprint
+        else:
+            state.fingerprints.pop(step.name, None)
+        state.save(path)
 
-    if result.has_conflicts:
-        # NOTE: Успешность скачивания, конфликты отдельно и могут по свойствам типа svn:ignore
-        result.is_success = False
+    return executed
 
-    return result
 
+def get_out_line_func(prefix: str, log: BuildLog | None = None) -> Callable[[str], None]:
+    def _on_out_line_func(line: str) -> None:
+        print(f"{prefix} {line}", end="")
+        if log:
+            log.write(line)
 
-def run(path: Path | str):
-    print(path)
+    return _on_out_line_func
 
-    start_time_ms: float = default_timer()
 
-    with console_print_header("SVN UP"):
+def update(
+    path: Path,
+    prefix: str = "",
+    log: BuildLog | None = None,
+    timer: StepTimer | None = None,
+) -> SvnUpResult:
+    if log:
+        log.start_step("SVN UP")
+
+    eta_secs: float | None = timer.get_eta(["SVN UP"])["SVN UP"] if timer else None
+
+    with (
+        console_print_header(f"{prefix}SVN UP", eta_secs),
+        timer.measure("SVN UP") if timer else nullcontext(),
+    ):
         result_svn_up: SvnUpResult = execute_svn_up(
             path=path,
-            on_out_line_func=lambda line: print("[1]", line, end=""),
+            on_out_line_func=get_out_line_func(f"{prefix}[1]", log),
         )
         # TODO: Для отладки может понадобиться
-        print("result_svn_up:", result_svn_up)
+        print(f"{prefix}result_svn_up:", result_svn_up)
 
         if not result_svn_up.is_success:
             if result_svn_up.is_about_cleanup:
                 execute(
                     "svn cleanup .",
                     directory=path,
-                    on_out_line_func=lambda line: print("[1.1]", line, end=""),
+                    on_out_line_func=get_out_line_func(f"{prefix}[1.1]", log),
                 )
 
                 lines: list[str] = []
+                out_line_func = get_out_line_func(f"{prefix}[1.2]", log)
 
                 def _on_out_line_func(line: str) -> None:
-                    print("[1.2]", line, end="")
+                    out_line_func(line)
                     lines.append(line)
 
                 result_svn_up: SvnUpResult = execute_svn_up(
@@ -146,22 +379,65 @@ def run(path: Path | str):
 
                 if not result_svn_up.is_success:
                     raise Exception("".join(lines))
+            elif result_svn_up.has_conflicts:
+                raise Exception(f"Conflicts: {', '.join(result_svn_up.conflicts)}")
             else:
-                raise Exception("Error")  # TODO:
-
-    with console_print_header("BUILD-KERNEL"):
-        execute(
-            "call ant clean -f build-kernel.xml & call ant distributive -f build-kernel.xml",
-            directory=path,
-            on_out_line_func=lambda line: print("[2]", line, end=""),
+                raise Exception("\n".join(result_svn_up.errors) or "Error")
+
+    return result_svn_up
+
+
+def update_and_build(
+    path: Path,
+    is_full: bool = False,
+    prefix: str = "",
+    build_slots: ContextManager | None = None,
+    on_step_func: Callable[[Step], None] | None = None,
+    name: str | None = None,
+) -> list[str]:
+    state: PipelineState = PipelineState.load(path)
+    revision_before: int | None = get_revision(path)
+
+    # NOTE: Папка версии обычно называется как версия и лежит в папке проекта
+    timer = StepTimer(project=name or path.resolve().parent.name, version=path.name)
+
+    with BuildLog(path) as log:
+        print(f"{prefix}Log: {log.path_log}")
+
+        result_svn_up: SvnUpResult = update(path, prefix, log, timer)
+
+        state.changed_revisions = {
+            name: revision
+            for name, revision in get_changed_revisions(
+                STEPS, state, revision_before, result_svn_up
+            ).items()
+            if revision is not None
+        }
+        state.revision = result_svn_up.revision
+        state.save(path)
+
+        fingerprints: dict[str, str | None] = get_fingerprints(path, STEPS, state.changed_revisions)
+        return run_steps(
+            path,
+            STEPS,
+            state,
+            fingerprints,
+            is_full=is_full,
+            prefix=prefix,
+            build_slots=build_slots,
+            on_step_func=on_step_func,
+            log=log,
+            timer=timer,
         )
 
-    with console_print_header("BUILD-ADS"):
-        execute(
-            "call ant -f build-ads.xml",
-            directory=path,
-            on_out_line_func=lambda line: print("[3]", line, end=""),
-        )
+
+def run(path: Path | str, is_full: bool = False, name: str | None = None):
+    path = Path(path)
+    print(path)
+
+    start_time_ms: float = default_timer()
+
+    update_and_build(path, is_full=is_full, name=name)
 
     with console_print_header("DESIGNER"):
         file_name = path / "!!designer.cmd"
@@ -170,11 +446,133 @@ def run(path: Path | str):
     print(f"\nTotal elapsed: {timedelta(seconds=int(default_timer() - start_time_ms))}")
 
 
+def get_max_builds(max_io: int = DEFAULT_MAX_IO) -> int:
+    # NOTE: Сборка ant нагружает и процессор, и диск, поэтому одновременных сборок
+    #       не больше количества ядер и ограничения на диск
+    return max(1, min(os.cpu_count() or 1, max_io))
+
+
+@dataclass
+class VersionProgress:
+    path: Path
+    stage: str = "wait"
+    executed: list[str] = field(default_factory=list)
+    error: Exception | None = None
+    start_time: float = 0.0
+    end_time: float = 0.0
+
+    @property
+    def is_finished(self) -> bool:
+        return self.stage in ("done", "error")
+
+    @property
+    def elapsed_secs(self) -> float:
+        return (self.end_time or default_timer()) - self.start_time if self.start_time else 0.0
+
+
+class PipelineProgress:
+    def __init__(self, paths: list[Path]) -> None:
+        self.items: list[VersionProgress] = [VersionProgress(path) for path in paths]
+        self._lock = threading.Lock()
+
+    def set_stage(self, item: VersionProgress, stage: str) -> None:
+        with self._lock:
+            if not item.start_time:
+                item.start_time = default_timer()
+
+            item.stage = stage
+            if item.is_finished:
+                item.end_time = default_timer()
+
+            print(f"\n[progress] {item.path.name}: {stage} | {self.format_counts()}")
+
+    def format_counts(self) -> str:
+        done: int = sum(item.stage == "done" for item in self.items)
+        errors: int = sum(item.stage == "error" for item in self.items)
+        return f"done {done}/{len(self.items)}, errors {errors}"
+
+    def format_summary(self) -> str:
+        lines: list[str] = ["Summary:"]
+        for item in self.items:
+            line: str = (
+                f"  {item.path.name:<20} {item.stage:<6} {timedelta(seconds=int(item.elapsed_secs))}"
+                f"  built: {', '.join(item.executed) or '-'}"
+            )
+            if item.error:
+                error_lines: list[str] = str(item.error).strip().splitlines()
+                line += f"  error: {error_lines[-1] if error_lines else type(item.error).__name__}"
+            lines.append(line)
+
+        lines.append(f"Total: {self.format_counts()}")
+        return "\n".join(lines)
+
+
+def run_many(
+    paths: list[Path | str],
+    is_full: bool = False,
+    max_io: int = DEFAULT_MAX_IO,
+    name: str | None = None,
+) -> PipelineProgress:
+    from concurrent.futures import ThreadPoolExecutor
+
+    paths = [Path(path) for path in paths]
+
+    # NOTE: "svn up" всех версий выполняется сразу, т.к. ожидает в основном сеть,
+    #       поэтому обновление одних версий идет во время сборки других
+    max_builds: int = get_max_builds(max_io)
+    build_slots = threading.BoundedSemaphore(max_builds)
+    print(f"Versions: {len(paths)}, max concurrent builds: {max_builds}")
+
+    progress = PipelineProgress(paths)
+
+    def _run(item: VersionProgress) -> None:
+        progress.set_stage(item, "SVN UP")
+        try:
+            item.executed = update_and_build(
+                item.path,
+                is_full=is_full,
+                prefix=f"[{item.path.name}]",
+                build_slots=build_slots,
+                on_step_func=lambda step: progress.set_stage(item, step.name),
+                name=name,
+            )
+            progress.set_stage(item, "done")
+        except Exception as e:
+            item.error = e
+            progress.set_stage(item, "error")
+
+    with ThreadPoolExecutor(max_workers=len(paths) or 1) as executor:
+        list(executor.map(_run, progress.items))
+
+    print()
+    print(progress.format_summary())
+    return progress
+
+
 if __name__ == "__main__":
+    import argparse
     import sys
 
+    parser = argparse.ArgumentParser(description="SVN update, build and run designer")
     # # TODO:
-    path = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    parser.add_argument("paths", nargs="*", type=Path, default=[Path(os.getcwd())])
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Run all build steps, even if nothing changed since the last successful run",
+    )
+    parser.add_argument(
+        "--max-io",
+        type=int,
+        default=DEFAULT_MAX_IO,
+        help="Max concurrent builds of several versions (also limited by CPU count)",
+    )
+    parser.add_argument(
+        "--name",
+        help="Project name for the step timing history (by default, the name of the parent directory)",
+    )
+    args = parser.parse_args()
+
     # # # TODO:
     # # path = r"C:\DEV__TX\3.2.41.10"
     # # path = r"C:\DEV__TX\3.2.43.10"
@@ -183,5 +581,12 @@ if __name__ == "__main__":
     # # path = r"C:\DEV__OPTT\2.1.14.1"
     # # path = r"C:\DEV__OPTT\2.1.16.1"
     # # path = r"C:\DEV__OPTT\2.1.15.1"
-    path = Path(path)
-    run(path)
+    if len(args.paths) == 1:
+        run(args.paths[0], is_full=args.full, name=args.name)
+    else:
+        # Дизайнер для нескольких версий не запускается
+        progress: PipelineProgress = run_many(
+            args.paths, is_full=args.full, max_io=args.max_io, name=args.name
+        )
+        if any(item.error for item in progress.items):
+            sys.exit(1)
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: История времени выполнения шагов обновления и сборки (см. radix_update_compile_designer.py)
+#       по проекту, версии и шагу. По медиане последних успешных запусков оценивается время
+#       следующего запуска и находятся шаги, которые стали выполняться заметно дольше
+
+
+import sqlite3
+import statistics
+import time
+
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator
+
+from tool_for_run_project.core import cache
+
+
+PATH_DB: Path = cache.DIR_CACHE / "step_history.sqlite"
+
+# Сколько последних успешных запусков учитывается в медиане
+RECENT_RUNS: int = 5
+
+# Шаг считается регрессией, если последний запуск дольше медианы в REGRESSION_RATIO раз
+# и больше, чем на REGRESSION_MIN_SECS (чтобы не реагировать на короткие шаги)
+REGRESSION_RATIO: float = 1.3
+REGRESSION_MIN_SECS: float = 30.0
+
+
+@dataclass
+class StepStats:
+    project: str
+    version: str
+    step: str
+    runs: int
+    median_secs: float
+    last_secs: float
+    # Медиана запусков до последнего
+    previous_median_secs: float | None = None
+
+    @property
+    def is_regression(self) -> bool:
+        return (
+            self.previous_median_secs is not None
+            and self.last_secs > self.previous_median_secs * REGRESSION_RATIO
+            and self.last_secs - self.previous_median_secs > REGRESSION_MIN_SECS
+        )
+
+
+@contextmanager
+def connect(path_db: Path = PATH_DB) -> Iterator[sqlite3.Connection]:
+    # NOTE: Отдельное подключение на каждую операцию, т.к. шаги нескольких версий выполняются в разных потоках
+    path_db.parent.mkdir(parents=True, exist_ok=True)
+
+    with closing(sqlite3.connect(path_db, timeout=30)) as connection:
+        with connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS step (
+                    id INTEGER PRIMARY KEY,
+                    project TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    step TEXT NOT NULL,
+                    started REAL NOT NULL,
+                    elapsed_secs REAL NOT NULL,
+                    is_success INTEGER NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS step_key ON step (project, version, step, started)"
+            )
+            yield connection
+
+
+def add(
+    project: str,
+    version: str,
+    step: str,
+    started: float,
+    elapsed_secs: float,
+    is_success: bool,
+    path_db: Path = PATH_DB,
+) -> None:
+    with connect(path_db) as connect_db:
+        connect_db.execute(
+            "INSERT INTO step (project, version, step, started, elapsed_secs, is_success)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (project, version, step, started, elapsed_secs, int(is_success)),
+        )
+
+
+def get_recent(
+    connect_db: sqlite3.Connection,
+    project: str,
+    version: str | None,
+    step: str,
+    runs: int = RECENT_RUNS,
+) -> list[float]:
+    # Время последних успешных запусков, от новых к старым
+    sql: str = "SELECT elapsed_secs FROM step WHERE is_success = 1 AND project = ? AND step = ?"
+    params: list = [project, step]
+    if version is not None:
+        sql += " AND version = ?"
+        params.append(version)
+    sql += " ORDER BY started DESC LIMIT ?"
+    params.append(runs)
+
+    return [elapsed_secs for (elapsed_secs,) in connect_db.execute(sql, params)]
+
+
+def get_eta(
+    project: str,
+    version: str,
+    steps: list[str],
+    path_db: Path = PATH_DB,
+) -> dict[str, float | None]:
+    if not path_db.exists():
+        return dict.fromkeys(steps)
+
+    eta: dict[str, float | None] = dict()
+    with connect(path_db) as connect_db:
+        for step in steps:
+            # Для новой версии используется история других версий проекта
+            items: list[float] = (
+                get_recent(connect_db, project, version, step)
+                or get_recent(connect_db, project, None, step)
+            )
+            eta[step] = statistics.median(items) if items else None
+
+    return eta
+
+
+def get_stats(project: str | None = None, path_db: Path = PATH_DB) -> list[StepStats]:
+    if not path_db.exists():
+        return []
+
+    items: list[StepStats] = []
+    with connect(path_db) as connect_db:
+        sql: str = "SELECT DISTINCT project, version, step FROM step WHERE is_success = 1"
+        params: list = []
+        if project:
+            sql += " AND project = ?"
+            params.append(project)
+
+        for key_project, key_version, key_step in connect_db.execute(sql, params).fetchall():
+            recent: list[float] = get_recent(
+                connect_db, key_project, key_version, key_step, runs=RECENT_RUNS + 1
+            )
+            last_secs, *previous = recent
+            items.append(
+                StepStats(
+                    project=key_project,
+                    version=key_version,
+                    step=key_step,
+                    runs=len(recent[:RECENT_RUNS]),
+                    median_secs=statistics.median(recent[:RECENT_RUNS]),
+                    last_secs=last_secs,
+                    previous_median_secs=statistics.median(previous) if previous else None,
+                )
+            )
+
+    return items
+
+
+@dataclass
+class StepTimer:
+    project: str
+    version: str
+    path_db: Path = PATH_DB
+
+    def get_eta(self, steps: list[str]) -> dict[str, float | None]:
+        try:
+            return get_eta(self.project, self.version, steps, self.path_db)
+        except sqlite3.Error as e:
+            # История необязательна - ошибка базы не должна ломать сборку
+            print(f"[#] Не удалось прочитать историю шагов: {e}")
+            return dict.fromkeys(steps)
+
+    @contextmanager
+    def measure(self, step: str) -> Iterator[None]:
+        started: float = time.time()
+        is_success: bool = False
+        try:
+            yield
+            is_success = True
+        finally:
+            try:
+                add(
+                    self.project,
+                    self.version,
+                    step,
+                    started,
+                    time.time() - started,
+                    is_success,
+                    self.path_db,
+                )
+            except sqlite3.Error as e:
+                print(f"[#] Не удалось сохранить историю шагов: {e}")
@@ -11,6 +11,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from xml.etree.ElementTree import Element
 
+from tool_for_run_project.core import profiler
+
 
 URL_DEFAULT_SVN_PATH: str = "svn+cplus://svn2.compassplus.ru/twrbs/trunk/dev"
 
@@ -63,7 +65,8 @@ def run_svn_command(
     args.insert(0, "svn")
     args.append(url_or_path)
 
-    data: bytes = subprocess.check_output(args)
+    with profiler.span(" ".join(args), "subprocess"):
+        data: bytes = subprocess.check_output(args)
     root = ET.fromstring(data)
     return [
         Revision.parse_from(logentry_el) for logentry_el in root.findall(".//logentry")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Разбор вывода "svn up" по мере получения строк. Строки разбираются в байтах, поэтому
+#       кодировка вывода (зависит от консоли и может отличаться у путей и сообщений) не важна
+#       для статусов и ревизии, а в текст переводятся только пути. Сам вывод не накапливается,
+#       количество сохраняемых путей ограничено
+
+
+import locale
+import re
+import sys
+
+from dataclasses import dataclass, field
+
+
+# NOTE: На Windows svn выводит в кодировке консоли, а не utf-8
+FALLBACK_ENCODING: str = "oem" if sys.platform == "win32" else locale.getpreferredencoding(False)
+
+# Сколько путей сохраняется в результате, при превышении список считается неполным
+MAX_PATHS: int = 10_000
+
+# NOTE: Ревизия рабочей копии, строки внешних ссылок ("External at revision") не подходят
+PATTERN_REVISION: re.Pattern = re.compile(rb"^(?:At revision|Updated to revision) (\d+)\.")
+
+# Строка с путем: 4 колонки статуса (содержимое, свойства, блокировка, конфликт дерева) и путь,
+# например "U    src/a.java", " U   src" или "   C src/b.java"
+PATTERN_ITEM: re.Pattern = re.compile(rb"^([ADUCGER ])([ADUCGE ])([B ])([C ]) (.+?)\r?\n?$")
+
+PATTERN_SUMMARY_OF_CONFLICTS: re.Pattern = re.compile(rb"^Summary of conflicts:")
+PATTERN_CLEANUP: re.Pattern = re.compile(rb"cleanup", flags=re.IGNORECASE)
+PATTERN_ERROR: re.Pattern = re.compile(rb"^svn: (E\d+: .*?)\r?\n?$")
+
+
+def decode(data: bytes) -> str:
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError:
+        return data.decode(FALLBACK_ENCODING, errors="replace")
+
+
+@dataclass
+class SvnUpResult:
+    is_success: bool = False
+    has_conflicts: bool = False
+    is_about_cleanup: bool = False
+    revision: int | None = None
+
+    # Путь -> статус, например "U", " U" или "   C"
+    paths: dict[str, str] = field(default_factory=dict)
+    is_paths_truncated: bool = False
+
+    # Количество путей по действию (первая колонка статуса), например {"U": 10, "A": 2}
+    counts: dict[str, int] = field(default_factory=dict)
+
+    text_conflicts: list[str] = field(default_factory=list)
+    property_conflicts: list[str] = field(default_factory=list)
+    tree_conflicts: list[str] = field(default_factory=list)
+
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def conflicts(self) -> list[str]:
+        return list(
+            dict.fromkeys(self.text_conflicts + self.property_conflicts + self.tree_conflicts)
+        )
+
+
+class SvnUpParser:
+    def __init__(self, max_paths: int = MAX_PATHS) -> None:
+        self.result = SvnUpResult()
+        self.max_paths: int = max_paths
+
+    def feed(self, line: bytes) -> None:
+        result: SvnUpResult = self.result
+
+        if m := PATTERN_ITEM.match(line):
+            status: bytes = line[:4]
+            if not status.strip():
+                return
+
+            path: str = decode(m.group(5))
+            action: str = chr(status[0])
+            if action != " ":
+                result.counts[action] = result.counts.get(action, 0) + 1
+
+            if len(result.paths) < self.max_paths:
+                result.paths[path] = decode(status).rstrip()
+            else:
+                result.is_paths_truncated = True
+
+            for conflicts, is_conflict in [
+                (result.text_conflicts, status[0:1] == b"C"),
+                (result.property_conflicts, status[1:2] == b"C"),
+                (result.tree_conflicts, status[3:4] == b"C"),
+            ]:
+                if is_conflict:
+                    result.has_conflicts = True
+                    if len(conflicts) < self.max_paths:
+                        conflicts.append(path)
+            return
+
+        if m := PATTERN_REVISION.match(line):
+            result.revision = int(m.group(1))
+            result.is_success = True
+            return
+
+        if PATTERN_SUMMARY_OF_CONFLICTS.match(line):
+            result.has_conflicts = True
+            return
+
+        if m := PATTERN_ERROR.match(line):
+            if len(result.errors) < self.max_paths:
+                result.errors.append(decode(m.group(1)))
+
+        if PATTERN_CLEANUP.search(line):
+            result.is_about_cleanup = True
+
+    def close(self) -> SvnUpResult:
+        if self.result.has_conflicts:
+            # NOTE: Успешность скачивания, конфликты отдельно и могут по свойствам типа svn:ignore
+            self.result.is_success = False
+
+        return self.result
+
+
+def parse(lines: list[bytes]) -> SvnUpResult:
+    parser = SvnUpParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.close()
@@ -4,8 +4,80 @@
 __author__ = "ipetrash"
 
 
-import subprocess
 import platform
+import queue
+import subprocess
+import sys
+import threading
+
+from tool_for_run_project.core import profiler
+
+
+def run_shell_command(command: str, cwd: str | None = None) -> int:
+    with profiler.span(command, "subprocess", cwd=cwd):
+        return _run_shell_command(command, cwd)
+
+
+def _run_shell_command(command: str, cwd: str | None = None) -> int:
+    # NOTE: Если вывод перенаправлен не в файл (например, при параллельном запуске или на сервере),
+    #       то вывод команды нужно передать через sys.stdout, иначе он уйдет мимо
+    try:
+        sys.stdout.fileno()
+    except (AttributeError, OSError, ValueError):
+        return _run_shell_command_with_pipe(command, cwd)
+
+    sys.stdout.flush()
+    return subprocess.run(command, shell=True, cwd=cwd).returncode
+
+
+def _run_shell_command_with_pipe(command: str, cwd: str | None = None) -> int:
+    # NOTE: Запущенные в фоне процессы (например, "start /b TortoiseProc ...") наследуют канал
+    #       вывода и держат его открытым, пока не завершатся, поэтому конца вывода не ждем:
+    #       вывод читается в отдельном потоке, а команда завершается вместе с оболочкой
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        errors="replace",
+    )
+
+    lines: queue.Queue[str | None] = queue.Queue()
+
+    def _read() -> None:
+        with process.stdout:
+            for line in process.stdout:
+                lines.put(line)
+        lines.put(None)
+
+    reader = threading.Thread(target=_read, daemon=True)
+    reader.start()
+
+    # Вывод передается в sys.stdout в этом потоке, т.к. на сервере перенаправление у каждого потока свое
+    while True:
+        try:
+            line: str | None = lines.get(timeout=0.1)
+        except queue.Empty:
+            if process.poll() is None:
+                continue
+
+            # Оболочка завершилась, остаток ее вывода дочитывается без ожидания фоновых процессов
+            reader.join(timeout=0.1)
+            while not lines.empty():
+                line = lines.get_nowait()
+                if line is not None:
+                    sys.stdout.write(line)
+            break
+
+        if line is None:
+            break
+
+        sys.stdout.write(line)
+
+    return process.wait()
 
 
 def run_command_in_new_terminal(args: list[str]):
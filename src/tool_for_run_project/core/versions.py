@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+import os
+import re
+
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+from tool_for_run_project.core import (
+    AliasIndex,
+    MultipleResultsFoundError,
+    UnknownVersionException,
+    is_like_a_version,
+)
+
+
+# NOTE: Сканирование упирается в ожидание ответа от диска (в т.ч. сетевого), а не в CPU
+MAX_SCAN_WORKERS: int = 16
+
+
+def scan_versions(path: str) -> dict[str, str]:
+    # NOTE: Нормализация, чтобы пути версий были такими же, как у str(Path(path) / name)
+    root: str = str(Path(path))
+
+    version_by_path: dict[str, str] = dict()
+
+    # Один проход по записям папки, у DirEntry тип записи обычно известен без отдельного stat
+    with os.scandir(root) as it:
+        for entry in it:
+            if entry.is_dir() and is_like_a_version(entry.name):
+                version_by_path[entry.name] = os.path.join(root, entry.name)
+
+    return version_by_path
+
+
+def scan_versions_many(
+    paths: Iterable[str],
+    max_workers: int = MAX_SCAN_WORKERS,
+) -> dict[str, dict[str, str] | OSError]:
+    paths: list[str] = list(dict.fromkeys(paths))  # Без дубликатов, с сохранением порядка
+
+    def _scan(path: str) -> dict[str, str] | OSError:
+        try:
+            return scan_versions(path)
+        except OSError as e:
+            return e
+
+    if len(paths) <= 1:
+        return {path: _scan(path) for path in paths}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(paths))) as executor:
+        return dict(zip(paths, executor.map(_scan, paths)))
+
+
+# Ключ для естественной сортировки: 3.2.9 < 3.2.10, а trunk после всех версий
+VersionKey = tuple[int, tuple[tuple[int, int | str], ...]]
+
+
+def get_version_key(version: str) -> VersionKey:
+    version = version.lower()
+
+    parts: list[tuple[int, int | str]] = [
+        (0, int(part)) if part.isdigit() else (1, part)
+        for part in re.split(r"(\d+)", version)
+        if part
+    ]
+    return int("trunk" in version), tuple(parts)
+
+
+def get_pattern_by_base_version(base_version: str) -> re.Pattern:
+    # "3.2.{number}" -> "3.2.35", "3.2.35.10" и т.п., но не "3.2.350"
+    prefix, _, suffix = base_version.partition("{number}")
+    return re.compile(
+        re.escape(prefix) + r"(\d+)(?!\d)" + re.escape(suffix),
+        flags=re.IGNORECASE,
+    )
+
+
+class VersionIndex:
+    def __init__(
+        self,
+        versions: Iterable[str],
+        base_version: str | list[str] | None = None,
+    ) -> None:
+        self.versions: list[str] = sorted(versions, key=get_version_key)
+        self._keys: list[VersionKey] = list(map(get_version_key, self.versions))
+        self.aliases = AliasIndex(self.versions, is_fuzzy=False)
+
+        if not base_version:
+            base_versions: list[str] = []
+        elif isinstance(base_version, str):
+            base_versions: list[str] = [base_version]
+        else:
+            base_versions: list[str] = base_version
+
+        # Для каждого шаблона: короткая версия -> подходящие полные версии
+        self.base_versions: list[str] = base_versions
+        self._versions_by_number: list[dict[str, list[str]]] = []
+        for template in base_versions:
+            pattern: re.Pattern = get_pattern_by_base_version(template)
+
+            versions_by_number: dict[str, list[str]] = dict()
+            for version in self.versions:
+                if m := pattern.match(version):
+                    number: str = str(int(m.group(1)))
+                    versions_by_number.setdefault(number, []).append(version)
+
+            self._versions_by_number.append(versions_by_number)
+
+    def resolve_short_version(self, alias: str) -> str:
+        number: str = str(int(alias))
+
+        # Как и раньше, шаблоны перебираются по порядку и побеждает первый подходящий
+        for template, versions_by_number in zip(
+            self.base_versions, self._versions_by_number
+        ):
+            versions: list[str] = versions_by_number.get(number)
+            if not versions:
+                continue
+
+            if len(versions) == 1:
+                return versions[0]
+
+            # Совпадение с шаблоном целиком важнее остальных
+            full_version: str = template.format(number=alias).lower()
+            for version in versions:
+                if version.lower() == full_version:
+                    return version
+
+            raise MultipleResultsFoundError(alias=alias, variants=versions)
+
+        raise UnknownVersionException(alias, supported=self.versions)
+
+    def get_range(self, start: str, end: str) -> list[str]:
+        start_key: VersionKey = get_version_key(start)
+        end_key: VersionKey = get_version_key(end)
+
+        # Обратный диапазон, например "trunk-23", перечисляется в обратном порядке
+        if start_key > end_key:
+            return list(reversed(self.get_range(end, start)))
+
+        return self.versions[
+            bisect_left(self._keys, start_key):bisect_right(self._keys, end_key)
+        ]
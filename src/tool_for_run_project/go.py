@@ -4,9 +4,15 @@
 __author__ = "ipetrash"
 
 
+import shlex
 import sys
 import traceback
 
+from dataclasses import dataclass
+from timeit import default_timer
+
+START_TIME: float = default_timer()
+
 from tool_for_run_project.core import (
     GoException,
     ParameterAvailabilityException,
@@ -17,6 +23,7 @@ from tool_for_run_project.core import (
 from tool_for_run_project import settings
 
 # NOTE: Нужно для работы core.commands
+#       Проекты обрабатываются при первом обращении к ним
 settings.run_settings_preprocess()
 SETTINGS = settings.SETTINGS
 
@@ -24,11 +31,14 @@ from tool_for_run_project.core import resolve_alias, UnknownArgException
 from tool_for_run_project.core.commands import (
     ActionValue,
     Command,
-    get_file_by_action,
     resolve_actions,
     resolve_version,
+    run_commands,
 )
-from tool_for_run_project.settings import get_project, resolve_name
+from tool_for_run_project.core import plan_cache, profiler
+from tool_for_run_project.settings import get_project, get_version_index, resolve_name
+
+profiler.mark_startup(START_TIME)
 
 
 ABOUT_TEXT = r"""
@@ -39,6 +49,10 @@ RUN:
   go <name> open               - Open dir
   go <name>                    - Print versions
   go -d                        - Print settings
+  go --batch <file> [--fail-fast]  - Run commands from file (one per line), "-" - from stdin
+  go --parallel <N> <name> ...     - Run commands of several versions/actions at the same time
+  go --complete <args> <prefix>    - Print completion variants for shell
+  go --profile[=<trace.json>] ...  - Print time of each phase, optionally save Chrome trace
 
 SUPPORTED NAMES:
   {}
@@ -110,17 +124,11 @@ EXAMPLES:
   > go tx s+e pg
     Запуск: 'C:\\DEV__TX\\trunk\\!!server-postgres.cmd'
     Запуск: 'C:\\DEV__TX\\trunk\\!!explorer.cmd'
-""".format(
-    ", ".join(SETTINGS.keys()),
-).strip()
-
+""".strip()
 
-def _preprocess_args(name: str, action: str | None, args: list[str]) -> list[str]:
-    if not action:
-        return args
 
+def _preprocess_args(value: ActionValue, args: list[str]) -> list[str]:
     # Получение из аргументов
-    value: ActionValue = get_file_by_action(name, action)
     if not isinstance(value, dict):
         return args
 
@@ -144,6 +152,11 @@ def _preprocess_args(name: str, action: str | None, args: list[str]) -> list[str
 
 
 def parse_cmd_args(args: list[str]) -> list[Command]:
+    with profiler.span("parse_cmd_args"):
+        return _parse_cmd_args(args)
+
+
+def _parse_cmd_args(args: list[str]) -> list[Command]:
     args: list[str] = args.copy()
     if args and args[-1].endswith("\\"):  # Случай случайного клика на \ вместе с Enter
         args[-1] = args[-1].rstrip("\\")
@@ -158,7 +171,8 @@ def parse_cmd_args(args: list[str]) -> list[Command]:
         alias: str = args.pop(0).lower()
         name = resolve_name(alias)
 
-    options: dict = get_project(name)["options"]
+    project: dict = get_project(name)
+    options: dict = project["options"]
     maybe_version: bool = options["version"] != AvailabilityEnum.PROHIBITED
     maybe_action: bool = options["action"] != AvailabilityEnum.PROHIBITED
 
@@ -180,19 +194,7 @@ def parse_cmd_args(args: list[str]) -> list[Command]:
                 start, end = alias.split("-")
                 start = resolve_version(name, start)
                 end = resolve_version(name, end)
-
-                found = False
-                for version in get_project(name)["versions"]:
-                    if start == version:
-                        found = True
-
-                    if not found:
-                        continue
-
-                    versions.append(version)
-
-                    if end in version:
-                        break
+                versions += get_version_index(name).get_range(start, end)
 
             else:
                 version = resolve_version(name, alias)
@@ -216,19 +218,50 @@ def parse_cmd_args(args: list[str]) -> list[Command]:
     if not actions:
         actions.append(None)
 
-    commands: list[Command] = []
-    for version in versions:
-        for action in actions:
-            new_args: list[str] = _preprocess_args(name, action, args)
-            commands.append(Command(name, version, action, new_args))
+    # Аргументы действия не зависят от версии, поэтому ищутся один раз для каждого действия
+    args_by_action: dict[str | None, list[str]] = {
+        action: _preprocess_args(project["actions"][action] if action else None, args)
+        for action in actions
+    }
+
+    # Команды сразу с настройками проекта, путем и значением действия, чтобы при запуске не искать их повторно
+    return [
+        Command(name, version, action, args_by_action[action].copy()).resolve(project)
+        for version in versions
+        for action in actions
+    ]
+
+
+def get_commands(args: list[str]) -> list[Command]:
+    # Повторная команда берется из кэша, без разбора аргументов и поиска по сокращениям
+    commands: list[Command] | None = plan_cache.load(args)
+    if commands is None:
+        commands = parse_cmd_args(args)
+        plan_cache.save(args, commands)
 
     return commands
 
 
-def run(args: list[str]) -> None:
+PARALLEL_FLAG: str = "--parallel"
+
+
+def _pop_parallel_flag(args: list[str]) -> tuple[list[str], int]:
+    # Например: go --parallel 4 tx 34-36 find_rele TXI-8197
+    if not args or args[0] != PARALLEL_FLAG:
+        return args, 1
+
+    if len(args) < 2 or not args[1].isdigit() or int(args[1]) < 1:
+        raise GoException(f"После {PARALLEL_FLAG} нужно указать количество одновременных команд")
+
+    return args[2:], int(args[1])
+
+
+def run(args: list[str]) -> int:
     try:
-        for command in parse_cmd_args(args):
-            command.run()
+        args, max_workers = _pop_parallel_flag(args)
+        run_commands(get_commands(args), max_workers)
+
+        return 0
 
     except ParameterAvailabilityException as e:
         name: str = e.command.name
@@ -239,7 +272,7 @@ def run(args: list[str]) -> None:
 
         # Если для сущности параметр версии возможен
         if options["version"] != AvailabilityEnum.PROHIBITED:
-            supported_versions = ", ".join(sorted(settings["versions"]))
+            supported_versions = ", ".join(get_version_index(name).versions)
             print(f"Найдены версии: {supported_versions}")
             is_answered = True
 
@@ -251,11 +284,14 @@ def run(args: list[str]) -> None:
 
         if not is_answered:
             print(e)
+            return 1
+
+        return 0
 
     except GoException as e:
         # Если передан флаг отладки
         show_exception_flag = "-e"
-        if args[-1].lower().startswith(show_exception_flag):
+        if (args[-1] if args else "").lower().startswith(show_exception_flag):
             print(traceback.format_exc())
         else:
             print(e)
@@ -265,23 +301,152 @@ def run(args: list[str]) -> None:
                 f"повторить команду с флагом {show_exception_flag}"
             )
 
+        return 1
+
+
+BATCH_FLAG: str = "--batch"
+COMPLETE_FLAG: str = "--complete"
+FAIL_FAST_FLAG: str = "--fail-fast"
+
+
+@dataclass
+class BatchItem:
+    line_number: int
+    line: str
+    exit_code: int | None = None  # None - команда не выполнялась
+    elapsed_secs: float = 0.0
+
+    @property
+    def status(self) -> str:
+        if self.exit_code is None:
+            return "SKIP"
+        return "OK" if self.exit_code == 0 else "ERROR"
+
+
+def split_line(line: str) -> list[str]:
+    # NOTE: Как в командной строке, но без экранирования, т.к. в путях Windows есть \
+    lexer = shlex.shlex(line, posix=True)
+    lexer.whitespace_split = True
+    lexer.escape = ""
+    return list(lexer)
+
+
+def read_batch(path: str) -> list[BatchItem]:
+    if path == "-":
+        text: str = sys.stdin.read()
+    else:
+        with open(path, encoding="utf-8") as f:
+            text: str = f.read()
+
+    items: list[BatchItem] = []
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+
+        # Пропуск пустых строк и комментариев
+        if not line or line.startswith("#"):
+            continue
+
+        items.append(BatchItem(line_number, line))
+
+    return items
+
+
+def run_batch(path: str, fail_fast: bool = False) -> int:
+    try:
+        items: list[BatchItem] = read_batch(path)
+    except OSError as e:
+        print(f"Не удалось прочитать файл команд {path!r}: {e}")
+        return 1
+
+    for i, item in enumerate(items, start=1):
+        print(f"[{i}/{len(items)}] go {item.line}")
+
+        start_time: float = default_timer()
+        try:
+            args: list[str] = split_line(item.line)
+            item.exit_code = run(args) if args else 0
+        except Exception:
+            # Ошибка одной команды не должна прерывать выполнение остальных
+            print(traceback.format_exc())
+            item.exit_code = 1
+
+        item.elapsed_secs = default_timer() - start_time
+        print()
+
+        if fail_fast and item.exit_code != 0:
+            break
+
+    _print_batch_summary(items)
+
+    return 0 if all(item.exit_code == 0 for item in items) else 1
+
+
+def _print_batch_summary(items: list[BatchItem]) -> None:
+    print("Итог:")
+    for item in items:
+        elapsed: str = f"{item.elapsed_secs:.2f} с" if item.exit_code is not None else ""
+        print(f"  {'[' + item.status + ']':<8} {elapsed:>10}  {item.line_number}: go {item.line}")
+
+    done: int = sum(item.exit_code is not None for item in items)
+    errors: int = sum(item.status == "ERROR" for item in items)
+    print(f"Выполнено: {done} из {len(items)}, ошибок: {errors}")
+
 
 def _print_help() -> None:
-    print(ABOUT_TEXT)
-    sys.exit()
+    # NOTE: Настройки берутся из модуля, т.к. они могли быть перечитаны (например, сервером)
+    print(ABOUT_TEXT.format(", ".join(settings.SETTINGS.keys())))
 
 
-if __name__ == "__main__":
-    args = sys.argv[1:]
+PROFILE_FLAG: str = "--profile"
+
+
+def main(args: list[str]) -> int:
+    # Например: go --profile tx s или go --profile=trace.json tx s
+    if args and args[0].split("=")[0] == PROFILE_FLAG:
+        _, _, path_trace = args[0].partition("=")
+        return run_with_profile(args[1:], path_trace or None)
+
     if not args or args[0] == "-h":
         _print_help()
+        return 0
 
-    if args and args[0] == "-d":
+    if args[0] == "-d":
         import json
-        from tool_for_run_project.settings import PATH_SETTINGS
 
-        print(PATH_SETTINGS)
-        print(json.dumps(SETTINGS, indent=4, default=repr))
-        sys.exit()
+        print(settings.PATH_SETTINGS)
+        print(json.dumps(dict(settings.SETTINGS), indent=4, default=repr))
+        return 0
+
+    if args[0] == COMPLETE_FLAG:
+        from tool_for_run_project import completion
+        return completion.main(args[1:])
+
+    if args[0] == BATCH_FLAG:
+        fail_fast: bool = FAIL_FAST_FLAG in args
+        batch_args: list[str] = [x for x in args[1:] if x != FAIL_FAST_FLAG]
+        if len(batch_args) != 1:
+            print(f"Нужно указать файл с командами: go {BATCH_FLAG} <file|-> [{FAIL_FAST_FLAG}]")
+            return 1
+
+        return run_batch(batch_args[0], fail_fast)
 
-    run(args)
+    return run(args)
+
+
+def run_with_profile(args: list[str], path_trace: str | None = None) -> int:
+    profile: profiler.Profiler = profiler.enable()
+    try:
+        with profiler.span(f"go {' '.join(args)}"):
+            return main(args)
+    finally:
+        profiler.disable()
+
+        print()
+        print(profile.format())
+        if path_trace:
+            profile.save_trace(path_trace)
+            print(f"Trace сохранен в {path_trace!r}")
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
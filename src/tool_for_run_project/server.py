@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+import io
+import json
+import os
+import secrets
+import socket
+import socketserver
+import sys
+import threading
+import traceback
+
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Any
+
+from tool_for_run_project.core import cache
+from tool_for_run_project.core.output import ThreadInput, ThreadOutput
+
+
+# NOTE: Файл с адресом и токеном доступа запущенного сервера, его читает client.py
+PATH_SERVER_INFO: Path = cache.DIR_CACHE / "server.json"
+
+ENCODING: str = "utf-8"
+
+
+def read_server_info() -> dict[str, Any] | None:
+    try:
+        return json.loads(PATH_SERVER_INFO.read_text(encoding=ENCODING))
+    except (OSError, ValueError):
+        return None
+
+
+def send_message(sock: socket.socket, **kwargs: Any) -> None:
+    sock.sendall(json.dumps(kwargs, ensure_ascii=False).encode(ENCODING) + b"\n")
+
+
+class SocketWriter(io.TextIOBase):
+    def __init__(self, sock: socket.socket) -> None:
+        self.sock = sock
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        if text:
+            send_message(self.sock, out=text)
+        return len(text)
+
+
+# NOTE: Запросы выполняются параллельно, а настройки общие
+REVALIDATE_LOCK = threading.Lock()
+
+
+def revalidate() -> None:
+    from tool_for_run_project import settings
+
+    # Перечитывается файл настроек и сбрасываются только изменившиеся проекты
+    with REVALIDATE_LOCK:
+        result = settings.reload()
+        if result.is_changed:
+            print(f"[#] Настройки обновлены:\n{result}")
+            settings.SETTINGS.preload(ignore_errors=True)
+
+
+def get_exit_code(e: SystemExit) -> int:
+    # Как при выходе из интерпретатора: None - успех, иначе текст ошибки с кодом 1
+    if e.code is None:
+        return 0
+
+    if isinstance(e.code, int):
+        return e.code
+
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        from tool_for_run_project import go
+
+        try:
+            request: dict[str, Any] = json.loads(self.rfile.readline().decode(ENCODING))
+        except ValueError:
+            return
+
+        if not secrets.compare_digest(str(request.get("token")), self.server.token):
+            send_message(self.request, out="Неверный токен доступа\n", exit_code=1)
+            return
+
+        args: list[str] = request["args"]
+        print(f"Запрос: {args}")
+
+        # NOTE: sys.stdout, sys.stderr и sys.stdin подменены сервером, поэтому перенаправление
+        #       действует только в потоке этого запроса и не мешает параллельным запросам
+        writer = SocketWriter(self.request)
+        with ExitStack() as stack:
+            stack.enter_context(self.server.stdout.redirect(writer))
+            stack.enter_context(self.server.stderr.redirect(writer))
+
+            # Для go --batch - команды из stdin клиента
+            if request.get("stdin") is not None:
+                stack.enter_context(self.server.stdin.redirect(io.StringIO(request["stdin"])))
+
+            try:
+                revalidate()
+                exit_code: int = go.main(args)
+            except SystemExit as e:
+                exit_code: int = get_exit_code(e)
+            except Exception:
+                print(traceback.format_exc())
+                exit_code: int = 1
+
+        send_message(self.request, exit_code=exit_code)
+
+
+# NOTE: Каждый запрос выполняется в своем потоке, чтобы долгая команда не блокировала остальные
+class Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), RequestHandler)
+
+        self.token: str = secrets.token_hex(16)
+
+        self.stdout: ThreadOutput | None = None
+        self.stderr: ThreadOutput | None = None
+        self.stdin: ThreadInput | None = None
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        host, port = self.server_address[:2]
+
+        stdout, stderr, stdin = sys.stdout, sys.stderr, sys.stdin
+        self.stdout = sys.stdout = ThreadOutput(stdout)
+        self.stderr = sys.stderr = ThreadOutput(stderr)
+        self.stdin = sys.stdin = ThreadInput(stdin)
+
+        PATH_SERVER_INFO.parent.mkdir(parents=True, exist_ok=True)
+        PATH_SERVER_INFO.write_text(
+            json.dumps(
+                {"host": host, "port": port, "token": self.token, "pid": os.getpid()},
+            ),
+            encoding=ENCODING,
+        )
+        print(f"Сервер запущен на {host}:{port}")
+
+        try:
+            super().serve_forever(poll_interval)
+        finally:
+            sys.stdout, sys.stderr, sys.stdin = stdout, stderr, stdin
+
+            # Удаление, только если файл не перезаписан другим сервером
+            if (read_server_info() or dict()).get("pid") == os.getpid():
+                PATH_SERVER_INFO.unlink(missing_ok=True)
+
+
+def warm_up() -> None:
+    # NOTE: Импорт go обрабатывает настройки
+    import tool_for_run_project.go
+    from tool_for_run_project import settings
+    from tool_for_run_project.core import profiler
+
+    # Запуск сервера не относится к запросам, поэтому в их профили не попадает
+    profiler.STARTUP = None
+
+    settings.SETTINGS.preload(ignore_errors=True)
+
+    # NOTE: psutil кэширует объекты процессов между вызовами process_iter
+    import psutil
+
+    for _ in psutil.process_iter():
+        pass
+
+
+if __name__ == "__main__":
+    warm_up()
+
+    with Server(port=int(os.getenv("GO_SERVER_PORT", 0))) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -4,20 +4,37 @@
 __author__ = "ipetrash"
 
 
-import copy
 import json
-import re
 import os
+import pickle
+import threading
 
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Iterable, Iterator
 
+from tool_for_run_project import completion
 from tool_for_run_project.core import (
+    AliasIndex,
     AvailabilityEnum,
     GoException,
-    is_like_a_version,
     UnknownNameException,
-    resolve_alias,
+)
+from tool_for_run_project.core import cache, layouts, profiler
+from tool_for_run_project.core.code_block import (
+    CodeBlock,
+    KeyPath,
+    compile_code_block,
+    find_code_blocks,
+    is_related_key_paths,
+    set_value,
+)
+from tool_for_run_project.core.versions import (
+    VersionIndex,
+    get_version_key,
+    scan_versions,
+    scan_versions_many,
 )
 
 
@@ -26,147 +43,742 @@ if path_settings_value := os.getenv("PATH_SETTINGS"):
 else:
     PATH_SETTINGS: Path = Path(__file__).parent.resolve() / "settings.json"
 
-__SETTINGS: dict[str, Any] = json.loads(PATH_SETTINGS.read_text(encoding="utf-8"))
+__SETTINGS_DATA: bytes = PATH_SETTINGS.read_bytes()
+__SETTINGS: dict[str, Any] = json.loads(__SETTINGS_DATA.decode("utf-8"))
+
+
+def is_settings_changed() -> bool:
+    return PATH_SETTINGS.read_bytes() != __SETTINGS_DATA
+
+
+def get_settings_hash() -> str:
+    return cache.get_hash(__SETTINGS_DATA)
+
+
+def read_settings() -> None:
+    global __SETTINGS_DATA, __SETTINGS
+
+    __SETTINGS_DATA = PATH_SETTINGS.read_bytes()
+    __SETTINGS = json.loads(__SETTINGS_DATA.decode("utf-8"))
+
+
+# NOTE: При изменении формата обработанных настроек нужно увеличить, чтобы старый кэш не использовался
+CACHE_VERSION: int = 4
+PATH_CACHE_SETTINGS: Path = (
+    cache.DIR_CACHE / f"settings-{cache.get_hash(str(PATH_SETTINGS))[:16]}.pickle"
+)
 
 
-# SOURCE: https://stackoverflow.com/a/20666342/5909792
-def merge_dicts(source: dict, destination: dict) -> dict:
-    for key, value in source.items():
-        if isinstance(value, dict):
-            # Get node or create one
-            node = destination.setdefault(key, dict())
-            merge_dicts(value, node)
+def merge_shared(base: dict, values: dict) -> dict:
+    # NOTE: Копируются только словари, в которых есть изменения, остальные значения общие с base.
+    #       Поэтому обработанные настройки нельзя менять на месте (см. set_value)
+    result: dict = dict(base)
+    for key, value in values.items():
+        base_value = result.get(key)
+        if isinstance(value, dict) and isinstance(base_value, dict):
+            result[key] = merge_shared(base_value, value)
         else:
-            destination[key] = value
+            result[key] = value
 
-    return destination
+    return result
 
 
-# SOURCE: https://github.com/gil9red/SimplePyScripts/blob/c8639e909c2ad48c127e11595396f148d5970e10/walk_dict.py
-def walk_dict(
-    node: dict,
-    value_process_func: Callable[[Any, Any], Any] | None = None,
-) -> None:
-    for key, value in node.items():
-        if value_process_func:
-            value = value_process_func(key, value)
-            node[key] = value
+# Заполнение настроек из base с поддержкой нескольких уровней наследования.
+# Каждый base заполняется только один раз
+class BaseResolver:
+    def __init__(self, settings: dict[str, dict]) -> None:
+        self.settings: dict[str, dict] = settings
+        self._resolved: dict[str, dict] = dict()
 
-        if isinstance(value, dict):
-            walk_dict(value, value_process_func)
+    def get_chain(self, name: str) -> list[str]:
+        chain: list[str] = [name]
+        while base_name := self.settings[chain[-1]].get("base"):
+            if base_name in chain:
+                cycle: list[str] = chain[chain.index(base_name):] + [base_name]
+                raise GoException(
+                    f"Обнаружена циклическая зависимость base: {' -> '.join(cycle)}"
+                )
 
+            if base_name not in self.settings:
+                raise GoException(
+                    f"Не найден base {base_name!r} в настройках {chain[-1]!r}"
+                )
 
-PATTERN_CODE_BLOCK = re.compile(r"^\$\{(.+)}$")
+            chain.append(base_name)
 
+        return chain
 
-def walk_dir_run_code(_: Any, v: Any, settings: dict[str, Any]) -> Any:
-    # NOTE: Импортировать нужно тут - глобально нельзя
-    from tool_for_run_project.core import AvailabilityEnum, commands
+    def resolve(self, name: str) -> dict:
+        if name in self._resolved:
+            return self._resolved[name]
 
-    global_vars: dict[str, Any] = {
-        "AvailabilityEnum": AvailabilityEnum,
-        "commands": commands,
-        "self": settings,
-    }
+        resolved: dict = dict()
 
-    match v:
-        # Или строка, или список из двух строк
-        case (str() as value) | [str(), str() as value]:
-            if m := PATTERN_CODE_BLOCK.match(value):
-                eval_str = m.group(1)
-                try:
-                    value = eval(eval_str, global_vars)
-                except Exception:
-                    raise Exception(f"Error on eval {eval_str!r}, original {value!r}")
+        # Заполнение от самого первого base до самого проекта
+        for x in reversed(self.get_chain(name)):
+            if x in self._resolved:
+                resolved = self._resolved[x]
+                continue
+
+            resolved = merge_shared(resolved, self.settings[x])
+
+            # Removing base name
+            resolved.pop("base", None)
 
-                if isinstance(v, list):
-                    v[1] = value
-                else:
-                    v = value
+            self._resolved[x] = resolved
 
-    return v
+        return resolved
 
 
 def get_versions_by_path(path: str) -> dict[str, str]:
-    version_by_path = dict()
+    try:
+        return scan_versions(path)
+    except OSError:
+        return dict()
 
-    dir_path = Path(path)
 
-    if dir_path.is_dir():
-        for path in dir_path.iterdir():
-            if path.is_dir() and is_like_a_version(path.name):
-                version_by_path[path.name] = str(path)
+def get_versions_by_project(
+    name: str,
+    project: dict,
+    scanned: dict[str, dict[str, str] | OSError] | None = None,
+) -> dict[str, str]:
+    path_value: str | list[str] = project["path"]
+    if isinstance(path_value, str):
+        if scanned is None:
+            return get_versions_by_path(path_value)
 
-    return version_by_path
+        result: dict[str, str] | OSError = scanned[path_value]
+        return dict() if isinstance(result, OSError) else result
 
+    # Все пути проекта сканируются одновременно
+    if scanned is None:
+        scanned = scan_versions_many(path_value)
 
-def settings_preprocess(settings: dict[str, dict]) -> dict[str, dict]:
-    new_settings = dict()
+    version_by_path: dict[str, str] = dict()
 
-    # Update from bases
-    for name, values in settings.items():
-        if "base" in values:
-            # Removing base name
-            base_name = values.pop("base")
-            base_values = settings[base_name]
-            new_settings[name] = copy.deepcopy(base_values)
+    for path in path_value:
+        result: dict[str, str] | OSError = scanned[path]
+
+        if isinstance(result, FileNotFoundError):
+            raise GoException(
+                f"Путь в настройках {name!r} не существует: {path!r}"
+            )
+
+        if isinstance(result, NotADirectoryError):
+            raise GoException(
+                f"Путь в настройках {name!r} не является папкой: {path!r}"
+            )
+
+        if isinstance(result, OSError):
+            raise result
 
-        if name not in new_settings:
-            new_settings[name] = dict()
+        for version, version_path in result.items():
+            other_version_path: str | None = version_by_path.get(version)
+            if other_version_path:
+                raise GoException(
+                    f"Обнаружен дубликат версии в настройках {name!r} для версии {version!r}, пути:"
+                    f" {version_path!r} и {other_version_path!r}"
+                )
 
-        merge_dicts(values, new_settings[name])
+            version_by_path[version] = version_path
 
-        if (
-            "path" in new_settings[name]
-            and new_settings[name]["options"]["version"] != AvailabilityEnum.PROHIBITED
-        ):
-            path_value: str | list[str] = new_settings[name]["path"]
+    return version_by_path
+
+
+def get_base_chain(name: str, settings: dict[str, dict]) -> list[str]:
+    chain: list[str] = [name]
+    while (base_name := settings.get(chain[-1], dict()).get("base")) and base_name not in chain:
+        chain.append(base_name)
+
+    return chain
+
+
+def get_dependency_names(name: str, project: dict) -> set[str]:
+    return {
+        dependency[0]
+        for code_block in find_code_blocks(project).values()
+        for dependency in code_block.dependencies
+        if dependency[0] != name
+    }
 
-            version_by_path: dict[str, str] = dict()
 
-            if isinstance(path_value, str):
-                version_by_path = get_versions_by_path(path_value)
-            else:
-                for path in path_value:
-                    path_dir = Path(path)
-                    if not path_dir.exists():
-                        raise GoException(
-                            f"Путь в настройках {name!r} не существует: {path!r}"
-                        )
+def has_versions(project: dict) -> bool:
+    return (
+        "path" in project
+        and project["options"]["version"] != AvailabilityEnum.PROHIBITED
+    )
 
-                    if not path_dir.is_dir():
-                        raise GoException(
-                            f"Путь в настройках {name!r} не является папкой: {path!r}"
-                        )
 
-                    for version, version_path in get_versions_by_path(path).items():
-                        other_version_path: str | None = version_by_path.get(version)
-                        if other_version_path:
-                            raise GoException(
-                                f"Обнаружен дубликат версии в настройках {name!r} для версии {version!r}, пути:"
-                                f" {version_path!r} и {other_version_path!r}"
-                            )
+def get_version_roots(project: dict) -> list[str]:
+    if not has_versions(project):
+        return []
+
+    path_value: str | list[str] = project["path"]
+    if isinstance(path_value, str):
+        return [path_value]
+    return list(path_value)
+
+
+def load_cached_projects() -> dict[str, dict]:
+    data: dict[str, Any] | None = cache.load(PATH_CACHE_SETTINGS)
+    if (
+        not isinstance(data, dict)
+        or data.get("version") != CACHE_VERSION
+        or data.get("hash") != get_settings_hash()
+    ):
+        return dict()
+
+    # Об этих проектах уже сообщалось для этого файла настроек
+    _UNPICKLABLE_NAMES.update(data["unpicklable"])
+
+    projects: dict[str, dict] = dict()
+    for name, data_project in data["projects"].items():
+        try:
+            projects[name] = pickle.loads(data_project)
+        except Exception:
+            # Проект будет обработан заново
+            continue
+
+    return projects
+
+
+# Проекты, которые не удалось сохранить в кэш. Список сохраняется в кэше,
+# чтобы сообщать о них один раз, а не при каждом запуске
+_UNPICKLABLE_NAMES: set[str] = set()
+
+
+def save_cached_projects(projects: dict[str, dict]) -> None:
+    # NOTE: Каждый проект сохраняется отдельно, поэтому проект, в котором блок кода вернул
+    #       значение, которое нельзя сохранить (например, функцию), не мешает кэшу остальных
+    data_projects: dict[str, bytes] = dict()
+    unpicklable_names: list[str] = []
+    for name, item in projects.items():
+        try:
+            data_projects[name] = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            unpicklable_names.append(name)
+            if name not in _UNPICKLABLE_NAMES:
+                _UNPICKLABLE_NAMES.add(name)
+                print(f"[#] Проект {name!r} не будет сохранен в кэш: {e}")
+
+    cache.save(
+        PATH_CACHE_SETTINGS,
+        {
+            "version": CACHE_VERSION,
+            "hash": get_settings_hash(),
+            "projects": data_projects,
+            "unpicklable": unpicklable_names,
+        },
+    )
 
-                        version_by_path[version] = version_path
 
-            new_settings[name]["versions"] = version_by_path
+@dataclass
+class ReloadResult:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    # Изменились настройки проекта, его base или проектов, на которые ссылаются его блоки кода
+    changed: list[str] = field(default_factory=list)
+    # Появились или удалились папки версий
+    rescanned: list[str] = field(default_factory=list)
+
+    @property
+    def invalidated(self) -> list[str]:
+        return self.removed + self.changed + self.rescanned
+
+    @property
+    def is_changed(self) -> bool:
+        return bool(self.added or self.invalidated)
+
+    def __str__(self) -> str:
+        lines: list[str] = []
+        for title, names in [
+            ("Добавлены", self.added),
+            ("Удалены", self.removed),
+            ("Изменены", self.changed),
+            ("Изменились папки версий", self.rescanned),
+        ]:
+            if names:
+                lines.append(f"{title}: {', '.join(names)}")
+
+        return "\n".join(lines) if lines else "Без изменений"
+
+
+# Обработанные настройки, в которых каждый проект обрабатывается при первом обращении к нему:
+# заполняется из base, заполняются версии и выполняются блоки кода
+class LazySettings(Mapping):
+    def __init__(self, settings: dict[str, dict], use_cache: bool = False) -> None:
+        self.settings: dict[str, dict] = settings
+        self.use_cache: bool = use_cache
+
+        self.names: list[str] = [name for name in settings if not name.startswith("__")]
+
+        self._base_resolver = BaseResolver(settings)
+        self._projects: dict[str, dict] = dict()
+        self._mtimes: dict[str, dict[str, int | None]] = dict()
+        self._cached_projects: dict[str, dict] | None = None
+        self._version_indexes: dict[str, VersionIndex] = dict()
+
+        # Индексы для поиска по сокращениям: имена проектов и действия каждого проекта
+        self._name_index: AliasIndex | None = None
+        self._action_indexes: dict[str, AliasIndex] = dict()
+
+        # Результаты сканирования папок вместе с временем их изменения на момент сканирования
+        self._root_scans: dict[str, tuple[int | None, dict[str, str] | OSError]] = dict()
+
+        # Еще не выполненные блоки кода у проектов в процессе обработки
+        self._code_blocks: dict[str, dict[KeyPath, CodeBlock]] = dict()
+        # Блоки кода в процессе выполнения, нужны для поиска циклических зависимостей
+        self._evaluating: list[KeyPath] = []
+        self._global_vars: dict[str, Any] | None = None
+
+        # NOTE: На сервере запросы выполняются параллельно. Проект сохраняется до выполнения
+        #       его блоков кода, поэтому даже проверка наличия проекта выполняется под блокировкой.
+        #       Блокировка повторно входимая, т.к. блоки кода обращаются к другим проектам
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> dict:
+        with self._lock:
+            return self._get_project(name)
+
+    def _get_project(self, name: str) -> dict:
+        if name in self._projects:
+            return self._projects[name]
+
+        if name not in self.names:
+            raise KeyError(name)
+
+        if self.use_cache and (project := self._load_from_cache(name)) is not None:
+            return project
+
+        project: dict = self._process(name, self._merge_project(name))
+        if self.use_cache:
+            self._save_cache()
+
+        return project
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.names
+
+    def preload(
+        self,
+        names: Iterable[str] | None = None,
+        ignore_errors: bool = False,
+    ) -> None:
+        with self._lock:
+            self._preload(names, ignore_errors)
+
+    def _preload(
+        self,
+        names: Iterable[str] | None = None,
+        ignore_errors: bool = False,
+    ) -> None:
+        name_by_project: dict[str, dict] = dict()
+        for name in self.names if names is None else names:
+            if name in self._projects or name not in self.names:
+                continue
+
+            if not self.use_cache or self._load_from_cache(name) is None:
+                name_by_project[name] = self._merge_project(name)
+
+        if not name_by_project:
+            return
+
+        # Папки всех проектов сканируются одновременно
+        scanned: dict[str, dict[str, str] | OSError] = self._scan_roots(
+            root
+            for project in name_by_project.values()
+            for root in get_version_roots(project)
+        )
+        for name, project in name_by_project.items():
+            try:
+                self._process(name, project, scanned)
+            except GoException:
+                # Ошибка будет показана при обращении к проекту
+                if not ignore_errors:
+                    raise
+
+        if self.use_cache:
+            self._save_cache()
+
+    def _process(
+        self,
+        name: str,
+        project: dict,
+        scanned: dict[str, dict[str, str] | OSError] | None = None,
+    ) -> dict:
+        with profiler.span(f"process project {name!r}", "settings"):
+            return self._process_project(name, project, scanned)
+
+    def _process_project(
+        self,
+        name: str,
+        project: dict,
+        scanned: dict[str, dict[str, str] | OSError] | None = None,
+    ) -> dict:
+        roots: list[str] = get_version_roots(project)
+        if scanned is None:
+            scanned = self._scan_roots(roots)
+
+        mtimes: dict[str, int | None] = {root: self._root_scans[root][0] for root in roots}
+
+        if has_versions(project):
+            version_by_path: dict[str, str] = get_versions_by_project(name, project, scanned)
+            project["versions"] = {
+                version: version_by_path[version]
+                for version in sorted(version_by_path, key=get_version_key)
+            }
+
+        # NOTE: Проект сохраняется до выполнения блоков кода, т.к. они могут ссылаться
+        #       на этот же проект через self
+        self._projects[name] = project
+        self._code_blocks[name] = find_code_blocks(project)
+        try:
+            with profiler.span("eval code blocks", "settings", name=name):
+                for key_path in list(self._code_blocks[name]):
+                    self._run_code_block(name, key_path)
+        except BaseException:
+            self._projects.pop(name)
+            raise
+        finally:
+            self._code_blocks.pop(name)
+
+        self._mtimes[name] = mtimes
+
+        if self.use_cache:
+            self._cached_projects[name] = {
+                "mtimes": mtimes,
+                "settings": project,
+            }
+
+        return project
+
+    def get_name_index(self) -> AliasIndex:
+        with self._lock:
+            if self._name_index is None:
+                self._name_index = AliasIndex(self.names)
+
+            return self._name_index
+
+    def get_action_index(self, name: str) -> AliasIndex:
+        with self._lock:
+            if name not in self._action_indexes:
+                self._action_indexes[name] = AliasIndex(self[name].get("actions", []))
+
+            return self._action_indexes[name]
+
+    def get_version_index(self, name: str) -> VersionIndex:
+        with self._lock:
+            if name not in self._version_indexes:
+                project: dict = self[name]
+                self._version_indexes[name] = VersionIndex(
+                    versions=project.get("versions", []),
+                    base_version=project.get("base_version"),
+                )
+
+            return self._version_indexes[name]
+
+    def _merge_project(self, name: str) -> dict:
+        # NOTE: Копия верхнего уровня, т.к. в него будут добавлены версии
+        return dict(self._base_resolver.resolve(name))
+
+    def _scan_roots(self, roots: Iterable[str]) -> dict[str, dict[str, str] | OSError]:
+        roots: list[str] = list(dict.fromkeys(roots))
+
+        # Время изменения нужно получить до сканирования, чтобы не пропустить изменения во время него
+        # NOTE: Появление/удаление папок версий меняет время изменения родительской папки
+        mtimes: dict[str, int | None] = cache.get_mtimes(roots)
+
+        # Сканируются только новые и изменившиеся папки
+        changed_roots: list[str] = [
+            root for root in roots
+            if root not in self._root_scans or self._root_scans[root][0] != mtimes[root]
+        ]
+        if changed_roots:
+            with profiler.span("scan version dirs", "disk", roots=len(changed_roots)):
+                for root, result in scan_versions_many(changed_roots).items():
+                    self._root_scans[root] = mtimes[root], result
+
+        return {root: self._root_scans[root][1] for root in roots}
+
+    def _get_global_vars(self) -> dict[str, Any]:
+        if self._global_vars is None:
+            # NOTE: Импортировать нужно тут - глобально нельзя
+            from tool_for_run_project.core import commands
+
+            self._global_vars = {
+                "AvailabilityEnum": AvailabilityEnum,
+                "commands": commands,
+                "self": self,
+            }
+
+        return self._global_vars
+
+    def _run_code_block(self, name: str, key_path: KeyPath) -> None:
+        code_blocks: dict[KeyPath, CodeBlock] | None = self._code_blocks.get(name)
+        if not code_blocks or key_path not in code_blocks:  # Уже выполнен
+            return
+
+        full_key_path: KeyPath = (name, *key_path)
+        if full_key_path in self._evaluating:
+            cycle: list[KeyPath] = self._evaluating[self._evaluating.index(full_key_path):]
+            raise GoException(
+                "Обнаружена циклическая зависимость блоков кода: "
+                + " -> ".join(
+                    ".".join(map(str, x)) for x in [*cycle, full_key_path]
+                )
+            )
+
+        code_block: CodeBlock = code_blocks[key_path]
+
+        self._evaluating.append(full_key_path)
+        try:
+            # Сначала выполняются блоки кода, от значений которых зависит текущий
+            for dependency in code_block.dependencies:
+                dependency_name = dependency[0]
+                if dependency_name not in self.names:
+                    continue
+
+                if dependency_name not in self._code_blocks:
+                    # Обработка проекта, включая выполнение его блоков кода
+                    self[dependency_name]
+
+                for other_key_path in list(self._code_blocks.get(dependency_name, [])):
+                    if is_related_key_paths(dependency[1:], other_key_path):
+                        self._run_code_block(dependency_name, other_key_path)
+
+            value: Any = code_block.eval(self._get_global_vars())
+            set_value(self._projects[name], key_path, value)
+            code_blocks.pop(key_path)
+        finally:
+            self._evaluating.pop()
+
+    def _load_from_cache(self, name: str) -> dict | None:
+        if self._cached_projects is None:
+            with profiler.span("load settings cache", "disk"):
+                self._cached_projects = load_cached_projects()
+
+        item: dict[str, Any] | None = self._cached_projects.get(name)
+        if not item or cache.is_changed_mtimes(item["mtimes"]):
+            return None
+
+        self._projects[name] = item["settings"]
+        self._mtimes[name] = item["mtimes"]
+        return item["settings"]
+
+    def _save_cache(self) -> None:
+        with profiler.span("save settings cache", "disk"):
+            save_cached_projects(self._cached_projects)
+            cache.save_json(Path(completion.PATH_INDEX), self.get_completion_index())
+
+    def get_completion_index(self) -> dict[str, Any]:
+        with self._lock:
+            return self._get_completion_index()
+
+    def _get_completion_index(self) -> dict[str, Any]:
+        # Данные для автодополнения (см. completion.py): у необработанных проектов все берется
+        # из настроек без выполнения блоков кода, а версии - сканированием папок версий
+        project_by_name: dict[str, dict] = dict()
+        unprocessed_names: list[str] = []
+        for name in self.names:
+            project: dict | None = self._projects.get(name)
+            if project is None and self._cached_projects and name in self._cached_projects:
+                project = self._cached_projects[name]["settings"]
+            if project is None:
+                try:
+                    project = self._merge_project(name)
+                except GoException:
+                    continue
+                unprocessed_names.append(name)
+
+            project_by_name[name] = project
+
+        versions_by_name: dict[str, list[str]] = self._scan_unprocessed_versions(
+            {name: project_by_name[name] for name in unprocessed_names}
+        )
+
+        projects: dict[str, dict] = dict()
+        for name, project in project_by_name.items():
+            actions: dict = project.get("actions") or dict()
+            projects[name] = {
+                "versions": versions_by_name.get(name) or list(project.get("versions") or []),
+                "actions": list(actions),
+                # Аргументы действий-словарей, например "ora" и "pg" у "server"
+                "args": {
+                    action: [x for x in value if not x.startswith("__")]
+                    for action, value in actions.items()
+                    if isinstance(value, dict)
+                },
+            }
+
+        return {
+            "version": completion.INDEX_VERSION,
+            "layouts": layouts.LAYOUTS,
+            "names": self.names,
+            "projects": projects,
+        }
+
+    def _scan_unprocessed_versions(self, project_by_name: dict[str, dict]) -> dict[str, list[str]]:
+        # NOTE: Из блоков кода выполняется только опция версии, если она не зависит от других проектов
+        #       (обычно это "${AvailabilityEnum.OPTIONAL}"), пути версий блоками кода не задаются
+        roots_by_name: dict[str, list[str]] = dict()
+        for name, project in project_by_name.items():
+            option: Any = (project.get("options") or dict()).get("version")
+            if isinstance(option, str) and (code_block := compile_code_block(option)):
+                if code_block.dependencies:
+                    continue
 
-    # Removing private names
-    private_names = [name for name in new_settings if name.startswith("__")]
-    for name in private_names:
-        new_settings.pop(name)
+                try:
+                    option = code_block.eval(self._get_global_vars())
+                except Exception:
+                    continue
+
+            if "path" not in project or option == AvailabilityEnum.PROHIBITED:
+                continue
+
+            path_value: str | list[str] = project["path"]
+            roots_by_name[name] = [path_value] if isinstance(path_value, str) else list(path_value)
+
+        if not roots_by_name:
+            return dict()
+
+        # Папки сканируются одновременно, повторно - только изменившиеся
+        scanned: dict[str, dict[str, str] | OSError] = self._scan_roots(
+            root for roots in roots_by_name.values() for root in roots
+        )
+
+        versions_by_name: dict[str, list[str]] = dict()
+        for name in roots_by_name:
+            try:
+                version_by_path: dict[str, str] = get_versions_by_project(
+                    name, project_by_name[name], scanned
+                )
+            except GoException:
+                continue
+
+            versions_by_name[name] = sorted(version_by_path, key=get_version_key)
+
+        return versions_by_name
+
+    def get_mtimes(self, name: str) -> dict[str, int | None]:
+        # Время изменения папок версий проекта на момент его обработки
+        with self._lock:
+            return dict(self._mtimes.get(name, dict()))
+
+    def get_changed_projects(self) -> list[str]:
+        with self._lock:
+            return [
+                name for name, mtimes in self._mtimes.items()
+                if cache.is_changed_mtimes(mtimes)
+            ]
+
+    def invalidate(self, names: Iterable[str]) -> None:
+        with self._lock:
+            for name in names:
+                self._projects.pop(name, None)
+                self._mtimes.pop(name, None)
+                self._version_indexes.pop(name, None)
+                self._action_indexes.pop(name, None)
+                if self._cached_projects:
+                    self._cached_projects.pop(name, None)
+
+    def reload(self, settings: dict[str, dict]) -> ReloadResult:
+        with self._lock:
+            return self._reload(settings)
+
+    def _reload(self, settings: dict[str, dict]) -> ReloadResult:
+        names: list[str] = [name for name in settings if not name.startswith("__")]
+
+        result = ReloadResult(
+            added=[name for name in names if name not in self.names],
+            removed=[name for name in self.names if name not in names],
+        )
+
+        # Проект изменился, если изменились его настройки или настройки его base
+        changed: set[str] = {
+            name
+            for name in names
+            if name in self.names
+            and [self.settings.get(x) for x in get_base_chain(name, self.settings)]
+            != [settings.get(x) for x in get_base_chain(name, settings)]
+        }
+
+        # Или изменились проекты, на которые ссылаются его блоки кода
+        invalid_names: set[str] = changed | set(result.added) | set(result.removed)
+
+        # NOTE: Сбрасывать нужно и проекты из кэша, к которым еще не обращались в этом процессе,
+        #       иначе кэш с их старыми значениями будет сохранен для нового файла настроек
+        loaded_names: set[str] = set(self._projects) | set(self._cached_projects or ())
+
+        base_resolver = BaseResolver(settings)
+        dependency_names_by_project: dict[str, set[str]] = dict()
+        for name in loaded_names:
+            if name not in names or name in invalid_names:
+                continue
+
+            try:
+                dependency_names_by_project[name] = get_dependency_names(
+                    name, base_resolver.resolve(name)
+                )
+            except GoException:
+                changed.add(name)
+                invalid_names.add(name)
+        while True:
+            new_changed: set[str] = {
+                name
+                for name, dependency_names in dependency_names_by_project.items()
+                if name not in invalid_names and dependency_names & invalid_names
+            }
+            if not new_changed:
+                break
+
+            changed |= new_changed
+            invalid_names |= new_changed
+
+        # Только у обработанных или закэшированных проектов есть что сбрасывать
+        result.changed = [name for name in names if name in changed and name in loaded_names]
+        result.rescanned = [
+            name for name in self.get_changed_projects()
+            if name in names and name not in changed
+        ]
+
+        self.settings = settings
+        self.names = names
+        self._name_index = None
+        self._base_resolver = base_resolver
+        self.invalidate(result.invalidated)
+
+        if self.use_cache and self._cached_projects is not None:
+            # Кэш остальных проектов остается актуальным для нового файла настроек
+            self._save_cache()
+
+        return result
 
-    walk_dict(new_settings, lambda k, v: walk_dir_run_code(k, v, new_settings))
 
-    return new_settings
+def settings_preprocess(settings: dict[str, dict]) -> dict[str, dict]:
+    lazy_settings = LazySettings(settings)
+    lazy_settings.preload()
+    return {name: lazy_settings[name] for name in lazy_settings}
 
 
-SETTINGS = __SETTINGS
+SETTINGS: LazySettings = LazySettings(__SETTINGS)
 
 
-def run_settings_preprocess() -> None:
+def run_settings_preprocess(use_cache: bool = True) -> None:
     global SETTINGS
-    SETTINGS = settings_preprocess(__SETTINGS)
+    SETTINGS = LazySettings(__SETTINGS, use_cache=use_cache)
+
+
+def reload() -> ReloadResult:
+    if is_settings_changed():
+        read_settings()
+
+    return SETTINGS.reload(__SETTINGS)
 
 
 def get_project(name: str) -> dict:
@@ -174,12 +786,22 @@ def get_project(name: str) -> dict:
     return SETTINGS[name]
 
 
+def get_version_index(name: str) -> VersionIndex:
+    name = resolve_name(name)
+    return SETTINGS.get_version_index(name)
+
+
+def get_action_index(name: str) -> AliasIndex:
+    name = resolve_name(name)
+    return SETTINGS.get_action_index(name)
+
+
 def resolve_name(alias: str) -> str:
-    return resolve_alias(
-        alias=alias,
-        supported=list(SETTINGS),
-        unknown_alias_exception_cls=UnknownNameException,
-    )
+    # Полное имя (например, после разбора аргументов) не нужно искать по сокращениям
+    if alias in SETTINGS:
+        return alias
+
+    return SETTINGS.get_name_index().resolve(alias, UnknownNameException)
 
 
 def get_path_by_name(name: str) -> str | list[str]:
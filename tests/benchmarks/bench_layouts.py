@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+from tool_for_run_project.core import AliasIndex, resolve_alias, UnknownActionException
+from tool_for_run_project.core import layouts
+from tool_for_run_project.third_party.from_ghbdtn import from_ghbdtn
+
+from tests.benchmarks.bench_versions import measure
+
+
+def create_items(count: int) -> list[str]:
+    words: list[str] = ["server", "designer", "explorer", "update", "compile", "trunk"]
+    return [f"{words[i % len(words)]}_{i}" for i in range(count)]
+
+
+def legacy_convert_many(items: list[str]) -> list[str]:
+    return [from_ghbdtn(x) for x in items]
+
+
+def convert_each(items: list[str]) -> list[str]:
+    return [layouts.convert(x) for x in items]
+
+
+def resolve_each(aliases: list[str], items: list[str]) -> None:
+    for alias in aliases:
+        resolve_alias(alias, items, UnknownActionException)
+
+
+def resolve_each_with_index(aliases: list[str], index: AliasIndex) -> None:
+    for alias in aliases:
+        index.resolve(alias, UnknownActionException)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of keyboard layout conversion")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    items: list[str] = create_items(args.items)
+    print(f"Items: {len(items)}")
+
+    assert legacy_convert_many(items) == convert_each(items) == layouts.convert_many(items)
+
+    legacy_seconds = measure(legacy_convert_many, items, repeat=args.repeat)
+    for title, func in [
+        ("layouts.convert", convert_each),
+        ("layouts.convert_many", layouts.convert_many),
+    ]:
+        seconds = measure(func, items, repeat=args.repeat)
+        print(f"{title + ':':<22}{seconds * 1000:.3f} ms (x{legacy_seconds / seconds:.1f})")
+    print(f"{'from_ghbdtn:':<22}{legacy_seconds * 1000:.3f} ms")
+
+    # Поиск по алиасам, набранным в другой раскладке
+    aliases: list[str] = layouts.convert_many(items[:50])
+
+    seconds = measure(resolve_each, aliases, items, repeat=args.repeat)
+    print(f"{'resolve_alias:':<22}{seconds * 1000:.3f} ms ({len(aliases)} aliases)")
+
+    index = AliasIndex(items)
+    seconds = measure(resolve_each_with_index, aliases, index, repeat=args.repeat)
+    print(f"{'AliasIndex.resolve:':<22}{seconds * 1000:.3f} ms ({len(aliases)} aliases)")
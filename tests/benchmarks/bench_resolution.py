@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Бенчмарк обработки настроек и разбора команд на большой фейковой конфигурации.
+#       Результаты можно сохранить (--save) и сравнить с ними результаты другого коммита (--compare)
+
+
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from pathlib import Path
+from typing import Any, Callable
+
+from tests import fake_env
+from tests.benchmarks.bench_versions import measure
+
+
+# NOTE: Во сколько раз результат может быть медленнее сохраненного, чтобы не считаться регрессией
+DEFAULT_THRESHOLD: float = 1.2
+
+
+def get_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL,
+            encoding="utf-8",
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_cli(args: list[str], module: str = "tool_for_run_project.go") -> None:
+    subprocess.run(
+        [sys.executable, "-m", module, *args],
+        env=os.environ | {"PYTHONPATH": os.pathsep.join(sys.path)},
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+
+
+def run_benchmarks(dir_env: Path, projects: int, versions: int, repeat: int) -> dict[str, float]:
+    raw_settings: dict[str, dict] = fake_env.create_large_settings(dir_env, projects, versions)
+
+    path_settings: Path = dir_env / "settings.json"
+    path_settings.write_text(json.dumps(raw_settings, indent=4), encoding="utf-8")
+
+    dir_cache: Path = dir_env / "cache"
+
+    # NOTE: Как и в тестах, переменные окружения нужно задать до импорта settings.py
+    os.environ["PATH_SETTINGS"] = str(path_settings)
+    os.environ["PATH_CACHE"] = str(dir_cache)
+
+    from tool_for_run_project import go, settings
+    from tool_for_run_project.core import UnknownNameException, resolve_alias
+    from tool_for_run_project.core.commands import resolve_version
+
+    settings.SETTINGS.preload()
+
+    names: list[str] = list(settings.SETTINGS)
+    project_names: list[str] = [name for name in names if settings.get_project(name).get("versions")]
+    roots: list[str] = [
+        root
+        for name in project_names
+        for root in settings.get_version_roots(settings.get_project(name))
+    ]
+    total_versions: int = sum(len(settings.get_project(name)["versions"]) for name in project_names)
+    print(f"Projects: {len(names)}, roots: {len(roots)}, versions: {total_versions}")
+
+    def _resolve_alias() -> None:
+        # NOTE: resolve_alias каждый раз составляет индекс, поэтому вызовов меньше, чем имен
+        for name in names[::10]:
+            resolve_alias(name, names, UnknownNameException)
+
+    def _resolve_name() -> None:
+        for name in names:
+            settings.resolve_name(name[:-1] + name[-1].upper())
+
+    def _resolve_version() -> None:
+        for name in project_names:
+            resolve_version(name, "trunk")
+            resolve_version(name, "tr")
+            resolve_version(name, "2")
+
+    def _parse_cmd_args() -> None:
+        for name in project_names:
+            go.parse_cmd_args([name, "1-tr", "s+d", "pg"])
+
+    def _run_cli_cold() -> None:
+        shutil.rmtree(dir_cache, ignore_errors=True)
+        run_cli([project_names[-1]])
+
+    benchmarks: dict[str, Callable[[], Any]] = {
+        "settings_preprocess": lambda: settings.settings_preprocess(raw_settings),
+        "get_versions_by_path": lambda: [settings.get_versions_by_path(root) for root in roots],
+        "resolve_alias": _resolve_alias,
+        "resolve_name": _resolve_name,
+        "resolve_version": _resolve_version,
+        "parse_cmd_args": _parse_cmd_args,
+        "cli_startup_cold": _run_cli_cold,
+        "cli_startup_warm": lambda: run_cli([project_names[-1]]),
+        "cli_complete": lambda: run_cli(
+            [project_names[-1], "s", ""], module="tool_for_run_project.completion"
+        ),
+    }
+
+    results: dict[str, float] = dict()
+    for name, func in benchmarks.items():
+        results[name] = measure(func, repeat=repeat)
+        print(f"{name:<25} {results[name] * 1000:>10.2f} ms")
+
+    return results
+
+
+def compare(baseline: dict[str, Any], results: dict[str, float], threshold: float) -> list[str]:
+    print()
+    print(f"Compare with {baseline.get('commit')} ({baseline.get('params')}):")
+
+    regressions: list[str] = []
+    for name, seconds in results.items():
+        base_seconds: float | None = baseline["results"].get(name)
+        if not base_seconds:
+            print(f"{name:<25} {'-':>10} {seconds * 1000:>10.2f} ms")
+            continue
+
+        ratio: float = seconds / base_seconds
+        mark: str = ""
+        if ratio > threshold:
+            mark = "REGRESSION"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            mark = "faster"
+
+        print(
+            f"{name:<25} {base_seconds * 1000:>10.2f} -> {seconds * 1000:>10.2f} ms"
+            f" (x{ratio:.2f}) {mark}"
+        )
+
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of settings and command resolution")
+    parser.add_argument("--projects", type=int, default=300)
+    parser.add_argument("--versions", type=int, default=5, help="Versions per base_version template")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", type=Path, help="Save results as a baseline")
+    parser.add_argument("--compare", type=Path, help="Compare results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+
+    params: dict[str, int] = {
+        "projects": args.projects,
+        "versions": args.versions,
+        "repeat": args.repeat,
+    }
+
+    dir_tmp = Path(tempfile.mkdtemp(prefix="bench_resolution_"))
+    try:
+        results: dict[str, float] = run_benchmarks(dir_tmp, args.projects, args.versions, args.repeat)
+    finally:
+        shutil.rmtree(dir_tmp, ignore_errors=True)
+
+    if args.save:
+        args.save.write_text(
+            json.dumps(
+                {
+                    "commit": get_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "params": params,
+                    "results": results,
+                },
+                indent=4,
+            ),
+            encoding="utf-8",
+        )
+        print(f"\nSaved to {str(args.save)!r}")
+
+    if args.compare:
+        baseline: dict[str, Any] = json.loads(args.compare.read_text(encoding="utf-8"))
+        if baseline.get("params") != params:
+            print(f"\n[!] Parameters differ from the baseline: {baseline.get('params')}")
+
+        if compare(baseline, results, args.threshold):
+            sys.exit(1)
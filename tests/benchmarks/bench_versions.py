@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+import shutil
+import tempfile
+
+from pathlib import Path
+from timeit import default_timer
+
+from tool_for_run_project.core import is_like_a_version
+from tool_for_run_project.core.versions import scan_versions_many
+
+
+def create_tree(path: Path, roots: int, versions: int) -> list[str]:
+    paths: list[str] = []
+
+    number = 1
+    for i in range(roots):
+        root = path / f"root_{i}"
+        root.mkdir(parents=True)
+        paths.append(str(root))
+
+        for _ in range(versions):
+            (root / f"3.2.{number}.10").mkdir()
+            number += 1
+
+        # Мусор, который не должен попасть в версии
+        (root / "docs").mkdir()
+        (root / "readme.txt").touch()
+
+    return paths
+
+
+# NOTE: Прежняя реализация для сравнения
+def legacy_scan(paths: list[str]) -> dict[str, dict[str, str]]:
+    path_by_versions: dict[str, dict[str, str]] = dict()
+    for path in paths:
+        version_by_path = dict()
+        dir_path = Path(path)
+        if dir_path.is_dir():
+            for p in dir_path.iterdir():
+                if p.is_dir() and is_like_a_version(p.name):
+                    version_by_path[p.name] = str(p)
+        path_by_versions[path] = version_by_path
+
+    return path_by_versions
+
+
+def measure(func, *args, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = default_timer()
+        func(*args)
+        best = min(best, default_timer() - start_time)
+
+    return best
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark of version discovery")
+    parser.add_argument("--roots", type=int, default=8)
+    parser.add_argument("--versions", type=int, default=500, help="Versions per root")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    dir_tmp = Path(tempfile.mkdtemp(prefix="bench_versions_"))
+    try:
+        paths: list[str] = create_tree(dir_tmp, args.roots, args.versions)
+        print(f"Roots: {args.roots}, versions: {args.roots * args.versions}")
+
+        assert legacy_scan(paths) == scan_versions_many(paths)
+
+        legacy_seconds = measure(legacy_scan, paths, repeat=args.repeat)
+        seconds = measure(scan_versions_many, paths, repeat=args.repeat)
+        print(f"iterdir + is_dir:   {legacy_seconds * 1000:.2f} ms")
+        print(f"scan_versions_many: {seconds * 1000:.2f} ms (x{legacy_seconds / seconds:.1f})")
+    finally:
+        shutil.rmtree(dir_tmp, ignore_errors=True)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+__author__ = "ipetrash"
+
+
+# NOTE: Фейковое окружение для тестов и бенчмарков: файл настроек и папки версий проектов
+
+
+import json
+
+from pathlib import Path
+
+
+SETTINGS_TEMPLATE_JSON: str = r"""
+{
+    "__radix_base": {
+        "options": {
+            "version": "${AvailabilityEnum.OPTIONAL}",
+            "action": "${AvailabilityEnum.REQUIRED}",
+            "args": "${AvailabilityEnum.OPTIONAL}",
+            "default_version": "trunk"
+        },
+        "actions": {
+            "designer": "!!designer.cmd",
+            "server": {
+                "__default__": "ora",
+                "ora": "!!server.cmd",
+                "pg": "!!server-postgres.cmd"
+            },
+            "update": [
+                "svn update",
+                "${commands.svn_update}"
+            ],
+            "log": [
+                "svn log",
+                "start /b \"\" TortoiseProc /command:log /path:\"{path}\" /findstring:\"{find_string}\""
+            ]
+        },
+        "vars": {
+            "URL_JENKINS": "http://127.0.0.1:8080"
+        }
+    },
+    "tx": {
+        "base": "__radix_base",
+        "path": "C:/DEV__TX",
+        "base_version": "3.2.{number}",
+        "jenkins_url": "${self['tx']['vars']['URL_JENKINS'] + '/job/assemble_tx/branch={version},label=lightweight/lastBuild/api/json?tree=result,timestamp,url'}",
+        "svn_dev_url": "svn://127.0.0.1/tx/dev/trunk"
+    },
+    "optt": {
+        "base": "__radix_base",
+        "path": "C:/DEV__OPTT",
+        "base_version": [
+            "2.1.{number}",
+            "3.1.{number}"
+        ],
+        "jenkins_url": "${self['optt']['vars']['URL_JENKINS'] + '/job/OPTT_{version}_build/lastBuild/api/json?tree=result,timestamp,url'}",
+        "svn_dev_url": "svn://127.0.0.1/optt/dev/trunk"
+    },
+    "abc": {
+        "base": "__radix_base",
+        "path": [
+            "C:/DEV__ABC",
+            "C:/local/remote/foo/bar",
+            "C:/local/remote/foo/abc"
+        ],
+        "base_version": "4.1.{number}.10-dev",
+        "jenkins_url": "${self['abc']['vars']['URL_JENKINS'] + '/job/ABC_{version}_build/lastBuild/api/json?tree=result,timestamp,url'}",
+        "svn_dev_url": "svn://127.0.0.1/abc/dev/trunk"
+    },
+    "__simple_base": {
+        "options": {
+            "version": "${AvailabilityEnum.PROHIBITED}",
+            "action": "${AvailabilityEnum.PROHIBITED}",
+            "args": "${AvailabilityEnum.PROHIBITED}"
+        }
+    },
+    "manager": {
+        "base": "__simple_base",
+        "path": "C:/DEV__RADIX/manager/manager/bin/manager.cmd",
+        "options": {
+            "action": "${AvailabilityEnum.OPTIONAL}"
+        },
+        "actions": {
+            "up": "${commands.manager_up}",
+            "clean": "${commands.manager_clean}"
+        }
+    },
+    "file": {
+        "base": "__simple_base",
+        "path": "C:/txt/1.txt"
+    },
+    "specifications": {
+        "base": "__simple_base",
+        "path": "C:/DOC/Specifications"
+    }
+}
+"""
+
+FILE_NAMES: list[str] = ["!!designer.cmd", "!!server.cmd", "!!server-postgres.cmd"]
+
+
+def set_root(settings_json: str, dir_env: Path) -> str:
+    # Пути "C:/..." из шаблона переносятся внутрь dir_env
+    return settings_json.replace(
+        "C:/", (str(dir_env) + "\\").replace("\\", "\\\\")
+    )
+
+
+def create_files(path: Path | str, version: str) -> None:
+    d = Path(path) / version
+    d.mkdir(parents=True, exist_ok=True)
+    for file_name in FILE_NAMES:
+        (d / file_name).touch(exist_ok=True)
+
+
+def create_version_dirs(
+    settings: dict[str, dict],
+    versions_per_template: int = 3,
+    default_version: str | None = "trunk",
+) -> None:
+    # Папки версий создаются для проектов с base_version, по versions_per_template на каждый шаблон
+    for project in settings.values():
+        base_version: str | list[str] | None = project.get("base_version")
+        if not base_version:
+            continue
+
+        path_value: str | list[str] = project["path"]
+
+        if isinstance(base_version, list):
+            base_versions: list[str] = base_version
+        else:
+            base_versions: list[str] = [base_version]
+
+        if isinstance(path_value, list):
+            path_values: list[str] = path_value
+        else:
+            path_values: list[str] = [path_value]
+
+        version_default: str | None = default_version
+
+        version = 1
+        for path in path_values:
+            if version_default:  # Для сохранения уникальности версий
+                create_files(path, version_default)
+                version_default = None
+
+            for v in base_versions:
+                for _ in range(versions_per_template):
+                    create_files(path, v.format(number=version))
+                    version += 1
+
+
+def create_large_settings(
+    dir_env: Path,
+    projects: int,
+    versions_per_template: int,
+) -> dict[str, dict]:
+    # Настройки из шаблона, в которых каждый проект с версиями повторяется много раз
+    template: dict[str, dict] = json.loads(set_root(SETTINGS_TEMPLATE_JSON, dir_env))
+    names: list[str] = [name for name, project in template.items() if "base_version" in project]
+
+    settings: dict[str, dict] = {
+        name: project
+        for name, project in template.items()
+        if name not in names
+    }
+    for i in range(projects):
+        template_name: str = names[i % len(names)]
+        name: str = f"{template_name}{i}"
+
+        project_json: str = json.dumps(template[template_name])
+        project_json = project_json.replace(f"self['{template_name}']", f"self['{name}']")
+        project_json = project_json.replace("DEV__", f"DEV_{i}__").replace("local/", f"local_{i}/")
+        settings[name] = json.loads(project_json)
+
+    create_version_dirs(settings, versions_per_template)
+    return settings
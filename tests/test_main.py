@@ -4,12 +4,22 @@
 __author__ = "ipetrash"
 
 
+import io
 import json
 import os
 import shutil
-
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
 from pathlib import Path
-from unittest import TestCase
+from unittest import TestCase, mock
+
+from tests import fake_env
 
 
 DIR: Path = Path(__file__).parent.resolve()
@@ -18,137 +28,23 @@ DIR_ENV: Path = DIR / "env"
 shutil.rmtree(DIR_ENV, ignore_errors=True)
 DIR_ENV.mkdir(parents=True, exist_ok=True)
 
-SETTINGS_TEMPLATE_JSON: str = r"""
-{
-    "__radix_base": {
-        "options": {
-            "version": "${AvailabilityEnum.OPTIONAL}",
-            "action": "${AvailabilityEnum.REQUIRED}",
-            "args": "${AvailabilityEnum.OPTIONAL}",
-            "default_version": "trunk"
-        },
-        "actions": {
-            "designer": "!!designer.cmd",
-            "server": {
-                "__default__": "ora",
-                "ora": "!!server.cmd",
-                "pg": "!!server-postgres.cmd"
-            },
-            "update": [
-                "svn update",
-                "${commands.svn_update}"
-            ],
-            "log": [
-                "svn log",
-                "start /b \"\" TortoiseProc /command:log /path:\"{path}\" /findstring:\"{find_string}\""
-            ]
-        },
-        "vars": {
-            "URL_JENKINS": "http://127.0.0.1:8080"
-        }
-    },
-    "tx": {
-        "base": "__radix_base",
-        "path": "C:/DEV__TX",
-        "base_version": "3.2.{number}",
-        "jenkins_url": "${self['tx']['vars']['URL_JENKINS'] + '/job/assemble_tx/branch={version},label=lightweight/lastBuild/api/json?tree=result,timestamp,url'}",
-        "svn_dev_url": "svn://127.0.0.1/tx/dev/trunk"
-    },
-    "optt": {
-        "base": "__radix_base",
-        "path": "C:/DEV__OPTT",
-        "base_version": [
-            "2.1.{number}",
-            "3.1.{number}"
-        ],
-        "jenkins_url": "${self['optt']['vars']['URL_JENKINS'] + '/job/OPTT_{version}_build/lastBuild/api/json?tree=result,timestamp,url'}",
-        "svn_dev_url": "svn://127.0.0.1/optt/dev/trunk"
-    },
-    "abc": {
-        "base": "__radix_base",
-        "path": [
-            "C:/DEV__ABC",
-            "C:/local/remote/foo/bar",
-            "C:/local/remote/foo/abc"
-        ],
-        "base_version": "4.1.{number}.10-dev",
-        "jenkins_url": "${self['abc']['vars']['URL_JENKINS'] + '/job/ABC_{version}_build/lastBuild/api/json?tree=result,timestamp,url'}",
-        "svn_dev_url": "svn://127.0.0.1/abc/dev/trunk"
-    },
-    "__simple_base": {
-        "options": {
-            "version": "${AvailabilityEnum.PROHIBITED}",
-            "action": "${AvailabilityEnum.PROHIBITED}",
-            "args": "${AvailabilityEnum.PROHIBITED}"
-        }
-    },
-    "manager": {
-        "base": "__simple_base",
-        "path": "C:/DEV__RADIX/manager/manager/bin/manager.cmd",
-        "options": {
-            "action": "${AvailabilityEnum.OPTIONAL}"
-        },
-        "actions": {
-            "up": "${commands.manager_up}",
-            "clean": "${commands.manager_clean}"
-        }
-    },
-    "file": {
-        "base": "__simple_base",
-        "path": "C:/txt/1.txt"
-    },
-    "specifications": {
-        "base": "__simple_base",
-        "path": "C:/DOC/Specifications"
-    }
-}
-"""
-
-SETTINGS_TEMPLATE_JSON = SETTINGS_TEMPLATE_JSON.replace(
-    "C:/", (str(DIR_ENV) + "\\").replace("\\", "\\\\")
-)
-
+SETTINGS_TEMPLATE_JSON: str = fake_env.set_root(fake_env.SETTINGS_TEMPLATE_JSON, DIR_ENV)
 SETTINGS_TEMPLATE = json.loads(SETTINGS_TEMPLATE_JSON)
-for name in ["tx", "optt", "abc"]:
-    path_value: str | list[str] = SETTINGS_TEMPLATE[name]["path"]
-    default_version = SETTINGS_TEMPLATE["__radix_base"]["options"]["default_version"]
-    base_version: str | list[str] = SETTINGS_TEMPLATE[name]["base_version"]
-
-    def _create_files(path: str, version: str) -> None:
-        for file_name in ["!!designer.cmd", "!!server.cmd", "!!server-postgres.cmd"]:
-            d = DIR_ENV / path / version
-            d.mkdir(parents=True, exist_ok=True)
-            (d / file_name).touch(exist_ok=True)
-
-    if isinstance(base_version, list):
-        base_versions: list[str] = base_version
-    else:
-        base_versions: list[str] = [base_version]
-
-    if isinstance(path_value, list):
-        path_values: list[str] = path_value
-    else:
-        path_values: list[str] = [path_value]
-
-    version = 1
-    for path in path_values:
-        if default_version:  # Для сохранения уникальности версий
-            _create_files(path, default_version)
-            default_version = None
-
-        for v in base_versions:
-            for i in range(3):
-                _create_files(path, v.format(number=version))
-                version += 1
+fake_env.create_version_dirs(SETTINGS_TEMPLATE)
 
 PATH_TEST_SETTINGS: Path = DIR_ENV / "test-settings.json"
 PATH_TEST_SETTINGS.write_text(SETTINGS_TEMPLATE_JSON, encoding="utf-8")
 
 # NOTE: Установка переменной окружения до импорта модулей, который явно или не явно импортируют модуль settings.py
 os.environ["PATH_SETTINGS"] = str(PATH_TEST_SETTINGS)
+os.environ["PATH_CACHE"] = str(DIR_ENV / "cache")
 
 from tool_for_run_project import go, settings
 
+from tool_for_run_project.core import layouts
+from tool_for_run_project.core.fuzzy import DeletionIndex, get_distance
+from tool_for_run_project.core.code_block import compile_code_block
+from tool_for_run_project.core.versions import VersionIndex, scan_versions_many
 from tool_for_run_project.core.commands import (
     resolve_actions,
     resolve_version,
@@ -156,6 +52,7 @@ from tool_for_run_project.core.commands import (
     get_file_by_action,
 )
 from tool_for_run_project.core import (
+    AliasIndex,
     UnknownActionException,
     UnknownArgException,
     UnknownNameException,
@@ -167,6 +64,8 @@ from tool_for_run_project.core import (
     is_like_a_short_version, commands,
 )
 
+from tool_for_run_project.third_party.from_ghbdtn import from_ghbdtn
+
 SETTINGS = go.SETTINGS
 
 
@@ -233,6 +132,109 @@ class TestCommon(TestCase):
                 self.assertIsNone(get_similar_value("ru", items))
             self.assertEqual(["run", "run2", "run3"], cm.exception.variants)
 
+    def test_alias_index(self) -> None:
+        index = AliasIndex(["revert", "run", "run2", "run3", "Designer"])
+
+        self.assertEqual(index.resolve("RUN", UnknownActionException), "run")
+        self.assertEqual(index.resolve("rev", UnknownActionException), "revert")
+        self.assertEqual(index.resolve("d", UnknownActionException), "Designer")
+        self.assertEqual(index.resolve("кум", UnknownActionException), "revert")
+        self.assertEqual(index.resolve("в", UnknownActionException), "Designer")
+
+        with self.assertRaises(MultipleResultsFoundError) as cm:
+            index.resolve("ru", UnknownActionException)
+        self.assertEqual(["run", "run2", "run3"], cm.exception.variants)
+
+        with self.assertRaises(MultipleResultsFoundError) as cm:
+            index.resolve("кг", UnknownActionException)
+        self.assertEqual(["кгт", "кгт2", "кгт3"], cm.exception.variants)
+
+        with self.assertRaises(UnknownActionException) as cm:
+            index.resolve("runner", UnknownActionException)
+        self.assertEqual(sorted(index.supported), cm.exception.supported)
+
+        with self.subTest(msg="Prebuilt indexes"):
+            self.assertIs(SETTINGS.get_name_index(), SETTINGS.get_name_index())
+            self.assertIs(settings.get_action_index("еч"), settings.get_action_index("tx"))
+
+    def test_layouts(self) -> None:
+        self.assertEqual(layouts.convert("trunk"), "екгтл")
+        self.assertEqual(layouts.convert("екгтл", "ru", "en"), "trunk")
+        self.assertEqual(layouts.convert("Ghbdtn!"), from_ghbdtn("Ghbdtn!"))
+        self.assertEqual(layouts.get_variants("trunk"), ["екгтл"])
+        self.assertEqual(layouts.get_variants("3.2.1"), ["3/2/1", "3ю2ю1"])
+
+        items: list[str] = ["server", "сервер", "", "a\0b", "3.2.1"]
+        self.assertEqual(
+            layouts.convert_many(items, "ru", "en"),
+            [layouts.convert(x, "ru", "en") for x in items],
+        )
+
+        with self.assertRaises(ValueError):
+            layouts.convert("trunk", "en", "de")
+
+        with self.subTest(msg="Both directions"):
+            supported: list[str] = ["trunk", "сервер"]
+            for expected, alias in [
+                ("trunk", "екгтл"),
+                ("trunk", "tr"),
+                ("сервер", "cthdth"),
+                ("сервер", "cth"),
+            ]:
+                self.assertEqual(expected, resolve_alias(alias, supported, UnknownActionException))
+
+    def test_fuzzy_alias(self) -> None:
+        self.assertEqual(get_distance("desinger", "designer"), 1)
+        self.assertEqual(get_distance("kitten", "sitting"), 3)
+        self.assertEqual(get_distance("kitten", "sitting", max_distance=1), 2)
+
+        supported: list[str] = ["server", "explorer", "designer", "designer2", "сервер"]
+        for expected, alias in [
+            ("designer", "desinger"),
+            ("designer", "вуыштпук"),
+            ("server", "serevr"),
+            ("сервер", "cthdhth"),
+            (MultipleResultsFoundError, "designr3"),
+            (UnknownActionException, "dsnr"),
+            # NOTE: Для коротких алиасов исправления не допускаются
+            (UnknownActionException, "sx"),
+        ]:
+            with self.subTest(expected=expected, alias=alias):
+                if isinstance(expected, str):
+                    self.assertEqual(
+                        expected,
+                        resolve_alias(alias, supported, UnknownActionException, fuzzy_distance=2),
+                    )
+                else:
+                    with self.assertRaises(expected):
+                        resolve_alias(alias, supported, UnknownActionException, fuzzy_distance=2)
+
+        with self.subTest(msg="Disabled by default"):
+            with self.assertRaises(UnknownActionException):
+                resolve_alias("desinger", supported, UnknownActionException)
+
+        with self.subTest(msg="Empty alias"):
+            for alias in ["", None]:
+                with self.assertRaises(UnknownNameException):
+                    AliasIndex(["tx"]).resolve(alias, UnknownNameException, fuzzy_distance=2)
+
+        with self.subTest(msg="Versions without typos"):
+            index = VersionIndex(["3.2.8", "3.2.10", "trunk"])
+            for alias in ["3.2.9", "3.2.18", "turnk"]:
+                with self.assertRaises(UnknownVersionException):
+                    index.aliases.resolve(alias, UnknownVersionException, fuzzy_distance=2)
+
+        with self.subTest(msg="Same results as a full scan"):
+            words: list[str] = [f"3.2.{i}.10" for i in range(300)] + ["trunk", "trunk_optt"]
+            index = DeletionIndex(words, max_distance=2)
+            for word in ["3.2.15.01", "3.2.1510", "turnk", "3.2.299.1"]:
+                expected = sorted(
+                    (distance, x)
+                    for x in words
+                    if (distance := get_distance(word, x)) <= 2
+                )
+                self.assertEqual(expected, index.search(word))
+
     def test_is_like_a_short_version(self) -> None:
         self.assertTrue(is_like_a_short_version("22"))
         self.assertFalse(is_like_a_short_version("3.2.22"))
@@ -278,6 +280,318 @@ class TestSettings(TestCase):
             sorted(version_by_path.keys()),
         )
 
+    def test_scan_versions_many(self) -> None:
+        path_value: list[str] = settings.get_path_by_name("abc")
+        path_not_exists: str = str(DIR_ENV / "not_exists")
+        path_file: str = str(PATH_TEST_SETTINGS)
+
+        path_by_versions = scan_versions_many([*path_value, path_not_exists, path_file])
+        for path in path_value:
+            self.assertEqual(path_by_versions[path], settings.get_versions_by_path(path))
+        self.assertIsInstance(path_by_versions[path_not_exists], FileNotFoundError)
+        self.assertIsInstance(path_by_versions[path_file], NotADirectoryError)
+
+        self.assertEqual(
+            settings.get_versions_by_project("abc", settings.get_project("abc")),
+            settings.get_project("abc")["versions"],
+        )
+
+        for path in [path_not_exists, path_file]:
+            with self.assertRaises(settings.GoException):
+                settings.get_versions_by_project("abc", {"path": [*path_value, path]})
+
+    def test_settings_preprocess(self) -> None:
+        raw_settings: dict = json.loads(SETTINGS_TEMPLATE_JSON)
+        self.assertEqual(
+            settings.settings_preprocess(raw_settings),
+            {name: settings.get_project(name) for name in settings.SETTINGS},
+        )
+
+    def test_code_blocks(self) -> None:
+        with self.subTest(msg="Compile once"):
+            value = "${self['tx']['vars']['URL_JENKINS'] + '/job'}"
+            code_block = compile_code_block(value)
+            self.assertIs(code_block, compile_code_block(value))
+            self.assertEqual(code_block.dependencies, (("tx", "vars", "URL_JENKINS"),))
+            self.assertIsNone(compile_code_block("!!designer.cmd"))
+
+        with self.subTest(msg="Dependency order"):
+            raw_settings: dict = {
+                "foo": {
+                    "options": {"version": "${AvailabilityEnum.PROHIBITED}"},
+                    "url": "${self['foo']['vars']['host'] + '/job'}",
+                    "vars": {
+                        "host": "${self['bar']['host'].upper()}",
+                    },
+                },
+                "bar": {
+                    "options": {"version": "${AvailabilityEnum.PROHIBITED}"},
+                    "host": "${'http://' + self['bar']['name']}",
+                    "name": "example",
+                },
+            }
+            lazy_settings = settings.LazySettings(raw_settings)
+            self.assertEqual(lazy_settings["foo"]["url"], "HTTP://EXAMPLE/job")
+            self.assertEqual(lazy_settings["bar"]["host"], "http://example")
+
+        with self.subTest(msg="Cycle"):
+            raw_settings: dict = {
+                "foo": {
+                    "a": "${self['foo']['b']}",
+                    "b": "${self['bar']['c']}",
+                },
+                "bar": {
+                    "c": "${self['foo']['a']}",
+                },
+            }
+            lazy_settings = settings.LazySettings(raw_settings)
+            with self.assertRaises(settings.GoException) as cm:
+                lazy_settings["foo"]
+            self.assertIn("foo.a -> foo.b -> bar.c -> foo.a", str(cm.exception))
+
+    def test_reload(self) -> None:
+        raw_settings: dict = json.loads(SETTINGS_TEMPLATE_JSON)
+        raw_settings["foo"] = {
+            "base": "__simple_base",
+            "url": "${self['optt']['svn_dev_url'] + '/foo'}",
+        }
+
+        lazy_settings = settings.LazySettings(raw_settings)
+        lazy_settings.preload()
+
+        with self.subTest(msg="Without changes"):
+            result = lazy_settings.reload(json.loads(json.dumps(raw_settings)))
+            self.assertFalse(result.is_changed)
+            self.assertEqual(str(result), "Без изменений")
+
+        with self.subTest(msg="Changed project, base and dependency"):
+            new_raw_settings: dict = json.loads(json.dumps(raw_settings))
+            new_raw_settings["optt"]["svn_dev_url"] = "svn://127.0.0.1/optt/dev/branches"
+            new_raw_settings["__simple_base"]["options"]["args"] = "${AvailabilityEnum.OPTIONAL}"
+            new_raw_settings.pop("specifications")
+            new_raw_settings["bar"] = {"base": "__simple_base"}
+
+            project_tx: dict = lazy_settings["tx"]
+
+            result = lazy_settings.reload(new_raw_settings)
+            self.assertEqual(result.added, ["bar"])
+            self.assertEqual(result.removed, ["specifications"])
+            self.assertEqual(result.changed, ["optt", "manager", "file", "foo"])
+            self.assertEqual(result.rescanned, [])
+
+            self.assertIs(lazy_settings["tx"], project_tx)
+            self.assertEqual(lazy_settings["foo"]["url"], "svn://127.0.0.1/optt/dev/branches/foo")
+            self.assertEqual(lazy_settings["file"]["options"]["args"], go.AvailabilityEnum.OPTIONAL)
+            self.assertNotIn("specifications", lazy_settings)
+            self.assertIn("bar", lazy_settings)
+
+        with self.subTest(msg="Rescan only changed roots"):
+            lazy_settings["abc"]
+            path_value: list[str] = lazy_settings["abc"]["path"]
+            scans: dict = dict(lazy_settings._root_scans)
+
+            path_new_version = Path(path_value[1]) / "4.1.999.10-dev"
+            path_new_version.mkdir()
+            try:
+                result = lazy_settings.reload(lazy_settings.settings)
+                self.assertEqual(result.rescanned, ["abc"])
+                self.assertIn("4.1.999.10-dev", lazy_settings["abc"]["versions"])
+
+                self.assertIs(lazy_settings._root_scans[path_value[0]], scans[path_value[0]])
+                self.assertIsNot(lazy_settings._root_scans[path_value[1]], scans[path_value[1]])
+            finally:
+                path_new_version.rmdir()
+
+        with self.subTest(msg="Module reload"):
+            settings.run_settings_preprocess()
+            self.assertFalse(settings.reload().is_changed)
+
+    def test_reload_cached(self) -> None:
+        settings.run_settings_preprocess()
+        settings.get_project("tx")
+        settings.get_project("optt")
+
+        # Как в новом процессе: optt есть в кэше, но к нему еще не обращались
+        settings.run_settings_preprocess()
+        settings.get_project("tx")
+        self.assertNotIn("optt", settings.SETTINGS._projects)
+        self.assertIn("optt", settings.SETTINGS._cached_projects)
+
+        url: str = "svn://127.0.0.1/optt/dev/reload-cached"
+        raw_settings: dict = json.loads(SETTINGS_TEMPLATE_JSON)
+        raw_settings["optt"]["svn_dev_url"] = url
+        PATH_TEST_SETTINGS.write_text(json.dumps(raw_settings, indent=4), encoding="utf-8")
+        try:
+            result = settings.reload()
+            self.assertIn("optt", result.changed)
+            self.assertEqual(settings.get_project("optt")["svn_dev_url"], url)
+
+            # Кэш, сохраненный для нового файла настроек, не должен содержать старое значение
+            settings.run_settings_preprocess()
+            self.assertEqual(settings.get_project("optt")["svn_dev_url"], url)
+        finally:
+            PATH_TEST_SETTINGS.write_text(SETTINGS_TEMPLATE_JSON, encoding="utf-8")
+            settings.reload()
+
+    def test_cached_settings(self) -> None:
+        settings.run_settings_preprocess()
+        project: dict = settings.get_project("tx")
+        self.assertTrue(settings.PATH_CACHE_SETTINGS.exists())
+        self.assertEqual(settings.load_cached_projects()["tx"]["settings"], project)
+
+        settings.run_settings_preprocess()
+        self.assertEqual(settings.get_project("tx"), project)
+
+        with self.subTest(msg="Invalidation on new version dir"):
+            path_value: str = settings.get_path_by_name("tx")
+            path_new_version = Path(path_value) / "3.2.999"
+            path_new_version.mkdir()
+            try:
+                settings.run_settings_preprocess()
+                self.assertIn("3.2.999", settings.get_project("tx")["versions"])
+            finally:
+                path_new_version.rmdir()
+
+            settings.run_settings_preprocess()
+            self.assertNotIn("3.2.999", settings.get_project("tx")["versions"])
+
+        with self.subTest(msg="Unpicklable project"):
+            cached_projects: dict[str, dict] = settings.load_cached_projects()
+            cached_projects["bad"] = {"settings": {"func": lambda: None}, "mtimes": dict()}
+
+            with redirect_stdout(io.StringIO()) as f:
+                settings.save_cached_projects(cached_projects)
+                settings.save_cached_projects(cached_projects)
+            self.assertEqual(f.getvalue().count("'bad' не будет сохранен в кэш"), 1)
+
+            loaded_projects: dict[str, dict] = settings.load_cached_projects()
+            self.assertNotIn("bad", loaded_projects)
+            self.assertEqual(loaded_projects["tx"]["settings"], project)
+
+            # Как в новом процессе: о проекте уже сообщалось для этого файла настроек
+            with mock.patch.object(settings, "_UNPICKLABLE_NAMES", set()):
+                settings.load_cached_projects()
+                with redirect_stdout(io.StringIO()) as f:
+                    settings.save_cached_projects(cached_projects)
+                self.assertEqual(f.getvalue(), "")
+
+    def test_lazy_settings_threads(self) -> None:
+        lazy_settings = settings.LazySettings(json.loads(SETTINGS_TEMPLATE_JSON))
+
+        # Медленные блоки кода, чтобы потоки обратились к проекту во время его обработки
+        run_code_block = settings.LazySettings._run_code_block
+
+        def _run_code_block(self, *args, **kwargs) -> None:
+            time.sleep(0.001)
+            run_code_block(self, *args, **kwargs)
+
+        def _get(name: str) -> str:
+            barrier.wait()
+            return json.dumps(lazy_settings[name], default=str)
+
+        names: list[str] = ["tx", "optt", "tx", "optt", "abc", "tx"]
+        barrier = threading.Barrier(len(names))
+        with (
+            mock.patch.object(settings.LazySettings, "_run_code_block", _run_code_block),
+            ThreadPoolExecutor(max_workers=len(names)) as executor,
+        ):
+            results: list[str] = list(executor.map(_get, names))
+
+        for name, result in zip(names, results):
+            self.assertNotIn("${", result)
+            self.assertEqual(result, json.dumps(lazy_settings[name], default=str))
+
+    def test_lazy_settings(self) -> None:
+        lazy_settings = settings.LazySettings(settings.SETTINGS.settings)
+        self.assertEqual(list(lazy_settings), ["tx", "optt", "abc", "manager", "file", "specifications"])
+        self.assertNotIn("__radix_base", lazy_settings)
+
+        # Список имен есть сразу, а проекты обрабатываются при обращении
+        self.assertEqual(lazy_settings._projects, dict())
+        self.assertEqual(lazy_settings["tx"]["options"]["version"], go.AvailabilityEnum.OPTIONAL)
+        self.assertEqual(list(lazy_settings._projects), ["tx"])
+
+        with self.subTest(msg="Missing path breaks only its project"):
+            raw_settings: dict = json.loads(SETTINGS_TEMPLATE_JSON)
+            raw_settings["abc"]["path"].append(str(DIR_ENV / "not_exists"))
+
+            lazy_settings = settings.LazySettings(raw_settings)
+            with self.assertRaises(settings.GoException):
+                lazy_settings["abc"]
+            self.assertIn("trunk", lazy_settings["tx"]["versions"])
+
+    def test_base_resolver(self) -> None:
+        raw_settings: dict = {
+            "foo": {"base": "__foo_base", "vars": {"b": 2}},
+            "__foo_base": {"base": "__root_base", "vars": {"a": 1}, "path": "foo"},
+            "__root_base": {"vars": {"a": 0, "c": 3}, "actions": {"x": {"y": "z"}}},
+            "bar": {"base": "__foo_base"},
+        }
+        resolver = settings.BaseResolver(raw_settings)
+
+        with self.subTest(msg="Multi-level base, declaration order does not matter"):
+            self.assertEqual(resolver.get_chain("foo"), ["foo", "__foo_base", "__root_base"])
+            self.assertEqual(
+                resolver.resolve("foo"),
+                {"vars": {"a": 1, "b": 2, "c": 3}, "path": "foo", "actions": {"x": {"y": "z"}}},
+            )
+
+        with self.subTest(msg="Unchanged subtrees are shared"):
+            self.assertIs(resolver.resolve("foo")["actions"], raw_settings["__root_base"]["actions"])
+            self.assertIs(resolver.resolve("bar")["vars"], resolver.resolve("__foo_base")["vars"])
+            self.assertEqual(raw_settings["__root_base"]["vars"], {"a": 0, "c": 3})
+
+        with self.subTest(msg="Cycle"):
+            raw_settings["__root_base"]["base"] = "foo"
+            with self.assertRaises(settings.GoException) as cm:
+                settings.BaseResolver(raw_settings).resolve("bar")
+            self.assertIn("__foo_base -> __root_base -> foo -> __foo_base", str(cm.exception))
+
+        with self.subTest(msg="Evaluation does not change shared values"):
+            raw_settings: dict = json.loads(SETTINGS_TEMPLATE_JSON)
+            lazy_settings = settings.LazySettings(raw_settings)
+            self.assertIsNot(
+                lazy_settings["tx"]["actions"]["update"],
+                lazy_settings["optt"]["actions"]["update"],
+            )
+            self.assertIs(
+                lazy_settings["tx"]["actions"]["server"],
+                lazy_settings["optt"]["actions"]["server"],
+            )
+            self.assertEqual(
+                raw_settings["__radix_base"]["actions"]["update"][1],
+                "${commands.svn_update}",
+            )
+
+    def test_version_index(self) -> None:
+        index = VersionIndex(
+            versions=["trunk", "3.2.10.10", "3.2.9.10", "3.2.35.10", "3.2.35.11", "2.1.10"],
+            base_version=["3.2.{number}", "2.1.{number}"],
+        )
+        self.assertEqual(
+            index.versions,
+            ["2.1.10", "3.2.9.10", "3.2.10.10", "3.2.35.10", "3.2.35.11", "trunk"],
+        )
+
+        with self.subTest(msg="Short versions"):
+            self.assertEqual(index.resolve_short_version("9"), "3.2.9.10")
+            self.assertEqual(index.resolve_short_version("10"), "3.2.10.10")
+            with self.assertRaises(MultipleResultsFoundError):
+                index.resolve_short_version("35")
+            with self.assertRaises(UnknownVersionException):
+                index.resolve_short_version("1")
+
+        with self.subTest(msg="Ranges"):
+            self.assertEqual(
+                index.get_range("3.2.10.10", "trunk"),
+                ["3.2.10.10", "3.2.35.10", "3.2.35.11", "trunk"],
+            )
+            self.assertEqual(index.get_range("3.2.35.10", "3.2.9.10"), ["3.2.35.10", "3.2.10.10", "3.2.9.10"])
+
+        with self.subTest(msg="Project versions"):
+            self.assertEqual(list(SETTINGS["tx"]["versions"]), ["3.2.1", "3.2.2", "3.2.3", "trunk"])
+            self.assertEqual(settings.get_version_index("еч").versions, list(SETTINGS["tx"]["versions"]))
+
     def test_get_project(self) -> None:
         self.assertIsNotNone(settings.get_project("tx"))
         self.assertIsNotNone(settings.get_project("t"))
@@ -489,6 +803,13 @@ class TestCommands(TestCase):
 
 
 class TestGo(TestCase):
+    def test_run_without_args(self) -> None:
+        for args in [[], ["--parallel", "2"]]:
+            with self.subTest(args=args):
+                with redirect_stdout(io.StringIO()) as f:
+                    self.assertEqual(go.run(args), 1)
+                self.assertIn("Неизвестное имя", f.getvalue())
+
     def test_parse_cmd_args(self) -> None:
         self.assertEqual(
             go.parse_cmd_args("tx s".split()),
@@ -583,3 +904,966 @@ class TestGo(TestCase):
                 )
             ],
         )
+
+    def test_resolve_once(self) -> None:
+        with mock.patch.object(AliasIndex, "resolve", autospec=True, side_effect=AliasIndex.resolve) as m:
+            items: list[go.Command] = go.parse_cmd_args("t 3-tr d+s зп".split())
+
+            # Имя, "tr", "d", "s" и аргумент "зп" - по одному разу на все 4 команды
+            self.assertEqual(
+                [call.args[1] for call in m.call_args_list],
+                ["t", "tr", "d", "s", "зп"],
+            )
+            self.assertTrue(all(command.is_resolved for command in items))
+            self.assertEqual(items[1].path, settings.get_project("tx")["versions"]["3.2.3"])
+            self.assertEqual(items[1].value, settings.get_project("tx")["actions"]["server"])
+
+            m.reset_mock()
+            with mock.patch.object(commands, "run_file"), redirect_stdout(io.StringIO()):
+                commands.run_commands(items)
+            self.assertEqual(m.call_count, 0)
+
+        with self.subTest(msg="Manual command"):
+            command = go.Command("tx", "3", "s", ["pg"])
+            with mock.patch.object(commands, "run_file") as m, redirect_stdout(io.StringIO()):
+                command.run()
+            m.assert_called_once_with(
+                settings.get_project("tx")["versions"]["3.2.3"] + "/!!server-postgres.cmd"
+            )
+            self.assertEqual(command, go.Command("tx", "3.2.3", "server", ["pg"]))
+
+    def test_profile(self) -> None:
+        from tool_for_run_project.core import plan_cache, profiler
+
+        # Чтобы разбор аргументов не был пропущен из-за кэша
+        shutil.rmtree(plan_cache.DIR_PLANS, ignore_errors=True)
+
+        # Без флага замеры не выполняются
+        self.assertIsNone(profiler.get())
+        self.assertIs(profiler.span("foo"), profiler.span("bar"))
+
+        path: Path = DIR_ENV / "trace.json"
+        with redirect_stdout(io.StringIO()) as f:
+            self.assertEqual(go.main([f"{go.PROFILE_FLAG}={path}", "tx"]), 0)
+        output: str = f.getvalue()
+
+        self.assertIsNone(profiler.get())
+        self.assertIn("Найдены версии", output)
+        self.assertIn("Профиль (всего", output)
+        self.assertRegex(output, r"phase +parse_cmd_args +1 x +\d+\.\d+ мс")
+        self.assertRegex(output, r"alias +resolve alias +1 x")
+
+        events: list[dict] = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+        self.assertIn("go tx", [event["name"] for event in events])
+        for event in events:
+            self.assertEqual(event["ph"], "X")
+            self.assertGreaterEqual(event["dur"], 0)
+
+        with self.subTest(msg="Per thread"):
+            profile = profiler.enable()
+            try:
+                # Замеры других потоков (например, параллельных запросов сервера) в профиль не попадают
+                thread = threading.Thread(target=lambda: profiler.span("other").__enter__())
+                thread.start()
+                thread.join()
+
+                def _run() -> None:
+                    with profiler.use(profile), profiler.span("worker"):
+                        pass
+
+                thread = threading.Thread(target=_run)
+                thread.start()
+                thread.join()
+            finally:
+                profiler.disable()
+
+            self.assertEqual([x.name for x in profile.spans], ["worker"])
+
+    def test_plan_cache(self) -> None:
+        from tool_for_run_project.core import plan_cache
+
+        shutil.rmtree(plan_cache.DIR_PLANS, ignore_errors=True)
+        settings.run_settings_preprocess()
+
+        args: list[str] = "tx 2-tr s pg".split()
+
+        def _get_commands() -> tuple[list[go.Command], bool]:
+            with mock.patch.object(go, "parse_cmd_args", side_effect=go.parse_cmd_args) as m:
+                items = go.get_commands(args)
+            return items, m.called
+
+        items, is_parsed = _get_commands()
+        self.assertTrue(is_parsed)
+
+        with self.subTest(msg="Repeated command"):
+            cached_items, is_parsed = _get_commands()
+            self.assertFalse(is_parsed)
+            self.assertEqual(cached_items, items)
+            self.assertEqual([x.path for x in cached_items], [x.path for x in items])
+            self.assertEqual(cached_items[0].value, settings.get_project("tx")["actions"]["server"])
+
+        with self.subTest(msg="Invalidation on new version dir"):
+            path_new_version = Path(settings.get_path_by_name("tx")) / "3.2.999"
+            path_new_version.mkdir()
+            try:
+                settings.reload()
+                items, is_parsed = _get_commands()
+                self.assertTrue(is_parsed)
+                self.assertIn("3.2.999", [x.version for x in items])
+            finally:
+                path_new_version.rmdir()
+                settings.reload()
+
+        with self.subTest(msg="Invalidation on settings change"):
+            _get_commands()
+            with mock.patch.object(settings, "get_settings_hash", return_value="foo"):
+                _, is_parsed = _get_commands()
+            self.assertTrue(is_parsed)
+
+        with self.subTest(msg="Unpicklable action value"):
+            command = go.Command("tx", "trunk", "server", value=lambda: None)
+            with redirect_stdout(io.StringIO()) as f:
+                plan_cache.save(["unpicklable"], [command])
+            self.assertEqual(f.getvalue(), "")
+            self.assertFalse(plan_cache.get_path(["unpicklable"]).exists())
+
+        with self.subTest(msg="Eviction"):
+            for i in range(5):
+                plan_cache.save([f"tx{i}"], items)
+                path: Path = plan_cache.get_path([f"tx{i}"])
+                os.utime(path, (i, i))
+
+            size: int = plan_cache.get_path(["tx0"]).stat().st_size
+            removed: list[Path] = plan_cache.evict(max_size_bytes=size * 2)
+
+            self.assertIn(plan_cache.get_path(["tx0"]), removed)
+            self.assertTrue(plan_cache.get_path(["tx4"]).exists())
+            self.assertLessEqual(
+                sum(x.stat().st_size for x in plan_cache.DIR_PLANS.iterdir()), size * 2
+            )
+
+    def test_batch(self) -> None:
+        path: Path = DIR_ENV / "batch.txt"
+        path.write_text(
+            "# Комментарий\n\ntx\nfoobar\n  optt  \n",
+            encoding="utf-8",
+        )
+
+        with self.subTest(msg="Errors do not abort the rest"):
+            with redirect_stdout(io.StringIO()) as f:
+                self.assertEqual(go.main([go.BATCH_FLAG, str(path)]), 1)
+            output: str = f.getvalue()
+
+            self.assertIn("[1/3] go tx", output)
+            self.assertIn("[3/3] go optt", output)
+            self.assertRegex(output, r"\[OK\] +\d+\.\d+ с  3: go tx")
+            self.assertRegex(output, r"\[ERROR\] +\d+\.\d+ с  4: go foobar")
+            self.assertIn("Выполнено: 3 из 3, ошибок: 1", output)
+
+        with self.subTest(msg="Fail fast, from stdin"):
+            stdin = sys.stdin
+            sys.stdin = io.StringIO(path.read_text(encoding="utf-8"))
+            try:
+                with redirect_stdout(io.StringIO()) as f:
+                    self.assertEqual(go.main([go.BATCH_FLAG, "-", go.FAIL_FAST_FLAG]), 1)
+            finally:
+                sys.stdin = stdin
+            output: str = f.getvalue()
+
+            self.assertNotIn("[3/3] go optt", output)
+            self.assertIn("[SKIP]", output)
+            self.assertIn("Выполнено: 2 из 3, ошибок: 1", output)
+
+        self.assertEqual(go.split_line(r'tx open "C:\DEV__TX\trunk tx"'), ["tx", "open", r"C:\DEV__TX\trunk tx"])
+
+    def test_run_commands_parallel(self) -> None:
+        class SleepCommand(go.Command):
+            def run(self) -> None:
+                time.sleep(float(self.args[0]))
+                print(f"Готово: {self.version}")
+                if self.action == "fail":
+                    raise go.GoException(f"Ошибка в {self.version}")
+
+        items: list[go.Command] = [
+            SleepCommand("tx", version, "wait", [delay])
+            for version, delay in [("3.2.1", "0.3"), ("3.2.2", "0.1"), ("trunk", "0.2")]
+        ]
+
+        with self.subTest(msg="Order and grouping"):
+            start_time: float = time.perf_counter()
+            with redirect_stdout(io.StringIO()) as f:
+                commands.run_commands(items, max_workers=3)
+            self.assertLess(time.perf_counter() - start_time, 0.55)
+
+            self.assertEqual(
+                f.getvalue(),
+                "[1/3] tx 3.2.1 wait 0.3\nГотово: 3.2.1\n\n"
+                "[2/3] tx 3.2.2 wait 0.1\nГотово: 3.2.2\n\n"
+                "[3/3] tx trunk wait 0.2\nГотово: trunk\n\n",
+            )
+
+        with self.subTest(msg="Errors do not stop other commands"):
+            items[0].action = "fail"
+            items[2].action = "fail"
+            with redirect_stdout(io.StringIO()) as f:
+                with self.assertRaises(go.GoException) as cm:
+                    commands.run_commands(items, max_workers=2)
+            self.assertEqual(str(cm.exception), "Ошибка в 3.2.1")
+            self.assertIn("Готово: 3.2.2", f.getvalue())
+            self.assertIn("Ошибка: Ошибка в trunk", f.getvalue())
+
+        with self.subTest(msg="Shell commands in own directory"):
+            from tool_for_run_project.core.utils import run_shell_command
+
+            cwd: str = os.getcwd()
+            with redirect_stdout(io.StringIO()) as f:
+                run_shell_command(
+                    f'"{sys.executable}" -c "import os; print(os.getcwd())"',
+                    cwd=str(DIR_ENV),
+                )
+            self.assertEqual(f.getvalue().strip(), str(DIR_ENV))
+            self.assertEqual(os.getcwd(), cwd)
+
+        with self.subTest(msg="Shell command with background child"):
+            from tool_for_run_project.core.utils import run_shell_command
+
+            # Фоновый процесс держит канал вывода открытым, но команда не должна его ждать
+            code: str = "import sys, time; print('before', flush=True); time.sleep(3)"
+            start_time: float = time.perf_counter()
+            with redirect_stdout(io.StringIO()) as f:
+                self.assertEqual(
+                    run_shell_command(f'"{sys.executable}" -c "{code}" & echo after'), 0
+                )
+            self.assertLess(time.perf_counter() - start_time, 2)
+            self.assertIn("after", f.getvalue())
+
+        with self.subTest(msg="Flag"):
+            with redirect_stdout(io.StringIO()) as f:
+                self.assertEqual(go.run([go.PARALLEL_FLAG, "2", "tx", "2-tr"]), 0)
+            self.assertIn("Найдены версии", f.getvalue())
+
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(go.run([go.PARALLEL_FLAG, "tx"]), 1)
+
+
+class TestProcessRunner(TestCase):
+    def test_run_processes(self) -> None:
+        from tool_for_run_project.core import process_runner
+        from tool_for_run_project.core.process_runner import ProcessTask, run_processes_sync
+
+        def get_task(code: str, lines: list[str], **kwargs) -> ProcessTask:
+            return ProcessTask(
+                command=[sys.executable, "-c", code],
+                on_out_line_func=lines.append,
+                **kwargs,
+            )
+
+        with self.subTest(msg="Concurrent processes"):
+            code = "import time; print('start', flush=True); time.sleep(0.5); print('end')"
+            lines_1, lines_2 = [], []
+
+            start_time: float = time.perf_counter()
+            results = run_processes_sync([get_task(code, lines_1), get_task(code, lines_2)])
+            self.assertLess(time.perf_counter() - start_time, 0.95)
+
+            for lines, result in zip([lines_1, lines_2], results):
+                self.assertEqual([x.strip() for x in lines], ["start", "end"])
+                self.assertEqual(result.return_code, 0)
+                self.assertTrue(result.is_success)
+                self.assertEqual(list(result.tail), lines)
+
+        with self.subTest(msg="Max workers"):
+            code = "import time; time.sleep(0.3)"
+            start_time: float = time.perf_counter()
+            run_processes_sync([get_task(code, []), get_task(code, [])], max_workers=1)
+            self.assertGreaterEqual(time.perf_counter() - start_time, 0.6)
+
+        with self.subTest(msg="Stderr and return code"):
+            out_lines, err_lines = [], []
+            result = run_processes_sync(
+                [
+                    get_task(
+                        "import sys; print('out'); print('err', file=sys.stderr); sys.exit(3)",
+                        out_lines,
+                        on_err_line_func=err_lines.append,
+                    )
+                ]
+            )[0]
+            self.assertEqual([x.strip() for x in out_lines], ["out"])
+            self.assertEqual([x.strip() for x in err_lines], ["err"])
+            self.assertEqual(result.return_code, 3)
+            self.assertFalse(result.is_success)
+
+        with self.subTest(msg="Long line and tail"):
+            lines = []
+            code = (
+                f"print('x' * {process_runner.LINE_LIMIT_BYTES * 3});"
+                f"[print(i) for i in range({process_runner.TAIL_LINES * 2})]"
+            )
+            result = run_processes_sync([get_task(code, lines)])[0]
+            self.assertGreater(len(lines), process_runner.TAIL_LINES * 2 + 1)
+            self.assertEqual(
+                sum(x.count("x") for x in lines),
+                process_runner.LINE_LIMIT_BYTES * 3,
+            )
+            self.assertEqual(len(result.tail), process_runner.TAIL_LINES)
+            self.assertEqual(result.tail[-1].strip(), str(process_runner.TAIL_LINES * 2 - 1))
+
+        with self.subTest(msg="Timeout"):
+            start_time: float = time.perf_counter()
+            result = run_processes_sync(
+                [get_task("import time; time.sleep(10)", [], timeout=0.3)]
+            )[0]
+            self.assertLess(time.perf_counter() - start_time, 5)
+            self.assertTrue(result.is_timeout)
+            self.assertFalse(result.is_success)
+
+    def test_execute(self) -> None:
+        from tool_for_run_project.core.radix_update_compile_designer import execute
+
+        lines: list[str] = []
+        with redirect_stdout(io.StringIO()):
+            result = execute(
+                f'"{sys.executable}" -c "import os; print(os.getcwd())"',
+                directory=DIR_ENV,
+                on_out_line_func=lines.append,
+            )
+        self.assertEqual([x.strip() for x in lines], [str(DIR_ENV)])
+        self.assertEqual(result.return_code, 0)
+
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(subprocess.CalledProcessError):
+                execute(f'"{sys.executable}" -c "import sys; sys.exit(1)"', on_out_line_func=lines.append)
+
+            result = execute(
+                f'"{sys.executable}" -c "import sys; sys.exit(1)"',
+                on_out_line_func=lines.append,
+                assert_return_code=False,
+            )
+        self.assertEqual(result.return_code, 1)
+
+
+class TestPipeline(TestCase):
+    def test_svn_up(self) -> None:
+        from tool_for_run_project.core import radix_update_compile_designer as pipeline
+        from tool_for_run_project.core.svn import update as svn_update
+
+        path_cp1251: bytes = "ads/Отчет.txt".encode("cp1251")
+        data: bytes = (
+            b"Updating '.':\r\n"
+            b"U    kernel\\src\\A.java\r\n"
+            b" U   ads\r\n"
+            b"A    ads/src/B.java\r\n"
+            + "A    ads/Документ.txt\r\n".encode("utf-8")
+            + b"A    " + path_cp1251 + b"\r\n"
+            b"\r\n"
+            b"Fetching external item into 'ext':\r\n"
+            b"External at revision 7.\r\n"
+            b"\r\n"
+            b"Updated to revision 105.\r\n"
+        )
+
+        with self.subTest(msg="Process output"):
+            execute = pipeline.execute
+
+            def _execute(command: str, **kwargs):
+                code = f"import sys; sys.stdout.buffer.write({data!r})"
+                return execute([sys.executable, "-c", code], **kwargs)
+
+            lines: list[str] = []
+            with mock.patch.object(pipeline, "execute", _execute), redirect_stdout(io.StringIO()):
+                result = pipeline.execute_svn_up(".", on_out_line_func=lines.append)
+
+            self.assertTrue(result.is_success)
+            self.assertFalse(result.has_conflicts)
+            self.assertEqual(result.revision, 105)
+            self.assertEqual(
+                result.paths,
+                {
+                    "kernel\\src\\A.java": "U",
+                    "ads": " U",
+                    "ads/src/B.java": "A",
+                    "ads/Документ.txt": "A",
+                    svn_update.decode(path_cp1251): "A",
+                },
+            )
+            self.assertEqual(result.counts, {"U": 1, "A": 3})
+            self.assertIn("A    ads/Документ.txt\r\n", lines)
+            self.assertEqual(len(lines), 11)
+
+        with self.subTest(msg="Conflicts"):
+            result = svn_update.parse(
+                [
+                    b"Updating '.':\n",
+                    b"C    src/a.java\n",
+                    b" C   src\n",
+                    b"   C src/b.java\n",
+                    b"G    src/c.java\n",
+                    b"Updated to revision 106.\n",
+                    b"Summary of conflicts:\n",
+                    b"  Text conflicts: 1\n",
+                    b"  Property conflicts: 1\n",
+                    b"  Tree conflicts: 1\n",
+                ]
+            )
+            self.assertFalse(result.is_success)
+            self.assertTrue(result.has_conflicts)
+            self.assertEqual(result.revision, 106)
+            self.assertEqual(result.text_conflicts, ["src/a.java"])
+            self.assertEqual(result.property_conflicts, ["src"])
+            self.assertEqual(result.tree_conflicts, ["src/b.java"])
+            self.assertEqual(result.conflicts, ["src/a.java", "src", "src/b.java"])
+            self.assertEqual(result.paths["src/c.java"], "G")
+
+        with self.subTest(msg="Errors"):
+            result = svn_update.parse(
+                [
+                    b"Updating '.':\n",
+                    b"svn: E155037: Previous operation has not finished; run 'cleanup' if it was interrupted\n",
+                ]
+            )
+            self.assertFalse(result.is_success)
+            self.assertTrue(result.is_about_cleanup)
+            self.assertIsNone(result.revision)
+            self.assertEqual(
+                result.errors,
+                ["E155037: Previous operation has not finished; run 'cleanup' if it was interrupted"],
+            )
+
+        with self.subTest(msg="Max paths"):
+            parser = svn_update.SvnUpParser(max_paths=10)
+            for i in range(100):
+                parser.feed(f"U    src/{i}.java\n".encode())
+            parser.feed(b"Updated to revision 107.\n")
+            result = parser.close()
+
+            self.assertTrue(result.is_success)
+            self.assertEqual(len(result.paths), 10)
+            self.assertTrue(result.is_paths_truncated)
+            self.assertEqual(result.counts, {"U": 100})
+
+    def test_incremental(self) -> None:
+        from tool_for_run_project.core import radix_update_compile_designer as pipeline
+        from tool_for_run_project.core.radix_update_compile_designer import (
+            PipelineState,
+            Step,
+            SvnUpResult,
+        )
+
+        path: Path = DIR_ENV / "pipeline"
+        shutil.rmtree(path, ignore_errors=True)
+        path.mkdir(parents=True)
+        (path / "build-kernel.xml").write_text("kernel")
+        (path / "build-ads.xml").write_text("ads")
+
+        path_state: Path = PipelineState.get_path(path)
+        path_state.unlink(missing_ok=True)
+
+        # Шаги в обратном порядке, чтобы проверить сортировку по зависимостям
+        steps: list[Step] = [
+            Step(
+                name="ads",
+                command=f'"{sys.executable}" -c "print(2)"',
+                prefix="[ads]",
+                build_files=["build-ads.xml"],
+                depends_on=["kernel"],
+                paths=["ads"],
+            ),
+            Step(
+                name="kernel",
+                command=f'"{sys.executable}" -c "print(1)"',
+                prefix="[kernel]",
+                build_files=["build-kernel.xml"],
+                paths=["kernel"],
+            ),
+        ]
+
+        revision: int = 100
+
+        def _run(paths: list[str], new_revision: int | None = None, is_full: bool = False) -> list[str]:
+            nonlocal revision
+
+            state = PipelineState.load(path)
+            result_svn_up = SvnUpResult(
+                is_success=True,
+                revision=new_revision or revision,
+                paths=paths,
+            )
+            changed_revisions = pipeline.get_changed_revisions(steps, state, revision, result_svn_up)
+            state.changed_revisions = changed_revisions
+            state.revision = result_svn_up.revision
+            state.save(path)
+            revision = result_svn_up.revision
+
+            with redirect_stdout(io.StringIO()):
+                return pipeline.run_steps(
+                    path,
+                    steps,
+                    state,
+                    pipeline.get_fingerprints(path, steps, changed_revisions),
+                    is_full=is_full,
+                )
+
+        self.assertEqual(_run([]), ["kernel", "ads"])
+        self.assertTrue(path_state.exists())
+
+        with self.subTest(msg="Nothing changed"):
+            self.assertEqual(_run([]), [])
+
+        with self.subTest(msg="Changed paths"):
+            self.assertEqual(_run(["ads\\src\\B.java"], 101), ["ads"])
+            self.assertEqual(_run(["docs/readme.txt"], 102), [])
+            self.assertEqual(_run(["kernel/src/A.java"], 103), ["kernel", "ads"])
+
+        with self.subTest(msg="Changed build file"):
+            (path / "build-ads.xml").write_text("ads 2")
+            self.assertEqual(_run([]), ["ads"])
+
+        with self.subTest(msg="Unknown changes"):
+            # Рабочая копия обновлена не через pipeline
+            revision = 200
+            self.assertEqual(_run([], 201), ["kernel", "ads"])
+
+        with self.subTest(msg="Full"):
+            self.assertEqual(_run([], is_full=True), ["kernel", "ads"])
+
+        with self.subTest(msg="Failed step"):
+            steps[0].command = f'"{sys.executable}" -c "import sys; sys.exit(1)"'
+            with self.assertRaises(subprocess.CalledProcessError):
+                _run(["ads/src/B.java"], 202)
+
+            # Успешный шаг не повторяется, упавший - выполняется снова
+            steps[0].command = f'"{sys.executable}" -c "print(3)"'
+            self.assertEqual(_run([]), ["ads"])
+
+    def test_run_many(self) -> None:
+        from tool_for_run_project.core import radix_update_compile_designer as pipeline
+        from tool_for_run_project.core.radix_update_compile_designer import Step, SvnUpResult
+
+        paths: list[Path] = [DIR_ENV / "pipeline_many" / name for name in ["1.0", "2.0", "3.0"]]
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+            path.mkdir(parents=True)
+            pipeline.PipelineState.get_path(path).unlink(missing_ok=True)
+
+        steps: list[Step] = [
+            Step(name="build", command=f'"{sys.executable}" -c "import time; time.sleep(0.2)"', prefix="[2]"),
+        ]
+
+        def _svn_up(path: Path, **kwargs) -> SvnUpResult:
+            if path.name == "3.0":
+                return SvnUpResult(is_success=False)
+            return SvnUpResult(is_success=True, revision=1)
+
+        # Количество одновременных сборок
+        lock = threading.Lock()
+        running: int = 0
+        max_running: int = 0
+
+        execute = pipeline.execute
+
+        def _execute(*args, **kwargs):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            try:
+                return execute(*args, **kwargs)
+            finally:
+                with lock:
+                    running -= 1
+
+        with (
+            mock.patch.object(pipeline, "STEPS", steps),
+            mock.patch.object(pipeline, "execute_svn_up", _svn_up),
+            mock.patch.object(pipeline, "get_revision", lambda path: None),
+            mock.patch.object(pipeline, "execute", _execute),
+            mock.patch("os.cpu_count", return_value=8),
+            redirect_stdout(io.StringIO()) as f,
+        ):
+            progress = pipeline.run_many(paths, max_io=1)
+
+        self.assertEqual(max_running, 1)
+        self.assertEqual([item.stage for item in progress.items], ["done", "done", "error"])
+        self.assertEqual([item.executed for item in progress.items], [["build"], ["build"], []])
+        self.assertIn("max concurrent builds: 1", f.getvalue())
+        self.assertIn("Total: done 2/3, errors 1", f.getvalue())
+
+        self.assertEqual(pipeline.get_max_builds(2), min(os.cpu_count() or 1, 2))
+
+        with self.subTest(msg="Build logs"):
+            from tool_for_run_project.core import build_log
+
+            index = build_log.load_index(build_log.get_logs(paths[0])[-1])
+            self.assertTrue(index.is_success)
+            self.assertEqual(list(index.steps), ["SVN UP", "build"])
+
+            index = build_log.load_index(build_log.get_logs(paths[2])[-1])
+            self.assertFalse(index.is_success)
+            self.assertEqual(list(index.steps), ["SVN UP"])
+
+    def test_build_log(self) -> None:
+        import gzip
+        from tool_for_run_project.core import build_log
+
+        path: Path = DIR_ENV / "pipeline_log" / "1.0"
+        shutil.rmtree(build_log.get_dir(path), ignore_errors=True)
+
+        lines: list[str] = [f"[javac] line {i}" for i in range(1000)]
+        lines[10] = "[javac] A.java:10: error: cannot find symbol"
+        lines[500] = "[javac] B.java:20: warning: [deprecation] foo"
+        lines[998] = "BUILD FAILED"
+
+        with mock.patch.object(build_log, "CHUNK_SIZE_BYTES", 1024):
+            with build_log.BuildLog(path) as log:
+                log.start_step("build")
+                for line in lines:
+                    log.write(line + "\n")
+
+        index = build_log.load_index(log.path_log)
+        self.assertTrue(index.is_success)
+        self.assertEqual(index.lines, len(lines))
+        self.assertEqual(index.steps, {"build": 0})
+        self.assertGreater(len(index.chunks), 10)
+        self.assertEqual([x.line for x in index.errors], [10, 998])
+        self.assertEqual([x.line for x in index.warnings], [500])
+
+        # Блоки журнала - обычный gzip-файл из нескольких членов
+        with gzip.open(log.path_log, "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read().splitlines(), lines)
+
+        self.assertEqual(
+            list(build_log.read_lines(log.path_log, index, 8, 13)),
+            [(i, lines[i]) for i in range(8, 13)],
+        )
+        text: str = build_log.format_marks(log.path_log, index, index.errors)
+        self.assertIn(">     11: [javac] A.java:10: error: cannot find symbol", text)
+        self.assertIn("      13: [javac] line 12", text)
+        self.assertIn(">    999: BUILD FAILED", text)
+
+        with self.subTest(msg="Command"):
+            command = go.Command("tx", args=["--errors"])
+            with redirect_stdout(io.StringIO()) as f:
+                commands.show_build_log(commands.RunContext(command, path=str(path)))
+            self.assertIn("Ошибки (2):", f.getvalue())
+            self.assertIn("BUILD FAILED", f.getvalue())
+
+            # -e - флаг вывода ошибки со стеком, а не ошибок сборки
+            for args in [[], ["-e"]]:
+                command.args = args
+                with redirect_stdout(io.StringIO()) as f:
+                    commands.show_build_log(commands.RunContext(command, path=str(path)))
+                self.assertIn("успешно: строк 1000, ошибок 2, предупреждений 1", f.getvalue())
+
+        with self.subTest(msg="Bare \\r before error"):
+            with build_log.BuildLog(path) as log:
+                # Вывод прогресса перезаписывает строку через \r
+                log.write("Downloading 10%\rDownloading 50%\rDownloading 100%\n")
+                log.write("line\x0cwith form feed\n")
+                log.write("[javac] C.java:30: error: incompatible types\n")
+
+            index = build_log.load_index(log.path_log)
+            self.assertEqual([x.line for x in index.errors], [2])
+            text: str = build_log.format_marks(log.path_log, index, index.errors, context_lines=0)
+            self.assertIn(">      3: [javac] C.java:30: error: incompatible types", text)
+
+        with self.subTest(msg="Rotation"):
+            for _ in range(4):
+                with build_log.BuildLog(path, max_runs=3) as log:
+                    log.write("line")
+            self.assertEqual(len(build_log.get_logs(path)), 3)
+            self.assertEqual(len(list(build_log.get_dir(path).glob("*.index.json"))), 3)
+
+            build_log.rotate(build_log.get_dir(path), max_runs=3, max_size_bytes=0)
+            self.assertEqual(build_log.get_logs(path), [])
+
+    def test_step_history(self) -> None:
+        from tool_for_run_project.core import step_history
+
+        path_db: Path = DIR_ENV / "step_history" / "history.sqlite"
+        path_db.unlink(missing_ok=True)
+
+        self.assertEqual(step_history.get_eta("tx", "1.0", ["build"], path_db), {"build": None})
+        self.assertEqual(step_history.get_stats(path_db=path_db), [])
+
+        started: float = time.time()
+        for i, elapsed_secs in enumerate([100, 110, 90, 105, 95, 300]):
+            step_history.add("tx", "1.0", "build", started + i, elapsed_secs, True, path_db)
+        step_history.add("tx", "1.0", "build", started + 10, 1, False, path_db)
+        step_history.add("tx", "1.0", "update", started, 20, True, path_db)
+        step_history.add("tx", "2.0", "update", started, 40, True, path_db)
+
+        self.assertEqual(
+            step_history.get_eta("tx", "1.0", ["build", "update", "designer"], path_db),
+            {"build": 105, "update": 20, "designer": None},
+        )
+        # Для новой версии - по другим версиям проекта
+        self.assertEqual(step_history.get_eta("tx", "3.0", ["update"], path_db), {"update": 30})
+
+        stats = {(x.version, x.step): x for x in step_history.get_stats("tx", path_db)}
+        self.assertEqual(len(stats), 3)
+
+        x = stats["1.0", "build"]
+        self.assertEqual((x.runs, x.median_secs, x.last_secs, x.previous_median_secs), (5, 105, 300, 100))
+        self.assertTrue(x.is_regression)
+        self.assertFalse(stats["1.0", "update"].is_regression)
+
+        with self.subTest(msg="Timer"):
+            timer = step_history.StepTimer("optt", "1.0", path_db)
+            with timer.measure("build"):
+                pass
+            with self.assertRaises(ValueError):
+                with timer.measure("build"):
+                    raise ValueError()
+
+            self.assertLess(timer.get_eta(["build"])["build"], 1)
+            self.assertEqual(len(step_history.get_stats("optt", path_db)), 1)
+
+        with self.subTest(msg="Command"):
+            timer = step_history.StepTimer("tx", "trunk")
+            for _ in range(2):
+                with timer.measure("BUILD-KERNEL"):
+                    pass
+
+            command = go.Command("tx", "trunk", args=["-v"])
+            with redirect_stdout(io.StringIO()) as f:
+                commands.show_step_report(commands.RunContext(command, path=str(DIR_ENV / "trunk")))
+            self.assertIn("Самые долгие шаги:", f.getvalue())
+            self.assertIn("BUILD-KERNEL", f.getvalue())
+            self.assertIn("Регрессии (0):", f.getvalue())
+
+    def test_run_commands_many(self) -> None:
+        calls: list[list[str]] = []
+
+        def _run_many(contexts: list[commands.RunContext]) -> None:
+            calls.append([context.command.version for context in contexts])
+
+        items: list[go.Command] = [go.Command("tx", version, "update") for version in ["3.2.1", "trunk"]]
+        for command in items:
+            command.resolve()
+            command.value = commands.run_radix_update_compile_designer
+
+        with (
+            mock.patch.dict(commands.RUN_MANY_FUNCS, {commands.run_radix_update_compile_designer: _run_many}),
+            redirect_stdout(io.StringIO()),
+        ):
+            commands.run_commands(items)
+        self.assertEqual(calls, [["3.2.1", "trunk"]])
+
+    def test_radix_update_compile_designer_args(self) -> None:
+        for args, expected in [
+            ([], ["--name", "tx"]),
+            (["-f"], ["--name", "tx", "--full"]),
+            (["--max-io", "3"], ["--name", "tx", "--max-io", "3"]),
+            (["--max-io=3", "-f"], ["--name", "tx", "--full", "--max-io", "3"]),
+        ]:
+            with self.subTest(args=args):
+                contexts: list[commands.RunContext] = [
+                    commands.RunContext(go.Command("tx", version, args=args.copy()), path=version)
+                    for version in ["3.2.1", "trunk"]
+                ]
+                self.assertEqual(
+                    commands.get_radix_update_compile_designer_args(contexts)[2:],
+                    ["3.2.1", "trunk", *expected],
+                )
+
+        for args in [["--max-io"], ["--max-io", "0"], ["--max-io=x"]]:
+            with self.subTest(args=args), self.assertRaises(settings.GoException):
+                commands.get_max_io_arg(args)
+
+
+class TestServer(TestCase):
+    def run_client(self, args: list[str], input: str | None = None) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", "tool_for_run_project.client", *args],
+            env=os.environ | {"PYTHONPATH": os.pathsep.join(sys.path), "PYTHONIOENCODING": "utf-8"},
+            input=input,
+            capture_output=True,
+            encoding="utf-8",
+            # Чтобы зависший запрос не останавливал тесты
+            timeout=60,
+        )
+
+    def test_client(self) -> None:
+        from tool_for_run_project import server
+
+        with self.subTest(msg="Without server"):
+            server.PATH_SERVER_INFO.unlink(missing_ok=True)
+
+            result = self.run_client(["tx"])
+            self.assertEqual(result.returncode, 0, result.stderr)
+            self.assertIn("Найдены версии: 3.2.1, 3.2.2, 3.2.3, trunk", result.stdout)
+
+        with server.Server() as s:
+            thread = threading.Thread(target=s.serve_forever, daemon=True)
+            thread.start()
+            try:
+                while not server.PATH_SERVER_INFO.exists():
+                    time.sleep(0.01)
+
+                with self.subTest(msg="With server"):
+                    result = self.run_client(["tx"])
+                    self.assertEqual(result.returncode, 0, result.stderr)
+                    self.assertIn("Найдены версии: 3.2.1, 3.2.2, 3.2.3, trunk", result.stdout)
+
+                    result = self.run_client(["tx", "foobar"])
+                    self.assertEqual(result.returncode, 1, result.stderr)
+                    self.assertIn("Неизвестное действие", result.stdout)
+
+                with self.subTest(msg="Batch from stdin"):
+                    result = self.run_client(["--batch", "-"], input="tx\noptt\n")
+                    self.assertEqual(result.returncode, 0, result.stderr)
+                    self.assertIn("Выполнено: 2 из 2, ошибок: 0", result.stdout)
+
+                with self.subTest(msg="Concurrent requests"):
+                    info: dict = server.read_server_info()
+
+                    # Соединение без запроса занимает обработчик, пока не будет закрыто
+                    with socket.create_connection((info["host"], info["port"])):
+                        with ThreadPoolExecutor(max_workers=2) as executor:
+                            results = list(executor.map(self.run_client, [["tx"], ["optt"]]))
+
+                    for result, (expected, unexpected) in zip(
+                        results,
+                        [("Найдены версии: 3.2.1", "2.1.1"), ("Найдены версии: 2.1.1", "3.2.1")],
+                    ):
+                        self.assertEqual(result.returncode, 0, result.stderr)
+                        self.assertIn(expected, result.stdout)
+                        self.assertNotIn(unexpected, result.stdout)
+
+                with self.subTest(msg="Revalidate on new version dir"):
+                    path_new_version = Path(settings.get_path_by_name("tx")) / "3.2.999"
+                    path_new_version.mkdir()
+                    try:
+                        result = self.run_client(["tx"])
+                        self.assertIn("3.2.999", result.stdout)
+                    finally:
+                        path_new_version.rmdir()
+
+                    result = self.run_client(["tx"])
+                    self.assertNotIn("3.2.999", result.stdout)
+            finally:
+                s.shutdown()
+                thread.join()
+
+        self.assertFalse(server.PATH_SERVER_INFO.exists())
+
+    def test_get_exit_code(self) -> None:
+        from tool_for_run_project import server
+
+        for code, expected in [(None, 0), (0, 0), (2, 2), ("Ошибка", 1)]:
+            with self.subTest(code=code), redirect_stderr(io.StringIO()):
+                self.assertEqual(server.get_exit_code(SystemExit(code)), expected)
+
+
+class TestCompletion(TestCase):
+    def test_index(self) -> None:
+        from tool_for_run_project import completion
+
+        settings.run_settings_preprocess()
+        settings.get_project("tx")
+
+        index: dict = completion.load_index()
+        self.assertEqual(index["names"], list(settings.SETTINGS))
+        self.assertEqual(index["projects"]["tx"]["versions"], ["3.2.1", "3.2.2", "3.2.3", "trunk"])
+        self.assertEqual(index["projects"]["tx"]["args"], {"server": ["ora", "pg"]})
+
+        with self.subTest(msg="Versions of unprocessed projects"):
+            lazy_settings = settings.LazySettings(json.loads(SETTINGS_TEMPLATE_JSON))
+            unprocessed_index: dict = lazy_settings.get_completion_index()
+            self.assertEqual(lazy_settings._projects, dict())
+
+            for name in ["tx", "optt", "abc"]:
+                self.assertEqual(
+                    unprocessed_index["projects"][name]["versions"],
+                    list(settings.get_project(name)["versions"]),
+                )
+            self.assertEqual(unprocessed_index["projects"]["manager"]["versions"], [])
+
+        completer = completion.Completer(index)
+        for words, expected in [
+            ([""], list(settings.SETTINGS)),
+            (["t"], ["tx"]),
+            (["е"], ["tx"]),
+            (["tx", "3.2."], ["3.2.1", "3.2.2", "3.2.3"]),
+            (["tx", "3.2.1,t"], ["3.2.1,trunk"]),
+            (["tx", "d"], ["designer"]),
+            (["tx", "s+"], ["s+designer", "s+server", "s+update", "s+log"]),
+            (["tx", "3", "s"], ["server"]),
+            (["tx", "s", ""], ["ora", "pg"]),
+            (["еч", "ы", "з"], ["pg"]),
+            (["tx", "3", "d+s", "o"], ["ora"]),
+            (["tx", "d", ""], []),
+            (["foobar", ""], []),
+        ]:
+            with self.subTest(words=words):
+                self.assertEqual(completer.complete(words), expected)
+
+    def test_startup(self) -> None:
+        code = """
+import sys
+from tool_for_run_project import client
+
+client.main(["--complete", "tx", "s", ""])
+print(sorted(name for name in sys.modules if name.startswith("tool_for_run_project")))
+"""
+        output: str = subprocess.check_output(
+            [sys.executable, "-c", code],
+            env=os.environ | {"PYTHONPATH": os.pathsep.join(sys.path), "PYTHONIOENCODING": "utf-8"},
+            encoding="utf-8",
+        )
+        self.assertEqual(
+            output.splitlines(),
+            ["ora", "pg", "['tool_for_run_project', 'tool_for_run_project.client', 'tool_for_run_project.completion']"],
+        )
+
+
+class TestStartup(TestCase):
+    # NOTE: Верхняя граница количества модулей пакета и сторонних библиотек, импортируемых
+    #       при обычном запуске. Модули стандартной библиотеки не считаются - их набор зависит
+    #       от версии Python и платформы
+    MAX_IMPORTED_MODULES: int = 20
+
+    # Тяжелые модули, которые нужны только для отдельных действий
+    HEAVY_MODULES: list[str] = [
+        "psutil",
+        "requests",
+        "tool_for_run_project.core.svn",
+        "tool_for_run_project.core.kill",
+        "tool_for_run_project.core.jenkins",
+        "tool_for_run_project.core.radix_update_compile_designer",
+        "tool_for_run_project.third_party.get_project_versions",
+    ]
+
+    def test_imported_modules(self) -> None:
+        code = """
+import json
+import sys
+
+modules_before = set(sys.modules)
+
+from tool_for_run_project import core, go
+
+# Запуск файла не нужен, важен только путь до него
+core._open_path = lambda *args, **kwargs: None
+
+go.run(["tx", "d"])
+go.run(["tx"])
+
+print(json.dumps(sorted(set(sys.modules) - modules_before)))
+"""
+        output: str = subprocess.check_output(
+            [sys.executable, "-c", code],
+            env=os.environ | {"PYTHONPATH": os.pathsep.join(sys.path), "PYTHONIOENCODING": "utf-8"},
+            encoding="utf-8",
+        )
+        modules: list[str] = json.loads(output.splitlines()[-1])
+
+        for name in self.HEAVY_MODULES:
+            self.assertNotIn(name, modules)
+
+        modules = [
+            name for name in modules
+            if name.split(".")[0] not in sys.stdlib_module_names
+        ]
+        self.assertLessEqual(len(modules), self.MAX_IMPORTED_MODULES, modules)